@@ -13,14 +13,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import OrderedDict
+
 import numpy as np
+import pandas as pd
 import networkx as nx
+from scipy import ndimage, sparse
+from scipy.sparse import csgraph
 
 from defdap.quat import Quat
 from defdap import plotting
 from defdap.plotting import MapPlot, GrainPlot
 
-from defdap.utils import reportProgress
+from defdap.utils import reportProgress, TableWriter
 
 
 class Map(object):
@@ -34,6 +39,14 @@ class Map(object):
         self.proxigramArr = None
         self.neighbourNetwork = None
 
+        self.componentList = None
+        self.componentLabels = None
+        self.componentSizes = None
+
+        self.grainGeometryData = None
+        self.grainAttributeData = None
+        self.grainAttributeOrder = {}
+
         self.grainPlot = None
 
     def __len__(self):
@@ -320,6 +333,88 @@ class Map(object):
 
             self.homogPoints[homogID] = newPoint
 
+    def setComponents(self, labels, componentList):
+        """Store the regions found when finding grains, before small
+        grains are removed, so the minimum grain size can be changed
+        with filterGrains.
+
+        Parameters
+        ----------
+        labels : numpy.ndarray
+            Label image with regions numbered from 1 and values below 1 for
+            points not in a region.
+        componentList : list
+            Grain object of each region.
+
+        """
+        self.componentLabels = labels
+        self.componentList = componentList
+        self.componentSizes = np.bincount(
+            labels[labels > 0], minlength=len(componentList) + 1
+        )[1:]
+
+    def filterGrains(self, minGrainSize=10, absorb=False):
+        """Remove grains smaller than a minimum size from the regions
+        found by findGrains, without finding grains again. Grains are
+        numbered in the order they were found and grains that are kept
+        keep their calculated data.
+
+        Parameters
+        ----------
+        minGrainSize : int
+            Minimum grain area in pixels.
+        absorb : bool
+            If True, regions smaller than the minimum size are added to
+            their largest neighbouring grain instead of being set to -2 in
+            the grain map. Small regions with no neighbouring grain are
+            still set to -2.
+
+        Returns
+        -------
+        numpy.ndarray
+            Grain ID of each region found by findGrains, -1 if removed.
+
+        """
+        if self.componentLabels is None:
+            raise Exception("Grains must be found before filtering.")
+
+        sizes = self.componentSizes
+        keep = sizes >= minGrainSize
+        newIds = np.where(keep, np.cumsum(keep) - 1, -1)
+
+        if absorb:
+            pairs = labelAdjacency(self.componentLabels)
+            pairs = np.concatenate((pairs, pairs[:, ::-1]))
+            # pairs of a small region and a grain that is kept, then
+            # sorted so the largest grain is last for each small region
+            pairs = pairs[~keep[pairs[:, 0]] & keep[pairs[:, 1]]]
+            if len(pairs):
+                pairs = pairs[np.lexsort((sizes[pairs[:, 1]], pairs[:, 0]))]
+                largest = np.append(pairs[1:, 0] != pairs[:-1, 0], True)
+                newIds[pairs[largest, 0]] = newIds[pairs[largest, 1]]
+
+        # relabel grain map, grain images start labeling at 1 and small
+        # regions are set to -2
+        labels = self.componentLabels
+        lookup = np.where(newIds >= 0, newIds + 1, -2)
+        self.grains = np.where(
+            labels > 0, lookup[np.maximum(labels, 1) - 1], labels
+        )
+
+        groups = [[] for _ in range(np.count_nonzero(keep))]
+        for regionId in np.flatnonzero(newIds >= 0):
+            groups[newIds[regionId]].append(self.componentList[regionId])
+        self.grainList = [group[0] if len(group) == 1
+                          else self.combineGrains(group)
+                          for group in groups]
+
+        self.neighbourNetwork = None
+        self.proxigramArr = None
+        self.grainGeometryData = None
+        self.grainAttributeData = None
+
+        return newIds
+
     def buildNeighbourNetwork(self):
         """Construct a list of neighbours
 
@@ -372,6 +467,23 @@ class Map(object):
         self.neighbourNetwork.add_nodes_from(range(len(self)))
         self.neighbourNetwork.add_edges_from(neighboursList)
 
+    def grainAdjacency(self):
+        """Find pairs of neighbouring grains from the grain map. Grains
+        are neighbours if they have adjacent points in x or y, or points
+        either side of a single point not in a grain.
+
+        Returns
+        -------
+        numpy.ndarray
+            IDs of each pair of neighbouring grains, lowest first, shape
+            (numPairs, 2).
+
+        """
+        # Check that grains have been detected in the map
+        self.checkGrainsDetected()
+
+        return labelAdjacency(self.grains)
+
     def displayNeighbours(self):
         self.locateGrainID(clickEvent=self.clickGrainNeighbours)
 
@@ -413,6 +525,268 @@ class Map(object):
             # update the grain highlights layer in the plot
             plot.addGrainHighlights(highlightGrains, grainColours=highlightColours)
 
+    @property
+    def grainGeometry(self):
+        """Size and shape of each grain, see calcGrainGeometry.
+
+        Returns
+        -------
+        dict of numpy.ndarray
+            Value of each property for every grain.
+
+        """
+        self.calcGrainGeometry(forceCalc=False)
+
+        return self.grainGeometryData
+
+    def calcGrainGeometry(self, forceCalc=True):
+        """Calculate the size and shape of all grains in one pass over the
+        grain map, see :func:`defdap.base.labelGeometry` for the values
+        calculated. Area, perimeter and equivalent diameter are also given
+        in micrometres as 'areaMicrons', 'perimeterMicrons' and
+        'eqvDiameterMicrons', these are NaN if the map scale is not set.
+        The bounding box and centroid are also stored in each grain.
+
+        Parameters
+        ----------
+        forceCalc : bool, optional
+            Force calculation even if grainGeometryData is populated.
+
+        """
+        if self.grainGeometryData is not None and not forceCalc:
+            return
+
+        # Check that grains have been detected in the map
+        self.checkGrainsDetected()
+
+        geometry = labelGeometry(self.grains, len(self))
+
+        try:
+            scale = self.scale
+        except ValueError:
+            scale = None
+        if scale is None:
+            scale = np.nan
+        geometry['areaMicrons'] = geometry['area'] * scale**2
+        geometry['perimeterMicrons'] = geometry['perimeter'] * scale
+        geometry['eqvDiameterMicrons'] = geometry['eqvDiameter'] * scale
+
+        for i, grain in enumerate(self):
+            grain.boundingBox = (
+                geometry['xMin'][i], geometry['yMin'][i],
+                geometry['xMax'][i], geometry['yMax'][i]
+            )
+            grain.centroid = (geometry['xCentroid'][i],
+                              geometry['yCentroid'][i])
+
+        self.grainGeometryData = geometry
+
+    @property
+    def grainAttributes(self):
+        """Columnar store of grain attributes, see calcGrainAttributes.
+
+        Returns
+        -------
+        dict of numpy.ndarray
+            Value of each attribute for every grain.
+
+        """
+        self.calcGrainAttributes(forceCalc=False)
+
+        return self.grainAttributeData
+
+    def calcGrainAttributes(self, forceCalc=True):
+        """Build the store of grain attributes used to select grains,
+        from the columns of grainTable. This includes the grain size and
+        shape and the results already calculated for the grains, so
+        should be built again with forceCalc after calculating new
+        results. Other attributes can be added with setGrainAttribute.
+
+        Parameters
+        ----------
+        forceCalc : bool, optional
+            Force calculation even if grainAttributeData is populated.
+
+        """
+        if self.grainAttributeData is not None and not forceCalc:
+            return
+
+        table = self.grainTable()
+        self.grainAttributeData = OrderedDict(
+            (name, table[name].values) for name in table.columns
+        )
+        self.grainAttributeOrder = {}
+
+    def setGrainAttribute(self, name, values):
+        """Add or replace an attribute in the grain attribute store. Added
+        attributes are removed when the store is built again.
+
+        Parameters
+        ----------
+        name : str
+            Name of the attribute.
+        values : numpy.ndarray
+            Value for every grain.
+
+        """
+        values = np.asarray(values)
+        if values.shape[:1] != (len(self),):
+            raise ValueError("There must be a value for every grain.")
+
+        self.grainAttributes[name] = values
+        self.grainAttributeOrder.pop(name, None)
+
+    def selectGrains(self, mask=None, **ranges):
+        """Select grains using a boolean mask and ranges of attributes
+        from the grain attribute store. Ranges are found from a sorted
+        index of the attribute that is kept between selections, so many
+        selections on the same attributes are fast. For example,
+        selectGrains(area=(100, None), maxSF=(0.45, None)) selects grains
+        with at least 100 points and a maximum Schmid factor of at least
+        0.45. Masks can be built from the store, for example
+        grainAttributes['ebsdGrainId'] == 5 selects the grains of a DIC
+        map linked to EBSD grain 5.
+
+        Parameters
+        ----------
+        mask : numpy.ndarray, optional
+            Boolean value for every grain, True to select.
+        ranges
+            Minimum and maximum value of attributes to select, keyed by
+            attribute name. Limits are inclusive and None for no limit.
+            Grains with NaN values are not selected.
+
+        Returns
+        -------
+        numpy.ndarray
+            IDs of the selected grains, in order.
+
+        """
+        if mask is None:
+            selected = np.ones(len(self), dtype=bool)
+        else:
+            selected = np.array(mask, dtype=bool)
+            if selected.shape != (len(self),):
+                raise ValueError("Mask must have a value for every grain.")
+
+        for name, (low, high) in ranges.items():
+            sortedValues, order = self.sortedGrainAttribute(name)
+            start = 0 if low is None else np.searchsorted(
+                sortedValues, low, side='left')
+            # NaN values are sorted after inf
+            end = np.searchsorted(sortedValues, np.inf if high is None
+                                  else high, side='right')
+
+            inRange = np.zeros(len(self), dtype=bool)
+            inRange[order[start:end]] = True
+            selected &= inRange
+
+        return np.flatnonzero(selected)
+
+    def sortedGrainAttribute(self, name):
+        """Sorted values of a grain attribute and the grain IDs in that
+        order, kept until the attribute store is built again.
+
+        Parameters
+        ----------
+        name : str
+            Name of the attribute.
+
+        Returns
+        -------
+        numpy.ndarray
+            Sorted values.
+        numpy.ndarray
+            Grain IDs in order of the values.
+
+        """
+        if name not in self.grainAttributeOrder:
+            try:
+                values = self.grainAttributes[name]
+            except KeyError:
+                raise ValueError("Unknown grain attribute '{}'.".format(name))
+            order = np.argsort(values, kind='stable')
+            self.grainAttributeOrder[name] = (values[order], order)
+
+        return self.grainAttributeOrder[name]
+
+    def exportGrainData(self, fileName, perSlipSystem=False, fmt=None,
+                        grainIds=None):
+        """Write the table of grain results from grainTable to a file.
+
+        Parameters
+        ----------
+        fileName : str
+            Path of the file to write.
+        perSlipSystem : bool
+            Write a row for each slip system of each grain.
+        fmt : str, {'csv', 'parquet', 'hdf5'}, optional
+            File format, found from the file extension if not given.
+        grainIds : list(int), optional
+            IDs of grains to write, for example from selectGrains. All
+            grains are written if not given.
+
+        """
+        table = self.grainTable(perSlipSystem=perSlipSystem)
+        if grainIds is not None:
+            table = table[np.isin(table['grainId'].values, grainIds)]
+        with TableWriter(fileName, fmt=fmt) as writer:
+            writer.write(table)
+
+    @reportProgress("exporting map data")
+    def exportMapData(self, fileName, fields, chunkSize=1000000, fmt=None):
+        """Write a table with a row for each point in the map to a file,
+        with columns x, y, grainId (-1 for points not in a grain) and the
+        given fields. The table is built and written in chunks of rows of
+        the map so large maps are not held in memory as a table.
+
+        Parameters
+        ----------
+        fileName : str
+            Path of the file to write.
+        fields : dict
+            Map data to write, keyed by column name. Data with more than
+            2 dimensions is written as a column for each component, with
+            the component number (from 1) appended to the name.
+        chunkSize : int
+            Approximate number of points to write at a time.
+        fmt : str, {'csv', 'parquet', 'hdf5'}, optional
+            File format, found from the file extension if not given.
+
+        """
+        for name, mapData in fields.items():
+            if np.shape(mapData)[-2:] != self.shape:
+                raise ValueError("Field '{}' is not the same shape as the "
+                                 "map.".format(name))
+
+        rowsPerChunk = max(1, chunkSize // self.xDim)
+        with TableWriter(fileName, fmt=fmt) as writer:
+            for yStart in range(0, self.yDim, rowsPerChunk):
+                rows = slice(yStart, min(yStart + rowsPerChunk, self.yDim))
+                y, x = np.mgrid[rows, 0:self.xDim]
+
+                columns = OrderedDict()
+                columns['x'] = x.ravel()
+                columns['y'] = y.ravel()
+                if self.grains is not None:
+                    # grain images start labeling at 1
+                    grains = self.grains[rows]
+                    columns['grainId'] = np.where(grains > 0, grains - 1,
+                                                  -1).ravel()
+                for name, mapData in fields.items():
+                    mapData = mapData[..., rows, :]
+                    if mapData.ndim == 2:
+                        columns[name] = mapData.ravel()
+                        continue
+                    mapData = mapData.reshape((-1,) + mapData.shape[-2:])
+                    for i, component in enumerate(mapData):
+                        columns['{}{}'.format(name, i + 1)] = component.ravel()
+
+                writer.write(pd.DataFrame(columns))
+
+                # report progress
+                yield rows.stop / self.yDim
+
     @property
     def proxigram(self):
         """Proxigram for a map.
@@ -526,6 +900,108 @@ class Map(object):
 
         return grainAvData
 
+    def grainMapDataCoarse(self, mapData, kernelSize=2, bg=np.nan):
+        """Coarsen map data using a kernel at each pixel that only
+        includes data from the same grain, for all grains at once.
+        Equivalent to calling grainMapDataCoarse for every grain.
+
+        Parameters
+        ----------
+        mapData : numpy.ndarray
+            Array of map data. This must be cropped!
+        kernelSize : int, optional
+            Size of kernel as the number of pixels to dilate by i.e 1
+            gives a 3x3 kernel.
+        bg : various, optional
+            Value to fill points outside of grains and nan values with.
+
+        Returns
+        -------
+        numpy.ndarray
+            Map of coarsened data.
+
+        """
+        # Check that grains have been detected in the map
+        self.checkGrainsDetected()
+
+        grains = self.grains
+        valid = (grains > 0) & ~np.isnan(mapData)
+        shape = grains.shape
+
+        # pad so every kernel offset is a shifted view of the map
+        grainsPad = np.pad(grains, kernelSize, constant_values=0)
+        validPad = np.pad(valid, kernelSize, constant_values=False)
+        dataPad = np.pad(np.where(valid, mapData, 0.), kernelSize,
+                         constant_values=0)
+
+        # sum data and valid points in the kernel of each pixel that
+        # belong to the same grain as the pixel
+        dataSum = np.zeros(shape)
+        numPoints = np.zeros(shape, dtype=int)
+        for dy in range(2 * kernelSize + 1):
+            for dx in range(2 * kernelSize + 1):
+                window = (slice(dy, dy + shape[0]), slice(dx, dx + shape[1]))
+                sameGrain = validPad[window] & (grainsPad[window] == grains)
+                dataSum += np.where(sameGrain, dataPad[window], 0.)
+                numPoints += sameGrain
+
+        mapDataCoarse = np.full(shape, bg, dtype=float)
+        mapDataCoarse[valid] = dataSum[valid] / numPoints[valid]
+
+        return mapDataCoarse
+
+    def grainDataToMapData(self, grainData, grainIds=-1, bg=0):
+        """Create a map from values per grain. The values are placed in
+        a lookup table indexed by grain label, so the map is built with
+        a single indexing operation on the grain label image.
+
+        Parameters
+        ----------
+        grainData : list or numpy.ndarray
+            Grain values. This can be a single value per grain or RGB
+            values.
+        grainIds : list(int) or int, optional
+            IDs of grains the values are for. Use -1 for all grains in
+            the map.
+        bg : int or real, optional
+            Value to fill the background with. Points not in a grain
+            (boundaries and culled grains) or in a grain not in grainIds
+            are background.
+
+        Returns
+        -------
+        numpy.ndarray
+            Map of grain values.
+
+        """
+        # Check that grains have been detected in the map
+        self.checkGrainsDetected()
+
+        if type(grainIds) is int:
+            if grainIds == -1:
+                grainIds = range(len(self))
+            else:
+                grainIds = [grainIds]
+
+        grainData = np.array(grainData)
+        if grainData.shape[0] != len(grainIds):
+            raise Exception("The length of supplied grain data does not"
+                            "match the number of grains.")
+        if not (len(grainData.shape) == 1 or
+                (len(grainData.shape) == 2 and grainData.shape[1] == 3)):
+            raise Exception("The grain data supplied must be either a"
+                            "single value or RGB values per grain.")
+
+        # entry 0 of the lookup table is background and entry i is grain
+        # with label i (ID i - 1)
+        lut = np.full((len(self) + 1,) + grainData.shape[1:], bg,
+                      dtype=grainData.dtype)
+        lut[np.array(grainIds, dtype=int) + 1] = grainData
+
+        labels = np.where(self.grains > 0, self.grains, 0)
+
+        return lut[labels]
+
     def plotGrainDataMap(self, mapData=None, grainData=None,
                          grainIds=-1, bg=0, **kwargs):
         """
@@ -538,11 +1014,13 @@ class Map(object):
         mapData : numpy.ndarray, optional
             Array of map data. This must be cropped! You must supply either
             mapData or grainData.
-        grainData : list or numpy.array, optional
+        grainData : list or numpy.array or str, optional
             Grain values. This an be a single value per grain or RGB
-            values. You must supply either mapData or grainData.
+            values, or the name of an attribute in the grain attribute
+            store. You must supply either mapData or grainData.
         grainIds : list(int) or int, optional
-            IDs of grains to plot for. Use -1 for all grains in the map.
+            IDs of grains to plot for, for example from selectGrains. Use
+            -1 for all grains in the map.
         bg : int or real, optional
             Value to fill the background with.
         kwargs :
@@ -574,23 +1052,12 @@ class Map(object):
             else:
                 grainIds = [grainIds]
 
-        grainData = np.array(grainData)
-        if grainData.shape[0] != len(grainIds):
-            raise Exception("The length of supplied grain data does not"
-                            "match the number of grains.")
-        if len(grainData.shape) == 1:
-            mapShape = [self.yDim, self.xDim]
-        elif len(grainData.shape) == 2 and grainData.shape[1] == 3:
-            mapShape = [self.yDim, self.xDim, 3]
-        else:
-            raise Exception("The grain data supplied must be either a"
-                            "single value or RGB values per grain.")
+        if isinstance(grainData, str):
+            grainData = self.grainAttributes[grainData][
+                np.array(grainIds, dtype=int)]
 
-        grainMap = np.full(mapShape, bg, dtype=grainData.dtype)
-        for grainId, grainValue in zip(grainIds, grainData):
-            grain = self.grainList[grainId]
-            for coord in grain.coordList:
-                grainMap[coord[1], coord[0]] = grainValue
+        grainMap = self.grainDataToMapData(grainData, grainIds=grainIds,
+                                           bg=bg)
 
         plot = MapPlot.create(self, grainMap, **plotParams)
 
@@ -660,6 +1127,9 @@ class Grain(object):
         # list of coords stored as tuples (x, y). These are coords in a
         # cropped image if crop exists.
         self.coordList = []
+        # set when the grain geometry of the map is calculated
+        self.boundingBox = None
+        self.centroid = None
 
     def __len__(self):
         return len(self.coordList)
@@ -674,12 +1144,16 @@ class Grain(object):
             minimum x, minimum y, maximum x, maximum y.
 
         """
+        if self.boundingBox is not None:
+            return self.boundingBox
+
         coords = np.array(self.coordList, dtype=int)
 
         x0, y0 = coords.min(axis=0)
         xmax, ymax = coords.max(axis=0)
+        self.boundingBox = (x0, y0, xmax, ymax)
 
-        return x0, y0, xmax, ymax
+        return self.boundingBox
 
     def centreCoords(self, centreType="box", grainCoords=True):
         """
@@ -706,7 +1180,9 @@ class Grain(object):
             xCentre = round((xmax + x0) / 2)
             yCentre = round((ymax + y0) / 2)
         elif centreType == "com":
-            xCentre, yCentre = np.array(self.coordList).mean(axis=0).round()
+            if self.centroid is None:
+                self.centroid = tuple(np.array(self.coordList).mean(axis=0))
+            xCentre, yCentre = np.round(self.centroid)
         else:
             raise ValueError("centreType must be box or com")
 
@@ -854,42 +1330,19 @@ class Grain(object):
 
         """
         grainMapData = self.grainMapData(mapData=mapData, grainData=grainData)
-        grainMapDataCoarse = np.full_like(grainMapData, np.nan)
+        valid = ~np.isnan(grainMapData)
 
-        for i, j in np.ndindex(grainMapData.shape):
-            if np.isnan(grainMapData[i, j]):
-                grainMapDataCoarse[i, j] = bg
-            else:
-                coarseValue = 0
+        # normalised convolution, the box sum of the data over the box
+        # sum of valid points. Points outside the grain and nan values do
+        # not contribute to either sum.
+        size = 2 * kernelSize + 1
+        dataSum = ndimage.uniform_filter(np.where(valid, grainMapData, 0.),
+                                         size=size, mode='constant')
+        numPoints = ndimage.uniform_filter(valid.astype(float),
+                                           size=size, mode='constant')
 
-                if i - kernelSize >= 0:
-                    yLow = i - kernelSize
-                else:
-                    yLow = 0
-                if i + kernelSize + 1 <= grainMapData.shape[0]:
-                    yHigh = i + kernelSize + 1
-                else:
-                    yHigh = grainMapData.shape[0]
-                if j - kernelSize >= 0:
-                    xLow = j - kernelSize
-                else:
-                    xLow = 0
-                if j + kernelSize + 1 <= grainMapData.shape[1]:
-                    xHigh = j + kernelSize + 1
-                else:
-                    xHigh = grainMapData.shape[1]
-
-                numPoints = 0
-                for k in range(yLow, yHigh):
-                    for l in range(xLow, xHigh):
-                        if not np.isnan(grainMapData[k, l]):
-                            coarseValue += grainMapData[k, l]
-                            numPoints += 1
-
-                if numPoints > 0:
-                    grainMapDataCoarse[i, j] = coarseValue / numPoints
-                else:
-                    grainMapDataCoarse[i, j] = np.nan
+        grainMapDataCoarse = np.full_like(grainMapData, bg)
+        grainMapDataCoarse[valid] = dataSum[valid] / numPoints[valid]
 
         return grainMapDataCoarse
 
@@ -924,3 +1377,356 @@ class Grain(object):
         plot = GrainPlot.create(self, grainMapData, **plotParams)
 
         return plot
+
+
+def boundarySegments(edgesX, edgesY, valuesX=None, valuesY=None, tol=None):
+    """Convert boundaries between pixels into line segments. Consecutive
+    boundary edges along the same row or column of pixel edges are
+    merged into a single segment.
+
+    Parameters
+    ----------
+    edgesX : numpy.ndarray(bool)
+        Boundaries between each pixel and the next pixel in x, shape
+        (yDim, xDim - 1).
+    edgesY : numpy.ndarray(bool)
+        Boundaries between each pixel and the next pixel in y, shape
+        (yDim - 1, xDim).
+    valuesX, valuesY : numpy.ndarray, optional
+        Value associated with each edge, i.e. misorientation, same shapes
+        as edgesX and edgesY. Each segment is given the mean value of
+        its edges.
+    tol : float, optional
+        Only merge edges with values differing by at most this.
+
+    Returns
+    -------
+    segments : numpy.ndarray
+        Start and end points of each segment in pixel coordinates (x, y),
+        shape (numSegments, 2, 2).
+    values : numpy.ndarray
+        Mean value of each segment, only returned if values are given.
+
+    """
+    returnValues = valuesX is not None and valuesY is not None
+    if not returnValues:
+        valuesX = np.zeros(edgesX.shape)
+        valuesY = np.zeros(edgesY.shape)
+
+    segments = []
+    values = []
+    # edges between pixels in x form vertical lines, so find runs down
+    # each column of edges. Edges in y form horizontal lines along rows
+    for edges, edgeValues, vertical in ((edgesX.T, valuesX.T, True),
+                                        (edgesY, valuesY, False)):
+        edges = np.asarray(edges, dtype=bool)
+        edgeValues = np.where(edges, edgeValues, 0).astype(float)
+
+        # a run continues from the previous edge unless the value jumps
+        joined = edges[:, 1:] & edges[:, :-1]
+        if tol is not None:
+            joined &= np.abs(np.diff(edgeValues, axis=1)) <= tol
+        notJoined = np.ones(edges.shape[:1] + (1,), dtype=bool)
+        starts = edges & np.hstack((notJoined, ~joined))
+        ends = edges & np.hstack((~joined, notJoined))
+
+        # runs are found in the same order so starts and ends pair up
+        lineIdx, startIdx = np.nonzero(starts)
+        _, endIdx = np.nonzero(ends)
+
+        cumValues = np.cumsum(edgeValues, axis=1)
+        runSums = cumValues[lineIdx, endIdx] - np.where(
+            startIdx > 0, cumValues[lineIdx, np.maximum(startIdx - 1, 0)], 0
+        )
+        values.append(runSums / (endIdx - startIdx + 1))
+
+        linePos = lineIdx + 0.5
+        start = startIdx - 0.5
+        end = endIdx + 0.5
+        if vertical:
+            points = ((linePos, start), (linePos, end))
+        else:
+            points = ((start, linePos), (end, linePos))
+        segments.append(np.stack([np.stack(point, axis=-1)
+                                  for point in points], axis=1))
+
+    segments = np.concatenate(segments).reshape((-1, 2, 2))
+    if returnValues:
+        return segments, np.concatenate(values)
+    return segments
+
+
+def chainSegments(segments, values=None, tol=None):
+    """Join line segments that meet end to end into polylines. Segments
+    are only joined at points shared by exactly two segments, so chains
+    end at junctions.
+
+    Parameters
+    ----------
+    segments : numpy.ndarray
+        Start and end points of each segment, shape (numSegments, 2, 2).
+        Points are matched exactly so must lie on a grid, i.e. the
+        segments from :func:`boundarySegments`.
+    values : numpy.ndarray, optional
+        Value of each segment. Each polyline is given the length weighted
+        mean value of its segments.
+    tol : float, optional
+        Only join segments with values differing by at most this.
+
+    Returns
+    -------
+    polylines : list(numpy.ndarray)
+        Points of each polyline, shape (numPoints, 2).
+    values : numpy.ndarray
+        Value of each polyline, only returned if values are given.
+
+    """
+    segments = np.asarray(segments)
+    numSegments = len(segments)
+    lengths = np.linalg.norm(segments[:, 1] - segments[:, 0], axis=1)
+
+    # label each end point with an id shared by coincident points
+    _, pointIds = np.unique(segments.reshape((-1, 2)), axis=0,
+                            return_inverse=True)
+    pointIds = pointIds.reshape((numSegments, 2))
+
+    # segment ends at each point
+    incidences = {}
+    for segment, ends in enumerate(pointIds.tolist()):
+        for end, pointId in enumerate(ends):
+            incidences.setdefault(pointId, []).append((segment, end))
+
+    used = np.zeros(numSegments, dtype=bool)
+    polylines = []
+    polylineValues = []
+    for first in range(numSegments):
+        if used[first]:
+            continue
+        used[first] = True
+        chain = [first]
+        points = [segments[first, 0], segments[first, 1]]
+
+        # grow the chain from the end then from the start of the segment
+        for grow in (1, 0):
+            segment, end = first, grow
+            while True:
+                incident = incidences[pointIds[segment, end]]
+                if len(incident) != 2:
+                    break
+                nextSegment, nextEnd = incident[incident[0][0] == segment]
+                if used[nextSegment] or (
+                        tol is not None and values is not None and
+                        abs(values[nextSegment] - values[segment]) > tol):
+                    break
+                used[nextSegment] = True
+                chain.append(nextSegment)
+                segment, end = nextSegment, 1 - nextEnd
+                if grow:
+                    points.append(segments[segment, end])
+                else:
+                    points.insert(0, segments[segment, end])
+
+        polylines.append(np.array(points))
+        if values is not None:
+            polylineValues.append(np.average(values[chain],
+                                             weights=lengths[chain]))
+
+    if values is not None:
+        return polylines, np.array(polylineValues)
+    return polylines
+
+
+def connectedComponents(numNodes, nodesA, nodesB):
+    """Label the connected components of an undirected graph, merging
+    the nodes at the ends of each edge as in a union-find.
+
+    Parameters
+    ----------
+    numNodes : int
+        Number of nodes in the graph.
+    nodesA, nodesB : numpy.ndarray
+        Nodes at either end of each edge.
+
+    Returns
+    -------
+    numpy.ndarray
+        Component label of each node, starting at 0 and ordered by the
+        lowest node in each component.
+
+    """
+    graph = sparse.coo_matrix(
+        (np.ones(len(nodesA), dtype=bool), (nodesA, nodesB)),
+        shape=(numNodes, numNodes)
+    )
+    _, labels = csgraph.connected_components(graph, directed=False)
+
+    # order components by their first node
+    _, firstNodes, labels = np.unique(labels, return_index=True,
+                                      return_inverse=True)
+    order = np.empty_like(firstNodes)
+    order[np.argsort(firstNodes)] = np.arange(len(firstNodes))
+
+    return order[labels]
+
+
+def labelAdjacency(labels):
+    """Find pairs of neighbouring regions in a label image. Regions are
+    neighbours if they have adjacent points in x or y, or points either
+    side of a single point not in a region.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray
+        Label image with regions numbered from 1 and values below 1 for
+        points not in a region.
+
+    Returns
+    -------
+    numpy.ndarray
+        IDs of each pair of neighbouring regions, starting at 0 and lowest
+        first, shape (numPairs, 2).
+
+    """
+    pairs = [
+        (labels[:, :-1], labels[:, 1:], True),
+        (labels[:-1], labels[1:], True),
+        (labels[:, :-2], labels[:, 2:], labels[:, 1:-1] < 1),
+        (labels[:-2], labels[2:], labels[1:-1] < 1),
+    ]
+
+    labelsA = []
+    labelsB = []
+    for a, b, gap in pairs:
+        neighbours = (a > 0) & (b > 0) & (a != b) & gap
+        labelsA.append(a[neighbours])
+        labelsB.append(b[neighbours])
+    labelsA = np.concatenate(labelsA)
+    labelsB = np.concatenate(labelsB)
+
+    # minus 1 as the label image starts labeling at 1
+    edges = np.stack((np.minimum(labelsA, labelsB),
+                      np.maximum(labelsA, labelsB)), axis=1) - 1
+
+    return np.unique(edges, axis=0).reshape((-1, 2))
+
+
+def labelEdges(labels):
+    """Find the boundaries between the regions of a label image, as the
+    edges between each point and the next point in x and y with
+    different labels. Edges between two points not in a region are not
+    boundaries.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray
+        Label image with regions numbered from 1 and values below 1 for
+        points not in a region.
+
+    Returns
+    -------
+    edgesX : numpy.ndarray(bool)
+        Boundaries between each point and the next point in x, shape
+        (yDim, xDim - 1).
+    edgesY : numpy.ndarray(bool)
+        Boundaries between each point and the next point in y, shape
+        (yDim - 1, xDim).
+
+    """
+    edgesX = ((labels[:, :-1] != labels[:, 1:]) &
+              ((labels[:, :-1] > 0) | (labels[:, 1:] > 0)))
+    edgesY = ((labels[:-1] != labels[1:]) &
+              ((labels[:-1] > 0) | (labels[1:] > 0)))
+
+    return edgesX, edgesY
+
+
+def labelGeometry(labels, numLabels):
+    """Calculate the size and shape of each region in a label image in a
+    single pass, using image moments. Lengths are in pixels and
+    coordinates are in the map frame.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray
+        Label image with regions numbered from 1 and values below 1 for
+        points not in a region.
+    numLabels : int
+        Number of regions.
+
+    Returns
+    -------
+    dict of numpy.ndarray
+        Value for each region of:
+        'area' - number of points;
+        'xCentroid', 'yCentroid' - centre of mass;
+        'xMin', 'yMin', 'xMax', 'yMax' - bounding box, inclusive;
+        'perimeter' - number of point edges on the region boundary;
+        'eqvDiameter' - diameter of a circle of the same area;
+        'majorAxis', 'minorAxis' - axis lengths of the ellipse with the
+        same second moments;
+        'aspectRatio' - ratio of major to minor axis;
+        'orientation' - angle of the major axis in radians, in the same
+        convention as slip trace angles.
+
+    """
+    inRegion = labels > 0
+    points = labels[inRegion] - 1
+    y, x = np.nonzero(inRegion)
+    x = x.astype(float)
+    y = y.astype(float)
+
+    area = np.bincount(points, minlength=numLabels).astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        xCentroid = np.bincount(points, weights=x, minlength=numLabels) / area
+        yCentroid = np.bincount(points, weights=y, minlength=numLabels) / area
+
+        # central second moments, from points relative to the centroid
+        dx = x - xCentroid[points]
+        dy = y - yCentroid[points]
+        mu20 = np.bincount(points, weights=dx * dx, minlength=numLabels) / area
+        mu02 = np.bincount(points, weights=dy * dy, minlength=numLabels) / area
+        mu11 = np.bincount(points, weights=dx * dy, minlength=numLabels) / area
+
+    # bounding box
+    index = np.arange(1, numLabels + 1)
+    yy, xx = np.indices(labels.shape)
+    bounds = [np.asarray(func(coords, labels, index), dtype=int)
+              for func in (ndimage.minimum, ndimage.maximum)
+              for coords in (xx, yy)]
+
+    # count edges between a point and a point not in the same region,
+    # including the edge of the map
+    padded = np.pad(labels, 1, constant_values=0)
+    centre = padded[1:-1, 1:-1]
+    numEdges = np.zeros(labels.shape, dtype=int)
+    for shifted in (padded[:-2, 1:-1], padded[2:, 1:-1],
+                    padded[1:-1, :-2], padded[1:-1, 2:]):
+        numEdges += shifted != centre
+    perimeter = np.bincount(points, weights=numEdges[inRegion],
+                            minlength=numLabels)
+
+    # ellipse from eigenvalues of the inertia tensor
+    common = np.sqrt(((mu20 - mu02) / 2)**2 + mu11**2)
+    majorAxis = 4 * np.sqrt((mu20 + mu02) / 2 + common)
+    minorAxis = 4 * np.sqrt(np.maximum((mu20 + mu02) / 2 - common, 0))
+    # angle of major axis from the x axis then converted to the angle of
+    # the direction (sin(a), cos(a))
+    orientation = (np.pi / 2 - 0.5 * np.arctan2(2 * mu11, mu20 - mu02)) % np.pi
+    with np.errstate(invalid='ignore', divide='ignore'):
+        aspectRatio = majorAxis / minorAxis
+
+    return {
+        'area': area.astype(int),
+        'xCentroid': xCentroid,
+        'yCentroid': yCentroid,
+        'xMin': bounds[0],
+        'yMin': bounds[1],
+        'xMax': bounds[2],
+        'yMax': bounds[3],
+        'perimeter': perimeter.astype(int),
+        'eqvDiameter': np.sqrt(4 * area / np.pi),
+        'majorAxis': majorAxis,
+        'minorAxis': minorAxis,
+        'aspectRatio': aspectRatio,
+        'orientation': orientation,
+    }
@@ -19,9 +19,12 @@ from skimage import morphology as mph
 
 import copy
 import warnings
+from collections import OrderedDict
+
+import pandas as pd
 
 from defdap.file_readers import EBSDDataLoader
-from defdap.quat import Quat
+from defdap.quat import Quat, OrientationIndex
 from defdap.crystal import SlipSystem
 from defdap import base
 
@@ -58,6 +61,16 @@ class Map(base.Map):
         List of phase names.
     boundaries : numpy.ndarray
         Map of boundaries. -1 for a boundary, 0 otherwise.
+    boundaryLines : list(numpy.ndarray)
+        Boundaries as polylines along the edges between pixels. Points
+        (x, y) of each line, shape (numPoints, 2). Found from the
+        misorientation by findBoundaries and from the grain map once
+        grains are found, filtered or merged.
+    boundaryLineMisOri : numpy.ndarray
+        Misorientation in degrees across each boundary line.
+    neighbourMisOri : numpy.ndarray
+        Misorientation in degrees between each point and the next point
+        in x and in y, shape (2, yDim, xDim).
     phaseBoundaries : numpy.ndarray
         Map of phase boundaries. -1 for boundary, 0 otherwise.
     cacheEulerMap
@@ -116,10 +129,14 @@ class Map(base.Map):
         self.eulerAngleArray = None
         self.bandContrastArray = None
         self.quatArray = None
+        self.ipfColourCache = {}
         self.numPhases = None
         self.phaseArray = None
         self.phaseNames = []
         self.boundaries = None
+        self.boundaryLines = None
+        self.boundaryLineMisOri = None
+        self.neighbourMisOri = None
         self.phaseBoundaries = None
         self.cacheEulerMap = None
         self.grains = None
@@ -133,6 +150,7 @@ class Map(base.Map):
         self.origin = (0, 0)
         self.GND = None
         self.Nye = None
+        self.grainOriIndexData = None
 
         # Use euler map for defining homologous points
         self.plotHomog = self.plotEulerMap
@@ -206,7 +224,9 @@ class Map(base.Map):
         self.bandContrastArray = self.bandContrastArray[::-1, ::-1]
         self.phaseArray = self.phaseArray[::-1, ::-1]
         self.buildQuatArray()
-        
+        self.ipfColourCache = {}
+        self.neighbourMisOri = None
+
         transformQuat = Quat.fromAxisAngle(np.array([0, 0, 1]), np.pi)
         for i in range(self.xDim):
             for j in range(self.yDim):
@@ -279,6 +299,55 @@ class Map(base.Map):
 
         return plot
 
+    def calcIPFcolours(self, direction, forceCalc=False, resolution=0.25,
+                       chunkSize=None, numWorkers=1):
+        """Calculate IPF colours of the map with respect to a given
+        sample direction. Colours are stored for each direction so
+        repeated plots do not recalculate them.
+
+        Parameters
+        ----------
+        direction : np.array len 3
+            Sample direction.
+        forceCalc : bool, optional
+            If true, recalculate the colours even if they are stored.
+        resolution : float, optional
+            Angular resolution in degrees of the colour table colours are
+            interpolated from. If None, colours are calculated exactly for
+            each point, see :func:`defdap.quat.Quat.calcIPFcolours`.
+        chunkSize : int, optional
+            Number of points to process at once.
+        numWorkers : int, optional
+            Number of threads to process chunks with.
+
+        Returns
+        -------
+        numpy.ndarray
+            RGB colours, shape (yDim, xDim, 3). Non-indexed points are NaN.
+
+        """
+        key = tuple(np.asarray(direction, dtype=float).ravel()) + (resolution,)
+        if not forceCalc and key in self.ipfColourCache:
+            return self.ipfColourCache[key]
+
+        IPFcolours = Quat.calcIPFcolours(
+            self.quatArray.flatten(),
+            direction,
+            self.crystalSym,
+            resolution=resolution,
+            chunkSize=chunkSize,
+            numWorkers=numWorkers
+        )
+
+        # Make non-indexed points NaN
+        IPFcolours[:, self.phaseArray.flatten() == 0] = np.nan
+
+        # reshape back to map shape array
+        IPFcolours = np.reshape(IPFcolours.T, (self.yDim, self.xDim, 3))
+        self.ipfColourCache[key] = IPFcolours
+
+        return IPFcolours
+
     def plotIPFMap(self, direction, **kwargs):
         """
         Plot a map with points coloured in IPF colouring,
@@ -300,18 +369,7 @@ class Map(base.Map):
         plotParams = {}
         plotParams.update(kwargs)
 
-        # calculate IPF colours
-        IPFcolours = Quat.calcIPFcolours(
-            self.quatArray.flatten(),
-            direction,
-            self.crystalSym
-        )
-        
-        # Make non-indexed points NaN
-        IPFcolours=np.where(np.tile(self.phaseArray.flatten()==0, (3,1)), np.nan, IPFcolours)
-
-        # reshape back to map shape array
-        IPFcolours = np.reshape(IPFcolours.T, (self.yDim, self.xDim, 3))
+        IPFcolours = self.calcIPFcolours(direction)
 
         plot = MapPlot.create(self, IPFcolours, **plotParams)
 
@@ -581,17 +639,20 @@ class Map(base.Map):
         if self.quatArray is None:
             # create the array of quat objects
             self.quatArray = Quat.createManyQuats(self.eulerAngleArray)
+            self.ipfColourCache = {}
+            self.neighbourMisOri = None
 
         yield 1.
 
-    @reportProgress("finding grain boundaries")
-    def findBoundaries(self, boundDef=10):
-        """Find grain boundaries
+    def calcNeighbourMisOri(self):
+        """Calculate the misorientation between each point and its next
+        neighbours in x and y. Results are stored in neighbourMisOri.
 
-        Parameters
-        ----------
-        boundDef : float
-            Critical misorientation.
+        Returns
+        -------
+        numpy.ndarray
+            Misorientation in degrees to the next point in x and in y,
+            shape (2, yDim, xDim). The last column and row are 0.
 
         """
         syms = Quat.symEqv(self.crystalSym)
@@ -627,11 +688,8 @@ class Map(base.Map):
 
         # loop over symmetries calculating misorientation to initial
         for i in range(numSyms):
-            for j in range(self.xDim - 1):
-                misOrix[i, :, j] = abs(np.einsum("ij,ij->j", quatComps[0, :, :, j], quatComps[i, :, :, j + 1]))
-
-            for j in range(self.yDim - 1):
-                misOriy[i, j, :] = abs(np.einsum("ij,ij->j", quatComps[0, :, j, :], quatComps[i, :, j + 1, :]))
+            misOrix[i, :, :-1] = abs(np.einsum("ijk,ijk->jk", quatComps[0, :, :, :-1], quatComps[i, :, :, 1:]))
+            misOriy[i, :-1, :] = abs(np.einsum("ijk,ijk->jk", quatComps[0, :, :-1, :], quatComps[i, :, 1:, :]))
 
         misOrix[misOrix > 1] = 1
         misOriy[misOriy > 1] = 1
@@ -644,16 +702,65 @@ class Map(base.Map):
         misOrix = 360 * np.arccos(misOrix) / np.pi
         misOriy = 360 * np.arccos(misOriy) / np.pi
 
+        self.neighbourMisOri = np.array((misOrix, misOriy))
+
+        return self.neighbourMisOri
+
+    @reportProgress("finding grain boundaries")
+    def findBoundaries(self, boundDef=10):
+        """Find grain boundaries
+
+        Parameters
+        ----------
+        boundDef : float
+            Critical misorientation.
+
+        """
+        misOrix, misOriy = self.calcNeighbourMisOri()
+
         # set boundary locations where misOrix or misOriy are greater than set value
-        self.boundaries = np.zeros((self.yDim, self.xDim), dtype=int)
+        self.boundaries = np.where(
+            (misOrix > boundDef) | (misOriy > boundDef), -1, 0
+        )
 
-        for i in range(self.xDim):
-            for j in range(self.yDim):
-                if (misOrix[j, i] > boundDef) or (misOriy[j, i] > boundDef):
-                    self.boundaries[j, i] = -1
+        # boundaries as lines along the edges between pixels, excluding
+        # the last row/column which have no neighbour
+        segments, segmentMisOri = base.boundarySegments(
+            misOrix[:, :-1] > boundDef, misOriy[:-1] > boundDef,
+            valuesX=misOrix[:, :-1], valuesY=misOriy[:-1], tol=boundDef / 2
+        )
+        self.boundaryLines, self.boundaryLineMisOri = base.chainSegments(
+            segments, values=segmentMisOri, tol=boundDef / 2
+        )
 
         yield 1.
 
+    def findGrainBoundaryLines(self):
+        """Find boundary lines along the edges between pixels of
+        different grains in the grain map, replacing the lines found by
+        findBoundaries. Called whenever the grain map is relabelled so
+        the lines match the grains. Edges between points that are both
+        not in a grain are not included.
+
+        """
+        misOri = self.neighbourMisOri
+        if misOri is None:
+            misOri = self.calcNeighbourMisOri()
+        misOrix, misOriy = misOri
+
+        edgesX, edgesY = base.labelEdges(self.grains)
+        segments, segmentMisOri = base.boundarySegments(
+            edgesX, edgesY, valuesX=misOrix[:, :-1], valuesY=misOriy[:-1]
+        )
+        if len(segments) == 0:
+            self.boundaryLines = []
+            self.boundaryLineMisOri = np.zeros(0)
+            return
+
+        self.boundaryLines, self.boundaryLineMisOri = base.chainSegments(
+            segments, values=segmentMisOri
+        )
+
     @reportProgress("finding phase boundaries")
     def findPhaseBoundaries(self, treatNonIndexedAs=None):
         """Finds boundaries in the phase map.
@@ -734,19 +841,36 @@ class Map(base.Map):
         return plot
 
     @reportProgress("finding grains")
-    def findGrains(self, minGrainSize=10):
+    def findGrains(self, minGrainSize=10, method='floodFill', boundDef=10):
         """Find grains and assign IDs.
 
         Parameters
         ----------
         minGrainSize : int
-            Minimum grain area in pixels.
+            Minimum grain area in pixels, this can be changed after with
+            filterGrains.
+        method : str, {'floodFill', 'unionFind'}
+            'floodFill' fills the regions between the boundary points found
+            by findBoundaries, with boundary points assigned to the grains
+            above and left of them. 'unionFind' merges neighbouring points
+            of the same phase with misorientation below boundDef, so there
+            are no boundary points in the grain map. The boundary image is
+            set from the edges between the regions found.
+        boundDef : float or list(float)
+            Critical misorientation for the 'unionFind' method, either a
+            single value or one for each phase.
 
         """
+        if method == 'unionFind':
+            yield from self._findGrainsUnionFind(minGrainSize, boundDef)
+            return
+        elif method != 'floodFill':
+            raise ValueError("Unknown grain finding method.")
+
         # Initialise the grain map
         self.grains = np.copy(self.boundaries)
 
-        self.grainList = []
+        componentList = []
 
         # List of points where no grain has be set yet
         unknownPoints = np.where(self.grains == 0)
@@ -756,7 +880,9 @@ class Map(base.Map):
         grainIndex = 1
 
         # Loop until all points (except boundaries) have been assigned
-        # to a grain or ignored
+        # to a grain. Small grains are removed after by filterGrains, a
+        # filled region cannot be taken by a later one so this gives the
+        # same grains as removing them here
         while numPoints > 0:
             # report progress
             yield 1. - numPoints / totalPoints
@@ -764,21 +890,472 @@ class Map(base.Map):
             # Flood fill first unknown point and return grain object
             currentGrain = self.floodFill(unknownPoints[1][0], unknownPoints[0][0], grainIndex)
 
-            grainSize = len(currentGrain)
-            if grainSize < minGrainSize:
-                # if grain size less than minimum, ignore grain and set
-                # values in grain map to -2
-                for coord in currentGrain.coordList:
-                    self.grains[coord[1], coord[0]] = -2
-            else:
-                # add grain and size to lists and increment grain label
-                self.grainList.append(currentGrain)
-                grainIndex += 1
+            # add grain to list and increment grain label
+            componentList.append(currentGrain)
+            grainIndex += 1
 
             # update unknown points
             unknownPoints = np.where(self.grains == 0)
             numPoints = unknownPoints[0].shape[0]
 
+        self.setComponents(self.grains, componentList)
+        self.filterGrains(minGrainSize)
+
+    def _findGrainsUnionFind(self, minGrainSize, boundDef):
+        """Find grains by merging neighbouring points with misorientation
+        below a critical value, in a single pass over all neighbour pairs.
+        Non-indexed points are not assigned to a grain and are set to -2
+        in the grain map, as are grains smaller than the minimum size.
+        Called by findGrains.
+
+        Parameters
+        ----------
+        minGrainSize : int
+            Minimum grain area in pixels.
+        boundDef : float or list(float)
+            Critical misorientation, either a single value or one for each
+            phase.
+
+        """
+        boundDef = np.asarray(boundDef, dtype=float)
+        if boundDef.ndim > 0 and len(boundDef) != self.numPhases:
+            raise ValueError(
+                "boundDef must be a single value or one for each of the {} "
+                "phases.".format(self.numPhases)
+            )
+
+        misOri = self.neighbourMisOri
+        if misOri is None:
+            misOri = self.calcNeighbourMisOri()
+        yield 0.5
+
+        # critical misorientation at each point from its phase
+        phases = self.phaseArray.astype(int)
+        indexed = phases > 0
+        boundDefs = np.concatenate(([0.], np.broadcast_to(
+            boundDef, (self.numPhases,)
+        )))
+        pointBoundDef = boundDefs[np.where(indexed, phases, 0)]
+
+        # join points to their next neighbour in x and y where both are
+        # indexed in the same phase and misorientation is below critical
+        pointIds = np.arange(self.xDim * self.yDim).reshape(self.yDim, self.xDim)
+        nodesA = []
+        nodesB = []
+        for axis, axisMisOri in zip((1, 0), misOri):
+            curr = [slice(None)] * 2
+            curr[axis] = slice(None, -1)
+            curr = tuple(curr)
+            nxt = [slice(None)] * 2
+            nxt[axis] = slice(1, None)
+            nxt = tuple(nxt)
+
+            joined = (indexed[curr] & (phases[curr] == phases[nxt]) &
+                      (axisMisOri[curr] < pointBoundDef[curr]))
+            nodesA.append(pointIds[curr][joined])
+            nodesB.append(pointIds[nxt][joined])
+
+        labels = base.connectedComponents(
+            self.xDim * self.yDim, np.concatenate(nodesA), np.concatenate(nodesB)
+        )
+        yield 0.75
+
+        # number regions of indexed points from 1, with non-indexed points
+        # set to -2, then remove small grains
+        indexed = indexed.ravel()
+        regionIds = np.zeros(labels.max() + 1, dtype=int)
+        regionIds[labels[indexed]] = 1
+        regionIds = np.cumsum(regionIds)
+        labels = np.where(indexed, regionIds[labels], -2)
+        labels = labels.reshape(self.yDim, self.xDim)
+
+        # boundary image of the regions, as given by findBoundaries for
+        # the same boundDef, used by the neighbour network, proxigram and
+        # to find grains in linked DIC maps
+        edgesX, edgesY = base.labelEdges(labels)
+        boundaries = np.zeros(labels.shape, dtype=bool)
+        boundaries[:, :-1] |= edgesX
+        boundaries[:-1] |= edgesY
+        self.boundaries = -boundaries.astype(int)
+
+        self.setComponents(labels, self.buildGrains(labels))
+        self.filterGrains(minGrainSize)
+
+    def filterGrains(self, minGrainSize=10, absorb=False):
+        """Remove grains smaller than a minimum size from the regions
+        found by findGrains, without finding grains again, then find the
+        boundary lines of the new grain map. See
+        :func:`defdap.base.Map.filterGrains`. Grains of linked DIC maps
+        must be linked again with :func:`defdap.hrdic.Map.linkEbsdGrains`.
+
+        Parameters
+        ----------
+        minGrainSize : int
+            Minimum grain area in pixels.
+        absorb : bool
+            If True, regions smaller than the minimum size are added to
+            their largest neighbouring grain.
+
+        Returns
+        -------
+        numpy.ndarray
+            Grain ID of each region found by findGrains, -1 if removed.
+
+        """
+        newIds = super(Map, self).filterGrains(minGrainSize, absorb=absorb)
+        self.findGrainBoundaryLines()
+
+        return newIds
+
+    @reportProgress("merging grains")
+    def mergeGrains(self, maxMisOri=None, relation=None, tolerance=5,
+                    predicate=None):
+        """Merge neighbouring grains, for example to combine twins with
+        their parent grain or to remove low angle boundaries, without
+        finding grains again. Neighbouring grains are merged if any of the
+        given criteria are met, using the average grain orientations, and
+        grains connected by merged pairs become a single grain. The grain
+        map is relabelled in one pass with grains numbered in order of
+        their lowest original ID. Boundary lines are found again from the
+        grain map but the boundary image is not changed. Grains that
+        are not merged keep their calculated data, merged grains are new
+        grains so their average orientation is calculated again when
+        needed.
+
+        Grains of DIC maps linked to this map still refer to the grains
+        before merging, so must be linked again with
+        :func:`defdap.hrdic.Map.linkEbsdGrains`. DIC grains are found from
+        the boundary image so are not merged themselves.
+
+        Parameters
+        ----------
+        maxMisOri : float, optional
+            Merge grains with a misorientation below this, in degrees.
+        relation : defdap.quat.Quat, optional
+            Merge grains with this misorientation between them, i.e. a CSL
+            relationship such as Quat.fromAxisAngle([1, 1, 1], np.pi / 3)
+            for twins in cubic materials.
+        tolerance : float
+            Maximum deviation from the relation in degrees.
+        predicate : callable, optional
+            Function taking two neighbouring grains and returning True if
+            they should be merged.
+
+        Returns
+        -------
+        numpy.ndarray
+            New ID of each original grain.
+
+        """
+        # Check that grains have been detected in the map
+        self.checkGrainsDetected()
+
+        pairs = self.grainAdjacency()
+        merge = np.zeros(len(pairs), dtype=bool)
+        yield 0.2
+
+        if maxMisOri is not None or relation is not None:
+            for grain in self:
+                if grain.refOri is None:
+                    grain.calcAverageOri()
+
+            # misorientation between average orientations of each pair
+            misOris = np.array([
+                (self[idB].refOri * self[idA].refOri.conjugate).quatCoef
+                for idA, idB in pairs
+            ]).reshape((-1, 4))
+
+            criteria = []
+            if maxMisOri is not None:
+                criteria.append((Quat(1., 0., 0., 0.), maxMisOri))
+            if relation is not None:
+                criteria.append((relation, tolerance))
+            for target, maxDeviation in criteria:
+                merge |= self.misOriDeviation(misOris, target) < maxDeviation
+        yield 0.5
+
+        if predicate is not None:
+            for i, (idA, idB) in enumerate(pairs):
+                if not merge[i]:
+                    merge[i] = predicate(self[idA], self[idB])
+        yield 0.7
+
+        newIds = base.connectedComponents(len(self), pairs[merge, 0],
+                                          pairs[merge, 1])
+
+        # relabel grain map, grain images start labeling at 1
+        self.grains = np.where(
+            self.grains > 0, (newIds + 1)[np.maximum(self.grains, 1) - 1],
+            self.grains
+        )
+
+        # combine points of merged grains, other grains are kept as they are
+        groups = [[] for _ in range(newIds.max() + 1)]
+        for oldId, newId in enumerate(newIds):
+            groups[newId].append(self.grainList[oldId])
+        self.grainList = [group[0] if len(group) == 1
+                          else self.combineGrains(group)
+                          for group in groups]
+
+        # later filtering starts from the merged grains
+        self.setComponents(self.grains, self.grainList)
+        self.findGrainBoundaryLines()
+
+        self.neighbourNetwork = None
+        self.proxigramArr = None
+        self.grainGeometryData = None
+        self.grainAttributeData = None
+
+        return newIds
+
+    def misOriDeviation(self, misOris, target):
+        """Angle between misorientations and a target misorientation,
+        taking into account the symmetries of the crystal on both sides.
+
+        Parameters
+        ----------
+        misOris : numpy.ndarray
+            Quat components of misorientations, shape (n, 4).
+        target : defdap.quat.Quat
+            Target misorientation, the identity gives the misorientation
+            angles.
+
+        Returns
+        -------
+        numpy.ndarray
+            Deviation from the target in degrees.
+
+        """
+        syms = Quat.symEqv(self.crystalSym)
+        # all equivalents of the target, the dot product of these with a
+        # misorientation is the cosine of half the angle between them
+        targetEqvs = np.array([(symB.conjugate * target * symA).quatCoef
+                               for symA in syms for symB in syms])
+
+        cosHalfAngle = np.max(np.abs(np.einsum(
+            "ij,kj->ik", targetEqvs, np.asarray(misOris)
+        )), axis=0)
+        cosHalfAngle[cosHalfAngle > 1] = 1
+
+        return 360 * np.arccos(cosHalfAngle) / np.pi
+
+    def combineGrains(self, grains):
+        """Create a grain from the points of several grains.
+
+        Parameters
+        ----------
+        grains : list(defdap.ebsd.Grain)
+
+        Returns
+        -------
+        defdap.ebsd.Grain
+
+        """
+        grain = Grain(self)
+        for part in grains:
+            grain.coordList += part.coordList
+            grain.quatList += part.quatList
+
+        return grain
+
+    def grainTable(self, perSlipSystem=False):
+        """Table of the size and shape of each grain from grainGeometry,
+        with the results already calculated for the grains from
+        grainResultColumns.
+
+        Parameters
+        ----------
+        perSlipSystem : bool
+            Give a row for each slip system of each grain, with the
+            columns from slipSystemColumns.
+
+        Returns
+        -------
+        pandas.DataFrame
+
+        """
+        grainIds = np.arange(len(self))
+        columns = OrderedDict(grainId=grainIds)
+        columns.update(self.grainGeometry)
+        columns.update(self.grainResultColumns(grainIds))
+
+        if perSlipSystem:
+            index, systemColumns = self.slipSystemColumns(grainIds)
+            columns = OrderedDict((key, value[index])
+                                  for key, value in columns.items())
+            columns.update(systemColumns)
+
+        return pd.DataFrame(columns)
+
+    def grainResultColumns(self, grainIds):
+        """Columns of the results calculated for the given grains:
+        quaternion components (q0, q1, q2, q3) and Euler angles (eul1,
+        eul2, eul3 in degrees) of the average orientation, average
+        misorientation (averageMisOri), mean grain reference orientation
+        deviation (meanGROD in degrees) and maximum Schmid factor (maxSF).
+        Results that have not been calculated for any of the grains are
+        left out and are NaN for grains they have not been calculated for.
+
+        Parameters
+        ----------
+        grainIds : list of int
+            IDs of the grains.
+
+        Returns
+        -------
+        collections.OrderedDict of numpy.ndarray
+
+        """
+        grains = [self[grainId] for grainId in grainIds]
+        columns = OrderedDict()
+
+        if any(grain.refOri is not None for grain in grains):
+            quats = np.array([
+                np.full(4, np.nan) if grain.refOri is None
+                else grain.refOri.quatCoef for grain in grains
+            ]).reshape((-1, 4))
+            for i in range(4):
+                columns['q{}'.format(i)] = quats[:, i]
+            eulers = np.array([
+                np.full(3, np.nan) if grain.refOri is None
+                else grain.refOri.eulerAngles() for grain in grains
+            ]).reshape((-1, 3)) * 180 / np.pi
+            for i in range(3):
+                columns['eul{}'.format(i + 1)] = eulers[:, i]
+
+        if any(grain.averageMisOri is not None for grain in grains):
+            columns['averageMisOri'] = np.array([
+                np.nan if grain.averageMisOri is None
+                else grain.averageMisOri for grain in grains
+            ], dtype=float)
+            # misorientations are stored as cosine of half the angle
+            columns['meanGROD'] = np.array([
+                np.nan if grain.misOriList is None
+                else np.mean(360 * np.arccos(np.minimum(grain.misOriList, 1))
+                             / np.pi) for grain in grains
+            ], dtype=float)
+
+        if any(grain.averageSchmidFactors is not None for grain in grains):
+            columns['maxSF'] = np.array([
+                np.nan if grain.averageSchmidFactors is None
+                else max(sf for sfGroup in grain.averageSchmidFactors
+                         for sf in sfGroup) for grain in grains
+            ], dtype=float)
+
+        return columns
+
+    def slipSystemColumns(self, grainIds):
+        """Columns with a row for each slip system of the given grains:
+        index of the slip plane and slip system within the plane, their
+        labels, average Schmid factor and slip trace angle in degrees.
+        Schmid factors and trace angles are NaN for grains they have not
+        been calculated for.
+
+        Parameters
+        ----------
+        grainIds : list of int
+            IDs of the grains.
+
+        Returns
+        -------
+        numpy.ndarray
+            Index in grainIds of the grain for each row.
+        collections.OrderedDict of numpy.ndarray
+
+        """
+        if self.slipSystems is None:
+            raise Exception("Slip systems must be loaded first.")
+
+        planeIds, systemIds = np.array([
+            (i, j) for i, ssGroup in enumerate(self.slipSystems)
+            for j in range(len(ssGroup))
+        ]).T
+        numSystems = len(planeIds)
+
+        grains = [self[grainId] for grainId in grainIds]
+        schmidFactors = np.full((len(grains), numSystems), np.nan)
+        traceAngles = np.full((len(grains), numSystems), np.nan)
+        for i, grain in enumerate(grains):
+            if grain.averageSchmidFactors is not None:
+                schmidFactors[i] = [sf for sfGroup in grain.averageSchmidFactors
+                                    for sf in sfGroup]
+            if grain.slipTraceAngles is not None:
+                traceAngles[i] = np.rad2deg(grain.slipTraceAngles)[planeIds]
+
+        columns = OrderedDict()
+        columns['slipPlane'] = np.tile(planeIds, len(grains))
+        columns['slipSystem'] = np.tile(systemIds, len(grains))
+        columns['planeLabel'] = np.tile([
+            ss.slipPlaneLabel for ssGroup in self.slipSystems for ss in ssGroup
+        ], len(grains))
+        columns['dirLabel'] = np.tile([
+            ss.slipDirLabel for ssGroup in self.slipSystems for ss in ssGroup
+        ], len(grains))
+        columns['schmidFactor'] = schmidFactors.ravel()
+        columns['traceAngle'] = traceAngles.ravel()
+
+        return np.repeat(np.arange(len(grains)), numSystems), columns
+
+    def exportMapData(self, fileName, fields=None, **kwargs):
+        """Write a table with a row for each point in the map to a file.
+        See :func:`defdap.base.Map.exportMapData`.
+
+        Parameters
+        ----------
+        fileName : str
+            Path of the file to write.
+        fields : dict, optional
+            Map data to write, keyed by column name. Defaults to phase,
+            Euler angles (eul1, eul2, eul3 in degrees) and band contrast.
+        kwargs
+            Other arguments are passed to
+            :func:`defdap.base.Map.exportMapData`.
+
+        """
+        if fields is None:
+            fields = OrderedDict()
+            fields['phase'] = self.phaseArray
+            fields['eul'] = self.eulerAngleArray * 180 / np.pi
+            fields['bandContrast'] = self.bandContrastArray
+
+        super(Map, self).exportMapData(fileName, fields, **kwargs)
+
+    def buildGrains(self, grains):
+        """Create grains from a grain map, with the points of each grain
+        in raster order.
+
+        Parameters
+        ----------
+        grains : numpy.ndarray
+            Grain map with IDs starting at 1 and values below 1 for points
+            not in a grain.
+
+        Returns
+        -------
+        list(defdap.ebsd.Grain)
+
+        """
+        grains = grains.ravel()
+        points = np.flatnonzero(grains > 0)
+        if len(points) == 0:
+            return []
+        points = points[np.argsort(grains[points], kind='stable')]
+        splits = np.cumsum(np.bincount(grains[points])[1:-1])
+
+        y, x = np.divmod(points, self.xDim)
+        coords = list(zip(x.tolist(), y.tolist()))
+        quats = self.quatArray.ravel()[points].tolist()
+
+        grainList = []
+        for start, end in zip(np.concatenate(([0], splits)),
+                              np.concatenate((splits, [len(points)]))):
+            grain = Grain(self)
+            grain.coordList = coords[start:end]
+            grain.quatList = quats[start:end]
+            grainList.append(grain)
+
+        return grainList
+
     def plotGrainMap(self, **kwargs):
         """Plot a map with grains coloured.
 
@@ -873,6 +1450,95 @@ class Map(base.Map):
             # report progress
             yield (iGrain + 1) / numGrains
 
+        self.grainOriIndexData = None
+
+    @property
+    def grainOriIndex(self):
+        """Orientation index of the grain average orientations, built
+        again if the grains have changed.
+
+        Returns
+        -------
+        defdap.quat.OrientationIndex
+
+        """
+        if (self.grainOriIndexData is None or
+                self.grainOriIndexData[0] is not self.grainList):
+            self.calcGrainOriIndex()
+
+        return self.grainOriIndexData[1]
+
+    def calcGrainOriIndex(self):
+        """Build an orientation index of the grain average orientations,
+        for finding grains by orientation. Average orientations are
+        calculated for any grains without one.
+
+        """
+        # Check that grains have been detected in the map
+        self.checkGrainsDetected()
+
+        for grain in self:
+            if grain.refOri is None:
+                grain.calcAverageOri()
+
+        index = OrientationIndex([grain.refOri for grain in self],
+                                 self.crystalSym)
+        self.grainOriIndexData = (self.grainList, index)
+
+    def grainsNearOri(self, ori, maxAngle):
+        """Find grains with an average orientation within a
+        disorientation angle of an orientation.
+
+        Parameters
+        ----------
+        ori : defdap.quat.Quat
+            Orientation to search around.
+        maxAngle : float
+            Maximum disorientation angle in degrees.
+
+        Returns
+        -------
+        numpy.ndarray
+            IDs of the grains, in order.
+
+        """
+        return self.grainOriIndex.queryRadius(ori, maxAngle)
+
+    def matchGrainOris(self, otherMap, maxAngle=5):
+        """Find the grain in this map closest in average orientation to
+        each grain in another map, for example to find corresponding
+        grains across maps.
+
+        Parameters
+        ----------
+        otherMap : defdap.ebsd.Map
+            Map with grains to match.
+        maxAngle : float
+            Maximum disorientation angle in degrees for a match.
+
+        Returns
+        -------
+        numpy.ndarray
+            ID of the matched grain in this map for each grain in the
+            other map, -1 if there is no match.
+        numpy.ndarray
+            Disorientation angle of each match in degrees.
+
+        """
+        otherMap.checkGrainsDetected()
+        for grain in otherMap:
+            if grain.refOri is None:
+                grain.calcAverageOri()
+
+        grainIds, angles = self.grainOriIndex.query(
+            [grain.refOri for grain in otherMap], k=1
+        )
+        grainIds = grainIds[:, 0]
+        angles = angles[:, 0]
+        grainIds[~(angles <= maxAngle)] = -1
+
+        return grainIds, angles
+
     @reportProgress("calculating grain misorientations")
     def calcGrainMisOri(self, calcAxis=False):
         """Calculate the misorientation within grains.
@@ -913,19 +1579,25 @@ class Map(base.Map):
 
         self.misOri = np.ones([self.yDim, self.xDim])
 
+        # coordinates of all points in grains, in the same order as the
+        # per point values stored in the grains
+        coords = np.concatenate([grain.coordList for grain in self.grainList])
+
         if component in [1, 2, 3]:
-            for grain in self.grainList:
-                for coord, misOriAxis in zip(grain.coordList, np.array(grain.misOriAxisList)):
-                    self.misOri[coord[1], coord[0]] = misOriAxis[component - 1]
+            misOriAxis = np.concatenate(
+                [grain.misOriAxisList for grain in self.grainList]
+            )
+            self.misOri[coords[:, 1], coords[:, 0]] = \
+                misOriAxis[:, component - 1]
 
             misOri = self.misOri * 180 / np.pi
             clabel = "Rotation around {:} axis ($^\circ$)".format(
                 ['X', 'Y', 'Z'][component-1]
             )
         else:
-            for grain in self.grainList:
-                for coord, misOri in zip(grain.coordList, grain.misOriList):
-                    self.misOri[coord[1], coord[0]] = misOri
+            self.misOri[coords[:, 1], coords[:, 0]] = np.concatenate(
+                [grain.misOriList for grain in self.grainList]
+            )
 
             misOri = np.arccos(self.misOri) * 360 / np.pi
             clabel = "Grain reference orienation deviation (GROD) ($^\circ$)"
@@ -1028,11 +1700,11 @@ class Map(base.Map):
 
         # Check that grains have been detected in the map
         self.checkGrainsDetected()
-        self.averageSchmidFactor = np.zeros([self.yDim, self.xDim])
 
         if self[0].averageSchmidFactors is None:
             raise Exception("Run 'calcAverageGrainSchmidFactors' first")
 
+        grainSchmidFactors = []
         for grain in self.grainList:
             currentSchmidFactor = []
 
@@ -1053,10 +1725,12 @@ class Map(base.Map):
             else:
                 currentSchmidFactor = [max(s) for s in zip(*grain.averageSchmidFactors)]
 
-            # Fill grain with colour
-            for coord in grain.coordList:
-                self.averageSchmidFactor[coord[1], coord[0]] = currentSchmidFactor[0]
+            grainSchmidFactors.append(currentSchmidFactor[0])
 
+        # Fill grains with colour
+        self.averageSchmidFactor = self.grainDataToMapData(
+            np.array(grainSchmidFactors, dtype=float), bg=0
+        )
         self.averageSchmidFactor[self.averageSchmidFactor == 0] = 0.5
 
         plot = MapPlot.create(self, self.averageSchmidFactor, **plotParams)
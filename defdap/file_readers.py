@@ -304,7 +304,7 @@ class DICDataLoader(object):
 
         return self.loadedMetadata
 
-    def loadDavisData(self, fileName, fileDir=""):
+    def loadDavisData(self, fileName, fileDir="", displacementsOnly=False):
         """ Load displacement data from Davis .txt file containing x and y coordinates
         and x and y displacements for each coordinate.
 
@@ -314,6 +314,9 @@ class DICDataLoader(object):
             File name.
         fileDir : str
             Path to file.
+        displacementsOnly : bool
+            Only read the displacement columns, the size of the data is
+            then checked against the metadata instead of the coordinates.
 
         Returns
         -------
@@ -325,6 +328,18 @@ class DICDataLoader(object):
         if not filePath.is_file():
             raise FileNotFoundError("Cannot open file {}".format(filePath))
 
+        if displacementsOnly:
+            data = pd.read_table(str(filePath), delimiter='\t', skiprows=1,
+                                 header=None, usecols=[2, 3])
+            self.loadedData['xd'] = data.values[:, 0]
+            self.loadedData['yd'] = data.values[:, 1]
+
+            assert len(data) == (self.loadedMetadata['xDim'] *
+                                 self.loadedMetadata['yDim']), \
+                "Dimensions of data and header do not match"
+
+            return self.loadedData
+
         data = pd.read_table(str(filePath), delimiter='\t', skiprows=1, header=None)
         # x and y coordinates
         self.loadedData['xc'] = data.values[:, 0]
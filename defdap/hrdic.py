@@ -16,21 +16,25 @@
 import numpy as np
 from matplotlib.pyplot import imread
 import inspect
+import functools
+from collections import OrderedDict
 
 from skimage import transform as tf
 from skimage import morphology as mph
 
 from scipy.stats import mode
+from scipy import ndimage
 
 import peakutils
+import pandas as pd
 
 from defdap.file_readers import DICDataLoader
 from defdap import base
 from defdap.quat import Quat
 
 from defdap.plotting import MapPlot, GrainPlot
-from defdap.inspector import GrainInspector
-from defdap.utils import reportProgress
+from defdap.inspector import GrainInspector, rdrFromLines, slipBandLines
+from defdap.utils import reportProgress, parallelMap
 
 
 class Map(base.Map):
@@ -66,6 +70,9 @@ class Map(base.Map):
         Transform from EBSD to DIC coordinates.
     ebsdTransformInv : various
         Transform from DIC to EBSD coordinates.
+    ebsdPixelIndexArr : numpy.ndarray
+        Flat index of the nearest EBSD pixel for each (cropped) DIC
+        pixel, -1 where outside the EBSD map.
     currGrainId : int
         ID of last selected grain.
     ebsdGrainIds : list
@@ -101,6 +108,12 @@ class Map(base.Map):
         Max shear component np.sqrt(((e11 - e22) / 2.)**2 + e12**2).
     cropDists : numpy.ndarray
         Crop distances (default all zeros).
+    slipBandAngles : list(numpy.ndarray)
+        Slip band angles detected in each grain (radians).
+    slipBandIntensities : list(numpy.ndarray)
+        Profile intensity of slip bands detected in each grain.
+    numSlipBands : numpy.ndarray
+        Number of slip bands detected in each grain.
 
     """
     def __init__(self, path, fname, dataType=None):
@@ -136,6 +149,7 @@ class Map(base.Map):
         self.ebsdMap = None                 # EBSD map linked to DIC map
         self.ebsdTransform = None           # Transform from EBSD to DIC coordinates
         self.ebsdTransformInv = None        # Transform from DIC to EBSD coordinates
+        self.ebsdPixelIndexArr = None       # EBSD pixel index of each DIC pixel
         self.currGrainId = None             # ID of last selected grain
         self.ebsdGrainIds = None
         self.patternImPath = None           # Path to BSE image of map
@@ -149,6 +163,10 @@ class Map(base.Map):
         self.path = path                    # file path
         self.fname = fname                  # file name
 
+        self.slipBandAngles = None          # slip bands detected in grains
+        self.slipBandIntensities = None
+        self.numSlipBands = None
+
         self.loadData(path, fname, dataType=dataType)
   
         # *dim are full size of data. *Dim are size after cropping
@@ -157,24 +175,13 @@ class Map(base.Map):
         
         self.x_map = self._map(self.xd)     # u displacement component along x
         self.y_map = self._map(self.yd)     # v displacement component along x
-        xDispGrad = self._grad(self.x_map)  #d/dy is first term, d/dx is second
-        yDispGrad = self._grad(self.y_map)
-
-        # Deformation gradient
-        self.f11 = xDispGrad[1] + 1
-        self.f22 = yDispGrad[0] + 1
-        self.f12 = xDispGrad[0]
-        self.f21 = yDispGrad[1]
-
-        # Green strain
-        self.e11 = xDispGrad[1] + \
-                   0.5*(xDispGrad[1]*xDispGrad[1] + yDispGrad[1]*yDispGrad[1])
-        self.e22 = yDispGrad[0] + \
-                   0.5*(xDispGrad[0]*xDispGrad[0] + yDispGrad[0]*yDispGrad[0])
-        self.e12 = 0.5*(xDispGrad[0] + yDispGrad[1] +
-                        xDispGrad[1]*xDispGrad[0] + yDispGrad[1]*yDispGrad[0])
-        # max shear component
-        self.eMaxShear = np.sqrt(((self.e11 - self.e22) / 2.)**2 + self.e12**2)
+
+        # Deformation gradient (f11, f22, f12, f21), Green strain (e11,
+        # e22, e12) and max shear component (eMaxShear)
+        fields = calcStrainFields(self.x_map, self.y_map,
+                                  min(abs(np.diff(self.xc))))
+        for component, fieldData in fields.items():
+            setattr(self, component, fieldData)
 
         # crop distances (default all zeros)
         self.cropDists = np.array(((0, 0), (0, 0)), dtype=int)
@@ -260,11 +267,6 @@ class Map(base.Map):
         data_map = np.reshape(np.array(data_col), (self.ydim, self.xdim))
         return data_map
 
-    def _grad(self, data_map):
-        grad_step = min(abs((np.diff(self.xc))))
-        data_grad = np.gradient(data_map, grad_step, grad_step)
-        return data_grad
-
     def retrieveName(self):
         """Gets the first name assigned to the a map, as a string
 
@@ -295,7 +297,89 @@ class Map(base.Map):
 
         return self.bseScale * self.binning
 
-    def printStatsTable(self, percentiles, components):
+    def calcStats(self, stats, components, perGrain=False,
+                  asDataFrame=True):
+        """Calculate statistics of map components. Percentiles for each
+        component are found together from a single partial sort of the
+        data, and per grain statistics from a single sort of the data by
+        grain label. Non finite values are ignored.
+
+        Parameters
+        ----------
+        stats : list
+            Statistics to calculate, each either a percentile (number) or
+            one of Min, Max, Mean, Std, Skew or Kurt.
+        components : list(str)
+            Map components to calculate statistics of i.e. e11, mss,
+            eMaxShear or any other attribute of the map with the shape of
+            the map data.
+        perGrain : bool, optional
+            Calculate statistics for each grain rather than the whole map.
+        asDataFrame : bool, optional
+            Return a pandas DataFrame, otherwise a numpy record array.
+
+        Returns
+        -------
+        pandas.DataFrame or numpy.recarray
+            One row per component (and grain if perGrain). Columns are
+            the component name, grain ID (if perGrain), number of points
+            and each statistic, with percentiles named P<number>.
+
+        """
+        if perGrain:
+            # Check that grains have been detected in the map
+            self.checkGrainsDetected()
+
+        statNames = [self._statName(stat) for stat in stats]
+        columns = {'component': []}
+        if perGrain:
+            columns['grainId'] = []
+        columns['numPoints'] = []
+        for statName in statNames:
+            columns[statName] = []
+
+        for component in components:
+            mapData = self.crop(self._statComponent(component))
+            if perGrain:
+                grainIds, numPoints, values = groupedStats(
+                    mapData, self.grains, len(self), stats
+                )
+                columns['grainId'].append(grainIds)
+            else:
+                numPoints, values = arrayStats(mapData, stats)
+                numPoints = np.array([numPoints])
+                values = [np.array([value]) for value in values]
+
+            columns['component'].append(np.full(len(numPoints), component))
+            columns['numPoints'].append(numPoints)
+            for statName, value in zip(statNames, values):
+                columns[statName].append(value)
+
+        columns = {key: np.concatenate(value) if value else np.array([])
+                   for key, value in columns.items()}
+
+        if asDataFrame:
+            return pd.DataFrame(columns)
+        return np.rec.fromarrays(list(columns.values()),
+                                 names=list(columns.keys()))
+
+    def _statComponent(self, component):
+        if component == 'mss':
+            component = 'eMaxShear'
+        mapData = getattr(self, component, None)
+        if not isinstance(mapData, np.ndarray) or \
+                mapData.shape != (self.ydim, self.xdim):
+            raise ValueError("Unknown map component '{}'.".format(component))
+
+        return mapData
+
+    @staticmethod
+    def _statName(stat):
+        if stat in _MOMENT_STATS or stat in ('Min', 'Max'):
+            return stat
+        return "P{0}".format(stat)
+
+    def printStatsTable(self, percentiles, components, scale=100):
         """Print out a statistics table for a DIC map
 
         Parameters
@@ -304,8 +388,11 @@ class Map(base.Map):
             list of percentiles to print (number, Min, Mean or Max).
         components : list(str)
             list of map components to print i.e. f11, mss.
+        scale : float, optional
+            Factor to scale values by, default gives strains in percent.
 
         """
+        table = self.calcStats(percentiles, components)
 
         # Print map info
         print('\033[1m', end='')    # START BOLD
@@ -318,37 +405,16 @@ class Map(base.Map):
         # Print table header
         print("Component\t".format(), end="")
         for x in percentiles:
-            if x == 'Min' or x == 'Mean' or x == 'Max':
-                print("{0}\t".format(x), end='')
-            else:
-                print("P{0}\t".format(x), end='')
+            print("{0}\t".format(self._statName(x)), end='')
         print('\033[0m', end='')    # END BOLD
         print()
 
         # Print table
-        for c in components:
-            selmap = []
-            if c == 'mss':
-                selmap = self.crop(self.eMaxShear) * 100
-            if c == 'e11':
-                selmap = self.crop(self.e11) * 100
-            if c == 'e12':
-                selmap = self.crop(self.e12) * 100
-            if c == 'e22':
-                selmap = self.crop(self.e22) * 100
-            plist = []
-            for p in percentiles:
-                if p == 'Min':
-                    plist.append(np.min(selmap))
-                elif p == 'Mean':
-                    plist.append(np.mean(selmap))
-                elif p == 'Max':
-                    plist.append(np.max(selmap))
-                else:
-                    plist.append(np.percentile(selmap, p))
-            print("{0}\t\t".format(c), end="")
-            for l in plist:
-                print("{0:.2f}\t".format(l), end='')
+        for _, row in table.iterrows():
+            print("{0}\t\t".format(row['component']), end="")
+            for x in percentiles:
+                print("{0:.2f}\t".format(row[self._statName(x)] * scale),
+                      end='')
             print()
         print()
 
@@ -395,6 +461,9 @@ class Map(base.Map):
         self.xDim = self.xdim - self.cropDists[0, 0] - self.cropDists[0, 1]
         self.yDim = self.ydim - self.cropDists[1, 0] - self.cropDists[1, 1]
 
+        # pixel mapping to the EBSD map depends on the crop
+        self.ebsdPixelIndexArr = None
+
     def crop(self, mapData, binned=True):
         """ Crop given data using crop parameters stored in map
         i.e. cropped_data = DicMap.crop(DicMap.data_to_crop).
@@ -464,6 +533,7 @@ class Map(base.Map):
 
         """
         self.ebsdMap = ebsdMap
+        self.ebsdPixelIndexArr = None
         if transformType.lower() == "piecewiseaffine":
             self.ebsdTransform = tf.PiecewiseAffineTransform()
             self.ebsdTransformInv = self.ebsdTransform.inverse
@@ -569,6 +639,106 @@ class Map(base.Map):
         # return map
         return warpedMap
 
+    @property
+    def ebsdPixelIndex(self):
+        """Flat index of the nearest EBSD pixel for each DIC pixel.
+
+        Returns
+        -------
+        numpy.ndarray
+            Array of shape (yDim, xDim), -1 where outside the EBSD map.
+
+        """
+        self.calcEbsdPixelIndex(forceCalc=False)
+
+        return self.ebsdPixelIndexArr
+
+    def calcEbsdPixelIndex(self, forceCalc=True):
+        """Calculate the nearest neighbour mapping from each pixel in the
+        (cropped) DIC map to a pixel in the linked EBSD map, using the
+        EBSD transform. Stores result in self.ebsdPixelIndexArr.
+
+        Parameters
+        ----------
+        forceCalc : bool, optional
+            Force calculation even if ebsdPixelIndexArr is populated.
+
+        """
+        # Check a EBSD map is linked
+        self.checkEbsdLinked()
+
+        if self.ebsdPixelIndexArr is not None and not forceCalc:
+            return
+
+        # (x, y) coordinates of every DIC pixel, which the EBSD transform
+        # maps to (x, y) coordinates in the EBSD map
+        yDic, xDic = np.indices((self.yDim, self.xDim))
+        dicCoords = np.column_stack((xDic.ravel(), yDic.ravel())).astype(float)
+        ebsdCoords = self.ebsdTransform(dicCoords)
+
+        # points outside the transform (e.g. piecewise affine hull) are
+        # returned as nan or -1
+        with np.errstate(invalid='ignore'):
+            ebsdCoords = np.round(ebsdCoords)
+            inMap = np.logical_and.reduce((
+                np.isfinite(ebsdCoords).all(axis=1),
+                ebsdCoords[:, 0] >= 0, ebsdCoords[:, 0] < self.ebsdMap.xDim,
+                ebsdCoords[:, 1] >= 0, ebsdCoords[:, 1] < self.ebsdMap.yDim
+            ))
+
+        pixelIndex = np.full(self.yDim * self.xDim, -1, dtype=np.int64)
+        pixelIndex[inMap] = np.ravel_multi_index(
+            (ebsdCoords[inMap, 1].astype(int), ebsdCoords[inMap, 0].astype(int)),
+            (self.ebsdMap.yDim, self.ebsdMap.xDim)
+        )
+
+        self.ebsdPixelIndexArr = pixelIndex.reshape((self.yDim, self.xDim))
+
+    def gatherToDicFrame(self, mapData, bg=None):
+        """Transfer EBSD map data to the (cropped) DIC frame by taking the
+        value of the nearest EBSD pixel. No interpolation is performed so
+        any data type can be used, i.e. quaternion components, phase IDs,
+        grain labels or arrays of defdap.quat.Quat objects.
+
+        Parameters
+        ----------
+        mapData : numpy.ndarray
+            EBSD map data to transfer, shape (..., yDim, xDim) of the EBSD
+            map. Any leading axes (i.e. components) are kept.
+        bg : various, optional
+            Value for DIC pixels outside the EBSD map. Defaults to nan for
+            float data, None for object data and 0 otherwise.
+
+        Returns
+        -------
+        numpy.ndarray
+            Data in the DIC frame, shape (..., yDim, xDim) of the DIC map.
+
+        """
+        mapData = np.asarray(mapData)
+        pixelIndex = self.ebsdPixelIndex
+        mapShape = (self.ebsdMap.yDim, self.ebsdMap.xDim)
+
+        if mapData.shape[-2:] != mapShape:
+            raise ValueError("Data must be the same size as the EBSD map.")
+
+        if bg is None:
+            if mapData.dtype.kind == 'f':
+                bg = np.nan
+            elif mapData.dtype.kind == 'O':
+                bg = None
+            else:
+                bg = 0
+
+        mapData = mapData.reshape(mapData.shape[:-2] + (-1,))
+        inMap = pixelIndex >= 0
+
+        gatheredData = np.full(mapData.shape[:-1] + pixelIndex.shape, bg,
+                               dtype=mapData.dtype)
+        gatheredData[..., inMap] = mapData[..., pixelIndex[inMap]]
+
+        return gatheredData
+
     @property
     def boundaries(self):
         """Returns EBSD map grain boundaries warped to DIC frame.
@@ -600,6 +770,39 @@ class Map(base.Map):
 
         return boundaries
 
+    @property
+    def boundaryLines(self):
+        """Returns EBSD map grain boundary lines transformed to the DIC
+        frame, as a list of the points (x, y) of each line. None if the
+        EBSD map has no boundary lines.
+
+        """
+        # Check a EBSD map is linked
+        self.checkEbsdLinked()
+
+        ebsdLines = self.ebsdMap.boundaryLines
+        if ebsdLines is None:
+            return None
+        if len(ebsdLines) == 0:
+            return []
+
+        # the inverse transform maps EBSD coordinates to DIC coordinates,
+        # as used to warp images to the EBSD frame
+        dicPoints = self.ebsdTransformInv(np.concatenate(ebsdLines))
+        splits = np.cumsum([len(line) for line in ebsdLines])[:-1]
+
+        return np.split(dicPoints, splits)
+
+    @property
+    def boundaryLineMisOri(self):
+        """Returns misorientation in degrees across each boundary line.
+
+        """
+        # Check a EBSD map is linked
+        self.checkEbsdLinked()
+
+        return self.ebsdMap.boundaryLineMisOri
+
     def setPatternPath(self, filePath, windowSize):
         """Set the path to the image of the pattern.
 
@@ -707,7 +910,8 @@ class Map(base.Map):
         Parameters
         ----------
         minGrainSize : int
-            Minimum grain area in pixels.
+            Minimum grain area in pixels, this can be changed after with
+            filterGrains.
 
         """
         # Check a EBSD map is linked
@@ -716,7 +920,7 @@ class Map(base.Map):
         # Initialise the grain map
         self.grains = np.copy(self.boundaries)
 
-        self.grainList = []
+        componentList = []
 
         # List of points where no grain has been set yet
         unknownPoints = np.where(self.grains == 0)
@@ -726,7 +930,7 @@ class Map(base.Map):
         grainIndex = 1
 
         # Loop until all points (except boundaries) have been assigned
-        # to a grain or ignored
+        # to a grain. Small grains are removed after by filterGrains
         while numPoints > 0:
             # report progress
             yield 1. - numPoints / totalPoints
@@ -734,41 +938,149 @@ class Map(base.Map):
             # Flood fill first unknown point and return grain object
             currentGrain = self.floodFill(unknownPoints[1][0], unknownPoints[0][0], grainIndex)
 
-            grainSize = len(currentGrain)
-            if grainSize < minGrainSize:
-                # if grain size less than minimum, ignore grain and set
-                # values in grain map to -2
-                for coord in currentGrain.coordList:
-                    self.grains[coord[1], coord[0]] = -2
-            else:
-                # add grain and size to lists and increment grain label
-                self.grainList.append(currentGrain)
-                grainIndex += 1
+            # add grain to list and increment grain label
+            componentList.append(currentGrain)
+            grainIndex += 1
 
             # update unknown points
             unknownPoints = np.where(self.grains == 0)
             numPoints = unknownPoints[0].shape[0]
 
-        # Now link grains to those in ebsd Map
+        self.setComponents(self.grains, componentList)
+        self.filterGrains(minGrainSize)
+
+    def filterGrains(self, minGrainSize=10, absorb=False):
+        """Remove grains smaller than a minimum size from the regions
+        found by findGrains, without finding grains again, then link the
+        grains to the EBSD map. See
+        :func:`defdap.base.Map.filterGrains`.
+
+        Parameters
+        ----------
+        minGrainSize : int
+            Minimum grain area in pixels.
+        absorb : bool
+            If True, regions smaller than the minimum size are added to
+            their largest neighbouring grain.
+
+        Returns
+        -------
+        numpy.ndarray
+            Grain ID of each region found by findGrains, -1 if removed.
+
+        """
+        newIds = super(Map, self).filterGrains(minGrainSize, absorb=absorb)
+        self.linkEbsdGrains()
+
+        return newIds
+
+    def linkEbsdGrains(self):
+        """Find the corresponding grain in the EBSD map for each grain.
+        All grains are linked again, so this can be called to update the
+        links after the grains of the EBSD map are changed.
+
+        """
         # Warp DIC grain map to EBSD frame
         dicGrains = self.grains
         warpedDicGrains = tf.warp(np.ascontiguousarray(dicGrains.astype(float)), self.ebsdTransformInv,
                                   output_shape=(self.ebsdMap.yDim, self.ebsdMap.xDim), order=0).astype(int)
 
-        # Initialise list to store ID of corresponding grain in EBSD map.
-        # Also stored in grain objects
-        self.ebsdGrainIds = []
-
-        for i in range(len(self.grainList)):
+        for i, grain in enumerate(self.grainList):
             # Find grain by masking the native ebsd grain image with
             # selected grain from the warped dic grain image. The modal
             # value is the EBSD grain label.
             modeId, _ = mode(self.ebsdMap.grains[warpedDicGrains == i + 1])
 
-            self.ebsdGrainIds.append(modeId[0] - 1)
-            self.grainList[i].ebsdGrainId = modeId[0] - 1
-            self.grainList[i].ebsdGrain = self.ebsdMap.grainList[modeId[0] - 1]
-            self.grainList[i].ebsdMap = self.ebsdMap
+            grain.ebsdGrainId = modeId[0] - 1
+            grain.ebsdGrain = self.ebsdMap.grainList[modeId[0] - 1]
+            grain.ebsdMap = self.ebsdMap
+
+        # List of ID of corresponding grain in EBSD map. Also stored in
+        # grain objects
+        self.ebsdGrainIds = [grain.ebsdGrainId for grain in self.grainList]
+
+    def combineGrains(self, grains):
+        """Create a grain from the points of several grains.
+
+        Parameters
+        ----------
+        grains : list(defdap.hrdic.Grain)
+
+        Returns
+        -------
+        defdap.hrdic.Grain
+
+        """
+        grain = Grain(self)
+        for part in grains:
+            grain.coordList += part.coordList
+            grain.maxShearList += part.maxShearList
+
+        return grain
+
+    def grainTable(self, perSlipSystem=False):
+        """Table of the size and shape of each grain from grainGeometry,
+        ID of the linked EBSD grain, mean maximum shear and strain
+        components (meanMaxShear, meanE11, meanE22, meanE12) and the
+        results already calculated for the linked EBSD grains from
+        :func:`defdap.ebsd.Map.grainResultColumns`.
+
+        Parameters
+        ----------
+        perSlipSystem : bool
+            Give a row for each slip system of each grain, with the
+            columns from :func:`defdap.ebsd.Map.slipSystemColumns`.
+
+        Returns
+        -------
+        pandas.DataFrame
+
+        """
+        grainIds = np.arange(len(self))
+        ebsdGrainIds = np.array(self.ebsdGrainIds, dtype=int)
+
+        columns = OrderedDict(grainId=grainIds, ebsdGrainId=ebsdGrainIds)
+        columns.update(self.grainGeometry)
+        for name, component in (('meanMaxShear', 'eMaxShear'),
+                                ('meanE11', 'e11'), ('meanE22', 'e22'),
+                                ('meanE12', 'e12')):
+            _, _, (columns[name],) = groupedStats(
+                self.crop(getattr(self, component)), self.grains, len(self),
+                ['Mean']
+            )
+        columns.update(self.ebsdMap.grainResultColumns(ebsdGrainIds))
+
+        if perSlipSystem:
+            index, systemColumns = self.ebsdMap.slipSystemColumns(ebsdGrainIds)
+            columns = OrderedDict((key, value[index])
+                                  for key, value in columns.items())
+            columns.update(systemColumns)
+
+        return pd.DataFrame(columns)
+
+    def exportMapData(self, fileName, fields=None, **kwargs):
+        """Write a table with a row for each point in the cropped map to a
+        file. See :func:`defdap.base.Map.exportMapData`.
+
+        Parameters
+        ----------
+        fileName : str
+            Path of the file to write.
+        fields : dict, optional
+            Map data to write, keyed by column name. Defaults to the
+            strain components e11, e22, e12 and eMaxShear.
+        kwargs
+            Other arguments are passed to
+            :func:`defdap.base.Map.exportMapData`.
+
+        """
+        if fields is None:
+            fields = OrderedDict(
+                (component, self.crop(getattr(self, component)))
+                for component in ('e11', 'e22', 'e12', 'eMaxShear')
+            )
+
+        super(Map, self).exportMapData(fileName, fields, **kwargs)
 
     def floodFill(self, x, y, grainIndex):
         """Flood fill algorithm.
@@ -835,16 +1147,225 @@ class Map(base.Map):
             else:
                 edge = newedge
 
-    def runGrainInspector(self, vmax=0.1):
+    @reportProgress("detecting slip bands")
+    def calcSlipBands(self, mapData=None, grainIds=-1, thres=None,
+                      min_dist=None, angularRes=1, method="radon",
+                      numWorkers=None):
+        """Detect slip band angles in grains of the map using the Radon
+        transform or Fourier slice method. Grains are processed in
+        parallel. Results are stored in each grain and in the map
+        (slipBandAngles, slipBandIntensities and numSlipBands), which also
+        holds the results already stored in grains that are not detected
+        again.
+
+        Parameters
+        ----------
+        mapData : numpy.ndarray, optional
+            Array of map data to find bands in. This must be cropped!
+            Defaults to the max shear values stored in grains.
+        grainIds : list(int) or int, optional
+            IDs of grains to detect bands in. Use -1 for all grains.
+        thres : float, optional
+            Normalised threshold for peaks.
+        min_dist : int, optional
+            Minimum angle between bands in degrees.
+        angularRes : float, optional
+            Angular resolution of the projections in degrees.
+        method : str, {'radon', 'fourier'}
+            Method used to calculate the angular profile, see
+            :func:`defdap.hrdic.detectSlipBands`.
+        numWorkers : int, optional
+            Number of worker threads, defaults to the number of CPUs.
+
+        """
+        # Check that grains have been detected in the map
+        self.checkGrainsDetected()
+
+        if type(grainIds) is int:
+            if grainIds == -1:
+                grainIds = range(len(self))
+            else:
+                grainIds = [grainIds]
+
+        def detect(grainId):
+            grain = self[grainId]
+            if mapData is None:
+                grainMapData = grain.grainMapData(grainData=grain.maxShearList)
+            else:
+                grainMapData = grain.grainMapData(mapData=mapData)
+
+            return detectSlipBands(grainMapData, thres=thres,
+                                   min_dist=min_dist, angularRes=angularRes,
+                                   method=method)
+
+        # start from the results already stored in the grains, so grains
+        # that are not detected again keep their results
+        self.slipBandAngles = [
+            np.array([]) if grain.slipBandAngles is None
+            else grain.slipBandAngles for grain in self
+        ]
+        self.slipBandIntensities = [
+            np.array([]) if grain.slipBandIntensities is None
+            else grain.slipBandIntensities for grain in self
+        ]
+        self.numSlipBands = np.array(
+            [len(angles) for angles in self.slipBandAngles], dtype=int
+        )
+
+        numDetections = len(grainIds)
+        for i, (idx, (angles, intensities)) in enumerate(
+                parallelMap(detect, grainIds, numWorkers=numWorkers)):
+            grainId = grainIds[idx]
+            grain = self[grainId]
+            grain.slipBandAngles = angles
+            grain.slipBandIntensities = intensities
+
+            self.slipBandAngles[grainId] = angles
+            self.slipBandIntensities[grainId] = intensities
+            self.numSlipBands[grainId] = len(angles)
+
+            # report progress
+            yield (i + 1) / numDetections
+
+    @reportProgress("running slip trace analysis")
+    def runSlipTraceAnalysis(self, grainIds=-1, tolerance=5, loadVector=None,
+                             length=2.5, spacing=5, interpolate=False,
+                             numWorkers=None, **kwargs):
+        """Run slip trace analysis on grains of the map without the grain
+        inspector. Slip bands are detected in each grain with
+        calcSlipBands, matched to the theoretical slip traces of the
+        linked EBSD grain and the relative displacement ratio (RDR) is
+        calculated for each matched band, from lines parallel to the band
+        covering the grain. Grains are processed in parallel.
+
+        Parameters
+        ----------
+        grainIds : list(int) or int, optional
+            IDs of grains to analyse. Use -1 for all grains.
+        tolerance : float
+            Maximum deviation in degrees between a slip band and a slip
+            trace for the slip plane to be matched.
+        loadVector : numpy.ndarray, optional
+            Loading vector used to calculate the maximum Schmid factor.
+            Existing average Schmid factors of the EBSD grains are used
+            if not set.
+        length : float
+            Length of perpendicular lines used for RDR.
+        spacing : float
+            Distance in pixels between lines used for RDR.
+        interpolate : bool
+            If true, sample displacements at sub-pixel positions, see
+            :func:`defdap.inspector.calcRDR`.
+        numWorkers : int, optional
+            Number of worker threads, defaults to the number of CPUs.
+        kwargs
+            Other arguments are passed to calcSlipBands.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Table with a row per detected slip band and columns grainId,
+            eul1, eul2, eul3, maxSF, bandAngle, systems, deviation and
+            RDR. Angles are in degrees, systems are indexes of the matched
+            slip planes and RDR is nan for unmatched bands.
+
+        """
+        self.checkEbsdLinked()
+        if self.ebsdMap.slipSystems is None:
+            raise Exception("Slip systems must be loaded first.")
+
+        if type(grainIds) is int:
+            if grainIds == -1:
+                grainIds = range(len(self))
+            else:
+                grainIds = [grainIds]
+        grainIds = list(grainIds)
+
+        self.calcSlipBands(grainIds=grainIds, numWorkers=numWorkers, **kwargs)
+        if loadVector is not None:
+            self.ebsdMap.calcAverageGrainSchmidFactors(loadVector=loadVector)
+
+        displacements = (self.crop(self.x_map), self.crop(self.y_map))
+
+        # calculate orientations and slip traces of the linked EBSD grains
+        # before processing in parallel as DIC grains can share an EBSD
+        # grain, the workers only read them
+        ebsdGrains = {id(self[grainId].ebsdGrain): self[grainId].ebsdGrain
+                      for grainId in grainIds}
+        for ebsdGrain in ebsdGrains.values():
+            ebsdGrain.calcSlipTraces()
+
+        def analyse(grainId):
+            grain = self[grainId]
+            ebsdGrain = grain.ebsdGrain
+            traceAngles = np.rad2deg(ebsdGrain.slipTraceAngles)
+
+            eulers = ebsdGrain.refOri.eulerAngles() * 180 / np.pi
+            if ebsdGrain.averageSchmidFactors is None:
+                maxSF = np.nan
+            else:
+                maxSF = np.max([sf for sfGroup in
+                                ebsdGrain.averageSchmidFactors
+                                for sf in sfGroup])
+
+            mask = grain.grainMapData(
+                grainData=np.ones(len(grain), dtype=bool), bg=False
+            )
+
+            rows = []
+            for bandAngle in grain.slipBandAngles:
+                bandAngle = np.rad2deg(bandAngle)
+                deviations = (bandAngle - traceAngles + 90) % 180 - 90
+                systems = np.flatnonzero(np.abs(deviations) <= tolerance)
+
+                rdr = np.nan
+                if len(systems) > 0:
+                    lines = slipBandLines(mask, np.deg2rad(bandAngle),
+                                          spacing=spacing)
+                    try:
+                        linRegResults = rdrFromLines(
+                            lines, grain.extremeCoords[:2], displacements,
+                            length=length, interpolate=interpolate,
+                            mask=mask
+                        )[0]
+                        rdr = linRegResults.slope
+                    except ValueError:
+                        # no usable perpendicular lines in the grain
+                        pass
+
+                rows.append((grainId, *eulers, maxSF, bandAngle,
+                             list(systems), list(deviations[systems]), rdr))
+
+            return rows
+
+        results = [None] * len(grainIds)
+        numGrains = len(grainIds)
+        for i, (idx, rows) in enumerate(
+                parallelMap(analyse, grainIds, numWorkers=numWorkers)):
+            results[idx] = rows
+
+            # report progress
+            yield (i + 1) / numGrains
+
+        return pd.DataFrame(
+            [row for rows in results for row in rows],
+            columns=['grainId', 'eul1', 'eul2', 'eul3', 'maxSF',
+                     'bandAngle', 'systems', 'deviation', 'RDR']
+        )
+
+    def runGrainInspector(self, vmax=0.1, annotationFile=None):
         """Run the grain inspector interactive tool.
 
         Parameters
         ----------
         vmax : float
             Maximum value of the colour map.
+        annotationFile : str, optional
+            Path of a file to store drawn lines and groups in, so they
+            persist between sessions.
 
         """
-        GrainInspector(currMap=self, vmax=vmax)
+        GrainInspector(currMap=self, vmax=vmax, annotationFile=annotationFile)
 
 
 class Grain(base.Grain):
@@ -869,6 +1390,10 @@ class Grain(base.Grain):
     groupsList :
         Groups, angles and slip systems detected for
         lines drawn using defdap.inspector.GrainInspector.
+    slipBandAngles : numpy.ndarray
+        Slip band angles detected by calcSlipBands (radians).
+    slipBandIntensities : numpy.ndarray
+        Profile intensity of each slip band detected by calcSlipBands.
 
     """
     def __init__(self, dicMap):
@@ -884,6 +1409,9 @@ class Grain(base.Grain):
         self.pointsList = []        # Lines drawn for STA
         self.groupsList = []        # Unique angles drawn for STA
 
+        self.slipBandAngles = None          # Detected slip band angles
+        self.slipBandIntensities = None     # Profile intensity of bands
+
     @property
     def plotDefault(self):
         return lambda *args, **kwargs: self.plotMaxShear(
@@ -952,8 +1480,11 @@ class Grain(base.Grain):
         """
         self.ebsdGrain.calcSlipTraces(slipSystems=slipSystems)
 
-    def calcSlipBands(self, grainMapData, thres=None, min_dist=None):
-        """Use Radon transform to detect slip band angles.
+    def calcSlipBands(self, grainMapData, thres=None, min_dist=None,
+                      angularRes=1, method="radon"):
+        """Use Radon transform or Fourier slice method to detect slip
+        band angles. Detected angles
+        and peak intensities are also stored in the grain.
 
         Parameters
         ----------
@@ -963,6 +1494,11 @@ class Grain(base.Grain):
             Normalised threshold for peaks.
         min_dist : int, optional
             Minimum angle between bands.
+        angularRes : float, optional
+            Angular resolution of the projections in degrees.
+        method : str, {'radon', 'fourier'}
+            Method used to calculate the angular profile, see
+            :func:`defdap.hrdic.detectSlipBands`.
 
         Returns
         ----------
@@ -970,39 +1506,645 @@ class Grain(base.Grain):
             Detected slip band angles
 
         """
-        if thres is None:
-            thres = 0.3
-        if min_dist is None:
-            min_dist = 30
-        grainMapData = np.nan_to_num(grainMapData)
-
-        if grainMapData.min() < 0:
+        if np.nanmin(grainMapData) < 0:
             print("Negative values in data, taking absolute value.")
-            # grainMapData = grainMapData**2
-            grainMapData = np.abs(grainMapData)
-        suppGMD = np.zeros(grainMapData.shape) #array to hold shape / support of grain
-        suppGMD[grainMapData!=0]=1
-        sin_map = tf.radon(grainMapData, circle=False)
-        #profile = np.max(sin_map, axis=0) # old method
-        supp_map = tf.radon(suppGMD, circle=False)
-        supp_1 = np.zeros(supp_map.shape)
-        supp_1[supp_map>0]=1
-        mindiam = np.min(np.sum(supp_1, axis=0), axis=0) # minimum diameter of grain
-        crop_map = np.zeros(sin_map.shape)
-        # only consider radon rays that cut grain with mindiam*2/3 or more, and scale by length of the cut
-        crop_map[supp_map>mindiam*2/3] = sin_map[supp_map>mindiam*2/3]/supp_map[supp_map>mindiam*2/3] 
-        supp_crop = np.zeros(crop_map.shape)
-        supp_crop[crop_map>0] = 1
-        profile = np.sum(crop_map**4, axis=0) / np.sum(supp_crop, axis=0) # raise to power to accentuate local peaks
-
-        x = np.arange(180)
-
-        # indexes = peakutils.indexes(profile, thres=thres, min_dist=min_dist, thres_abs=False)
-        indexes = peakutils.indexes(profile, thres=thres, min_dist=min_dist)
-        peaks = x[indexes]
-        # peaks = peakutils.interpolate(x, profile, ind=indexes)
-        print("Number of bands detected: {:}".format(len(peaks)))
-
-        slipBandAngles = peaks
-        slipBandAngles = slipBandAngles * np.pi / 180
+
+        slipBandAngles, slipBandIntensities = detectSlipBands(
+            grainMapData, thres=thres, min_dist=min_dist,
+            angularRes=angularRes, method=method
+        )
+        self.slipBandAngles = slipBandAngles
+        self.slipBandIntensities = slipBandIntensities
+
         return slipBandAngles
+
+
+class MapSeries(object):
+    """
+    Class to encapsulate a series of DIC maps of the same region at
+    different load increments. One crop, EBSD link and grain
+    segmentation, set on a reference map, are shared by all increments.
+    Displacement data of the other increments is only loaded when
+    needed and strain fields are held in a least recently used cache.
+
+    Attributes
+    ----------
+    path : str
+        File path.
+    fnames : list(str)
+        File name of each increment.
+    dataType : str
+        Type of data files.
+    refIncrement : int
+        Index of the reference increment.
+    refMap : defdap.hrdic.Map
+        Map of the reference increment, holding the crop, EBSD link and
+        grains shared by the series.
+    cacheSize : int
+        Maximum number of increments to hold strain fields of.
+
+    """
+    def __init__(self, path, fnames, dataType=None, refIncrement=-1,
+                 cacheSize=8):
+        """Initialise class and import data of the reference increment.
+
+        Parameters
+        ----------
+        path : str
+            Path to files.
+        fnames : list(str)
+            Name of the file of each increment including extension, in
+            order of increment.
+        dataType : str
+            Type of data files.
+        refIncrement : int, optional
+            Index of the increment to use as the reference map, defaults
+            to the last increment.
+        cacheSize : int, optional
+            Maximum number of increments to hold strain fields of.
+
+        """
+        self.path = path
+        self.fnames = list(fnames)
+        self.dataType = "DavisText" if dataType is None else dataType
+        self.refIncrement = refIncrement % len(self.fnames)
+        self.cacheSize = cacheSize
+
+        self.refMap = Map(path, self.fnames[self.refIncrement],
+                          dataType=dataType)
+
+        self._fieldCache = OrderedDict()
+
+    def __len__(self):
+        return len(self.fnames)
+
+    @property
+    def numGrains(self):
+        return len(self.refMap)
+
+    def clearCache(self):
+        """Remove all strain fields from the cache.
+
+        """
+        self._fieldCache.clear()
+
+    def loadFrame(self, increment):
+        """Load the displacement data of an increment.
+
+        Parameters
+        ----------
+        increment : int
+            Index of the increment.
+
+        Returns
+        -------
+        numpy.ndarray, numpy.ndarray
+            Maps of the x and y displacement components (not cropped).
+
+        """
+        refMap = self.refMap
+        if increment % len(self) == self.refIncrement:
+            return refMap.x_map, refMap.y_map
+
+        dataLoader = DICDataLoader()
+        if self.dataType == "DavisText":
+            metadataDict = dataLoader.loadDavisMetadata(
+                self.fnames[increment], self.path
+            )
+            dataDict = dataLoader.loadDavisData(
+                self.fnames[increment], self.path, displacementsOnly=True
+            )
+        else:
+            raise Exception("No loader found for this DIC data.")
+
+        if (metadataDict['xDim'] != refMap.xdim or
+                metadataDict['yDim'] != refMap.ydim or
+                metadataDict['binning'] != refMap.binning):
+            raise Exception("Dimensions of increment {} do not match the "
+                            "reference map.".format(increment))
+
+        return (refMap._map(dataDict['xd']), refMap._map(dataDict['yd']))
+
+    def calcFields(self, increment):
+        """Strain fields of an increment, calculated on first use and
+        held in a least recently used cache.
+
+        Parameters
+        ----------
+        increment : int
+            Index of the increment.
+
+        Returns
+        -------
+        dict
+            Deformation gradient (f11, f22, f12, f21), Green strain (e11,
+            e22, e12) and max shear (eMaxShear) components, not cropped.
+
+        """
+        increment = increment % len(self)
+        try:
+            self._fieldCache.move_to_end(increment)
+            return self._fieldCache[increment]
+        except KeyError:
+            pass
+
+        if increment == self.refIncrement:
+            fields = {component: getattr(self.refMap, component)
+                      for component in STRAIN_COMPONENTS}
+        else:
+            xMap, yMap = self.loadFrame(increment)
+            fields = calcStrainFields(xMap, yMap,
+                                      min(abs(np.diff(self.refMap.xc))))
+
+        self._fieldCache[increment] = fields
+        while len(self._fieldCache) > max(self.cacheSize, 1):
+            self._fieldCache.popitem(last=False)
+
+        return fields
+
+    def fieldData(self, increment, component, cropped=True):
+        """Get a strain field of an increment.
+
+        Parameters
+        ----------
+        increment : int
+            Index of the increment.
+        component : str
+            Component i.e. e11, f12 or eMaxShear (mss).
+        cropped : bool, optional
+            Crop the field with the crop of the reference map.
+
+        Returns
+        -------
+        numpy.ndarray
+
+        """
+        if component == 'mss':
+            component = 'eMaxShear'
+        if component not in STRAIN_COMPONENTS:
+            raise ValueError("Unknown map component '{}'.".format(component))
+
+        fieldData = self.calcFields(increment)[component]
+        if cropped:
+            fieldData = self.refMap.crop(fieldData)
+
+        return fieldData
+
+    @reportProgress("calculating grain evolution")
+    def calcGrainEvolution(self, component='eMaxShear', stat='Mean',
+                           increments=None):
+        """Calculate a statistic of a strain component in each grain of
+        the reference map, for each increment.
+
+        Parameters
+        ----------
+        component : str, optional
+            Component i.e. e11, f12 or eMaxShear (mss).
+        stat : str or float, optional
+            Statistic to calculate, either a percentile (number) or one
+            of Min, Max, Mean, Std, Skew or Kurt.
+        increments : list(int), optional
+            Indices of the increments, defaults to all.
+
+        Returns
+        -------
+        numpy.ndarray
+            Statistic for each increment and grain, with shape
+            (increments, grains).
+
+        """
+        # Check that grains have been detected in the reference map
+        self.refMap.checkGrainsDetected()
+
+        if increments is None:
+            increments = range(len(self))
+
+        evolution = np.empty((len(increments), self.numGrains))
+        for i, increment in enumerate(increments):
+            _, _, (evolution[i], ) = groupedStats(
+                self.fieldData(increment, component), self.refMap.grains,
+                self.numGrains, [stat]
+            )
+
+            # report progress
+            yield (i + 1) / len(increments)
+
+        return evolution
+
+
+STRAIN_COMPONENTS = ('f11', 'f22', 'f12', 'f21', 'e11', 'e22', 'e12',
+                     'eMaxShear')
+
+
+def calcStrainFields(xMap, yMap, gradStep):
+    """Calculate deformation gradient and Green strain components from
+    maps of displacement.
+
+    Parameters
+    ----------
+    xMap : numpy.ndarray
+        Map of u displacement component along x.
+    yMap : numpy.ndarray
+        Map of v displacement component along y.
+    gradStep : float
+        Spacing of the data points.
+
+    Returns
+    -------
+    dict
+        Deformation gradient (f11, f22, f12, f21), Green strain (e11,
+        e22, e12) and max shear (eMaxShear) components, where 1=x and
+        2=y.
+
+    """
+    # d/dy is first term, d/dx is second
+    xDispGrad = np.gradient(xMap, gradStep, gradStep)
+    yDispGrad = np.gradient(yMap, gradStep, gradStep)
+
+    fields = {}
+
+    # Deformation gradient
+    fields['f11'] = xDispGrad[1] + 1
+    fields['f22'] = yDispGrad[0] + 1
+    fields['f12'] = xDispGrad[0]
+    fields['f21'] = yDispGrad[1]
+
+    # Green strain
+    fields['e11'] = xDispGrad[1] + \
+        0.5*(xDispGrad[1]*xDispGrad[1] + yDispGrad[1]*yDispGrad[1])
+    fields['e22'] = yDispGrad[0] + \
+        0.5*(xDispGrad[0]*xDispGrad[0] + yDispGrad[0]*yDispGrad[0])
+    fields['e12'] = 0.5*(xDispGrad[0] + yDispGrad[1] +
+                         xDispGrad[1]*xDispGrad[0] + yDispGrad[1]*yDispGrad[0])
+    # max shear component
+    fields['eMaxShear'] = np.sqrt(
+        ((fields['e11'] - fields['e22']) / 2.)**2 + fields['e12']**2
+    )
+
+    return fields
+
+
+_MOMENT_STATS = ('Mean', 'Std', 'Skew', 'Kurt')
+
+
+def arrayStats(data, stats):
+    """Calculate statistics of an array in a single partial sort.
+    Percentiles are linearly interpolated, as numpy.percentile.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Data to calculate statistics of. Non finite values are ignored.
+    stats : list
+        Statistics to calculate, each either a percentile (number) or
+        one of Min, Max, Mean, Std, Skew or Kurt.
+
+    Returns
+    -------
+    int
+        Number of values.
+    list(float)
+        Value of each statistic.
+
+    """
+    data = data[np.isfinite(data)].astype(float)
+    numPoints = len(data)
+    if numPoints == 0:
+        return 0, [np.nan] * len(stats)
+
+    # all order statistics required are found in one partial sort
+    positions = {stat: _rankPosition(stat, numPoints) for stat in stats
+                 if stat not in _MOMENT_STATS}
+    kth = set()
+    for pos in positions.values():
+        kth.update((int(np.floor(pos)), int(np.ceil(pos))))
+    if kth:
+        partitioned = np.partition(data, sorted(kth))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        moments = _moments(data.sum(), data, numPoints)
+
+    values = []
+    for stat in stats:
+        if stat in _MOMENT_STATS:
+            values.append(moments[stat])
+        else:
+            pos = positions[stat]
+            lower = partitioned[int(np.floor(pos))]
+            upper = partitioned[int(np.ceil(pos))]
+            values.append(lower + (pos - np.floor(pos)) * (upper - lower))
+
+    return numPoints, values
+
+
+def groupedStats(data, labels, numGroups, stats):
+    """Calculate statistics of an array for each label of a label array,
+    from a single sort of the data by label then value. Percentiles are
+    linearly interpolated, as numpy.percentile.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Data to calculate statistics of. Non finite values are ignored.
+    labels : numpy.ndarray
+        Labels of the data, groups are labelled 1 to numGroups and other
+        values are ignored.
+    numGroups : int
+        Number of groups.
+    stats : list
+        Statistics to calculate, each either a percentile (number) or
+        one of Min, Max, Mean, Std, Skew or Kurt.
+
+    Returns
+    -------
+    numpy.ndarray
+        ID of each group (label - 1).
+    numpy.ndarray
+        Number of values in each group.
+    list(numpy.ndarray)
+        Value of each statistic for each group.
+
+    """
+    data = data.ravel()
+    labels = labels.ravel()
+    valid = np.isfinite(data) & (labels > 0) & (labels <= numGroups)
+    data = data[valid].astype(float)
+    labels = labels[valid] - 1
+
+    order = np.lexsort((data, labels))
+    data = data[order]
+    labels = labels[order]
+
+    numPoints = np.bincount(labels, minlength=numGroups)
+    starts = np.concatenate(([0], np.cumsum(numPoints)[:-1]))
+    hasPoints = numPoints > 0
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sums = np.bincount(labels, weights=data, minlength=numGroups)
+        moments = _moments(sums, data, numPoints, labels=labels)
+
+    values = []
+    for stat in stats:
+        if stat in _MOMENT_STATS:
+            values.append(moments[stat])
+            continue
+        pos = _rankPosition(stat, numPoints)
+        lowerPos = np.floor(pos).astype(int)
+        upperPos = np.ceil(pos).astype(int)
+        value = np.full(numGroups, np.nan)
+        lower = data[starts[hasPoints] + lowerPos[hasPoints]]
+        upper = data[starts[hasPoints] + upperPos[hasPoints]]
+        frac = (pos - lowerPos)[hasPoints]
+        value[hasPoints] = lower + frac * (upper - lower)
+        values.append(value)
+
+    return np.arange(numGroups), numPoints, values
+
+
+def _rankPosition(stat, numPoints):
+    if stat == 'Min':
+        return np.zeros_like(numPoints, dtype=float)
+    if stat == 'Max':
+        return np.maximum(numPoints - 1, 0).astype(float)
+    if isinstance(stat, str):
+        raise ValueError("Unknown statistic '{}'.".format(stat))
+    if not 0 <= stat <= 100:
+        raise ValueError("Percentiles must be between 0 and 100.")
+    return np.maximum(numPoints - 1, 0) * stat / 100
+
+
+def _moments(sums, data, numPoints, labels=None):
+    mean = sums / numPoints
+    dev = data - (mean if labels is None else mean[labels])
+    if labels is None:
+        m2, m3, m4 = [np.sum(dev**k) / numPoints for k in (2, 3, 4)]
+    else:
+        m2, m3, m4 = [np.bincount(labels, weights=dev**k,
+                                  minlength=len(numPoints)) / numPoints
+                      for k in (2, 3, 4)]
+    std = np.sqrt(m2)
+
+    return {
+        'Mean': mean,
+        'Std': std,
+        'Skew': m3 / std**3,
+        'Kurt': m4 / m2**2 - 3,
+    }
+
+
+def detectSlipBands(grainMapData, thres=None, min_dist=None, angularRes=1,
+                    method="radon"):
+    """Detect slip band angles in a grain map from peaks in an angular
+    profile of the data. The profile is calculated either from Radon
+    projections, normalised by the length of each projection through
+    the grain, or from the energy along radial slices of the 2D Fourier
+    transform of the data (Fourier slice theorem). The Fourier method is
+    much faster, particularly at sub-degree angular resolution.
+
+    Parameters
+    ----------
+    grainMapData : numpy.ndarray
+        Data to find bands in, nan or 0 outside of the grain.
+    thres : float, optional
+        Normalised threshold for peaks.
+    min_dist : int, optional
+        Minimum angle between bands in degrees.
+    angularRes : float, optional
+        Angular resolution of the profile in degrees.
+    method : str, {'radon', 'fourier'}
+        Method used to calculate the angular profile.
+
+    Returns
+    -------
+    numpy.ndarray
+        Detected slip band angles in radians.
+    numpy.ndarray
+        Profile intensity at each detected slip band.
+
+    """
+    if thres is None:
+        thres = 0.3
+    if min_dist is None:
+        min_dist = 30
+    grainMapData = np.abs(np.nan_to_num(grainMapData))
+
+    theta = np.arange(0, 180, angularRes, dtype=float)
+
+    if method == "radon":
+        profile = _radonProfile(grainMapData, theta, angularRes)
+    elif method == "fourier":
+        profile = _fourierProfile(grainMapData, theta)
+    else:
+        raise ValueError("Unknown slip band detection method.")
+
+    indexes = peakutils.indexes(
+        profile, thres=thres,
+        min_dist=max(int(round(min_dist / angularRes)), 1)
+    )
+
+    slipBandAngles = theta[indexes] * np.pi / 180
+    slipBandIntensities = profile[indexes]
+
+    return slipBandAngles, slipBandIntensities
+
+
+def bandedGrainData(angles, shape=(60, 80), period=10, seed=0):
+    """Synthetic grain map data of an elliptical grain containing bands,
+    for testing and benchmarking slip band detection.
+
+    Parameters
+    ----------
+    angles : list(float)
+        Angles of the bands in degrees, with the same convention as the
+        angles returned by detectSlipBands.
+    shape : tuple(int)
+        Shape of the map data (y, x).
+    period : float
+        Distance in pixels between bands.
+    seed : int
+        Seed of the random noise added to the bands.
+
+    Returns
+    -------
+    numpy.ndarray
+        Map data of the grain, nan outside of the grain.
+
+    """
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[:shape[0], :shape[1]]
+    grain = (((yy - shape[0] / 2) / (0.45 * shape[0]))**2 +
+             ((xx - shape[1] / 2) / (0.45 * shape[1]))**2) < 1
+    data = 0.1 * rng.random(shape)
+    for angle in np.deg2rad(angles):
+        dist = xx * np.cos(angle) - yy * np.sin(angle)
+        data += np.exp(-((dist % period) - period / 2)**2)
+    data[~grain] = np.nan
+
+    return data
+
+
+def _radonProfile(grainMapData, theta, angularRes):
+    """Angular profile of a grain map from its Radon transform.
+
+    Parameters
+    ----------
+    grainMapData : numpy.ndarray
+        Absolute data, 0 outside of the grain.
+    theta : numpy.ndarray
+        Projection angles in degrees.
+    angularRes : float
+        Angular resolution of the projections in degrees.
+
+    Returns
+    -------
+    numpy.ndarray
+        Profile value at each angle.
+
+    """
+    # array to hold shape / support of grain
+    suppGMD = grainMapData != 0
+    supp_map, validRays = _radonSupport(
+        suppGMD.shape, np.packbits(suppGMD).tobytes(), angularRes
+    )
+    sin_map = tf.radon(grainMapData, theta=theta, circle=False)
+
+    # only consider radon rays that cut grain with mindiam*2/3 or more,
+    # and scale by length of the cut
+    crop_map = np.zeros(sin_map.shape)
+    crop_map[validRays] = sin_map[validRays] / supp_map[validRays]
+    supp_crop = crop_map > 0
+    # raise to power to accentuate local peaks
+    with np.errstate(invalid='ignore', divide='ignore'):
+        profile = np.sum(crop_map**4, axis=0) / np.sum(supp_crop, axis=0)
+
+    return np.nan_to_num(profile)
+
+
+def _fourierProfile(grainMapData, theta):
+    """Angular profile of a grain map from its 2D Fourier transform. By
+    the Fourier slice theorem, the 1D transform of the projection at
+    angle theta is the radial slice of the 2D transform at the same
+    angle, so the energy along each slice measures how strongly the
+    data is banded parallel to the projection direction.
+
+    Parameters
+    ----------
+    grainMapData : numpy.ndarray
+        Absolute data, 0 outside of the grain.
+    theta : numpy.ndarray
+        Projection angles in degrees.
+
+    Returns
+    -------
+    numpy.ndarray
+        Profile value at each angle.
+
+    """
+    # remove the mean inside the grain so the grain shape does not
+    # dominate the spectrum
+    suppGMD = grainMapData != 0
+    if not suppGMD.any():
+        return np.zeros(len(theta))
+    centredData = np.where(
+        suppGMD, grainMapData - grainMapData[suppGMD].mean(), 0
+    )
+
+    # zero pad to a square to oversample the spectrum
+    n = 2 * max(grainMapData.shape)
+    power = np.abs(np.fft.fftshift(np.fft.fft2(centredData, s=(n, n))))**2
+
+    # sample slices from 2 periods across the grain up to Nyquist,
+    # excluding the lowest frequencies which describe the grain shape
+    centre = n // 2
+    radii = np.arange(2 * n / min(grainMapData.shape), centre - 1, 0.5)
+    thetaRad = theta * np.pi / 180
+    kx = centre + np.outer(radii, np.cos(thetaRad))
+    ky = centre - np.outer(radii, np.sin(thetaRad))
+    slices = ndimage.map_coordinates(power, [ky, kx], order=1)
+
+    # square to accentuate local peaks
+    profile = np.sum(slices, axis=0)**2
+
+    return profile
+
+
+@functools.lru_cache(maxsize=256)
+def _radonSupport(shape, packedSupport, angularRes):
+    """Radon transform of the support (shape) of a grain. Cached so grains
+    only need transforming once, when detection is repeated with
+    different data or thresholds.
+
+    Parameters
+    ----------
+    shape : tuple(int)
+        Shape of the grain map.
+    packedSupport : bytes
+        Bit packed boolean support array of the grain.
+    angularRes : float
+        Angular resolution of the projections in degrees.
+
+    Returns
+    -------
+    numpy.ndarray
+        Radon transform of the support.
+    numpy.ndarray
+        Boolean array of rays that cut the grain by at least 2/3 of its
+        minimum diameter.
+
+    """
+    suppGMD = np.unpackbits(
+        np.frombuffer(packedSupport, dtype=np.uint8),
+        count=shape[0] * shape[1]
+    ).reshape(shape).astype(float)
+
+    theta = np.arange(0, 180, angularRes, dtype=float)
+    supp_map = tf.radon(suppGMD, theta=theta, circle=False)
+
+    # minimum diameter of grain
+    mindiam = np.min(np.sum(supp_map > 0, axis=0), axis=0)
+    validRays = supp_map > mindiam * 2 / 3
+
+    supp_map.flags.writeable = False
+    validRays.flags.writeable = False
+
+    return supp_map, validRays
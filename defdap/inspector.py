@@ -13,13 +13,22 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import json
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
 from sklearn.cluster import MeanShift
 from scipy.stats import linregress
+from scipy import ndimage
 import pandas as pd
 
-from defdap.plotting import Plot, GrainPlot, LineSlice
+from defdap.plotting import Plot, GrainPlot, CrystalPlot, LineSlice
+from defdap.utils import reportProgress
 
 
 class GrainInspector:
@@ -27,15 +36,47 @@ class GrainInspector:
     Class containing the interactive grain inspector tool for slip trace analysis
     and relative displacement ratio analysis.
 
+    Parameters
+    ----------
+    currMap : defdap.hrdic.Map
+        DIC map to inspect grains of.
+    vmax : float
+        Maximum value of the colour map.
+    annotationFile : str, optional
+        Path of a file to store drawn lines and groups in, see
+        :class:`AnnotationStore`. Stored annotations of a grain are
+        loaded when it is first shown and every edit is saved.
+    mapKey : str, optional
+        Identifier of the map in the annotation file, defaults to the
+        file name of the map.
+    cacheSize : int
+        Number of grains to keep data for drawing of. Data for the next
+        and previous grains is prepared in a background thread.
+
     """
-    def __init__(self, currMap, vmax=0.1):
+    def __init__(self, currMap, vmax=0.1, annotationFile=None, mapKey=None,
+                 cacheSize=16):
         # Initialise some values
         self.grainID = 0
         self.currMap = currMap
         self.currEBSDMap = self.currMap.ebsdMap
-        self.currDICGrain = self.currMap[self.grainID]
-        self.currEBSDGrain = self.currDICGrain.ebsdGrain
         self.vmax = vmax
+
+        # Data for drawing grains, as futures of a background thread
+        self.cacheSize = cacheSize
+        self.grainDataCache = OrderedDict()
+        self.cacheLock = threading.Lock()
+        self.prefetcher = ThreadPoolExecutor(max_workers=1)
+
+        self.annotations = None
+        self.loadedGrains = set()
+        if annotationFile is not None:
+            if mapKey is None:
+                mapKey = currMap.fname
+            self.annotations = AnnotationStore(annotationFile, mapKey)
+
+        self.currDICGrain = self.loadGrain(self.grainID)
+        self.currEBSDGrain = self.currDICGrain.ebsdGrain
         
         # Draw the figure
         self.draw()
@@ -70,7 +111,29 @@ class GrainInspector:
         self.grainPlot = self.currMap[self.grainID].plotMaxShear(fig=self.plot.fig, ax=self.maxShearAx, 
                                                                  vmax=self.vmax, plotScaleBar=True, plotColourBar=True)
         self.plot.ax.axis('off')
-        
+
+        # Plots and artists that are updated when redrawing
+        self.slipTraceAx.set_aspect('equal', 'box')
+        self.slipTraceAx.axis('off')
+        self.slipPlot = GrainPlot(fig=self.plot.fig, callingGrain=self.currDICGrain, ax=self.slipTraceAx)
+        self.unitCellPlot = CrystalPlot(fig=self.plot.fig, ax=self.unitCellAx)
+        self.unitCell = None
+        self.traceArtists = []
+        self.bandArtists = []
+        self.lineArtists = []
+
+        for ax in (self.grainInfoAx, self.lineInfoAx, self.groupsInfoAx):
+            ax.axis('off')
+        self.grainInfoText = self.plot.addText(self.grainInfoAx, 0, 1, '', va='top', ha='left', fontsize=10)
+        self.lineInfoText = self.plot.addText(self.lineInfoAx, 0, 1, '', va='top', fontsize=10)
+        self.groupsInfoText = self.plot.addText(self.groupsInfoAx, 0, 1, '', va='top', fontsize=10)
+
+        # Detect lines
+        self.drawnLine = LineSlice(ax=self.maxShearAx, fig=self.plot.fig, action=self.grainPlot.addArrow)
+
+        # Stop preparing grain data when the window is closed
+        self.plot.addEventHandler('close_event', lambda e, p: self.prefetcher.shutdown(wait=False))
+
         # Draw the stuff that will need to be redrawn often in a seperate function
         self.redraw()
 
@@ -85,8 +148,10 @@ class GrainInspector:
         """
         ## Go to grain ID specified in event
         self.grainID=int(event)
-        self.grainPlot.arrow=None
-        self.currDICGrain = self.currMap[self.grainID]
+        if self.grainPlot.arrow is not None:
+            self.grainPlot.arrow.remove()
+            self.grainPlot.arrow = None
+        self.currDICGrain = self.loadGrain(self.grainID)
         self.currEBSDGrain = self.currDICGrain.ebsdGrain
         self.redraw()
 
@@ -111,8 +176,37 @@ class GrainInspector:
         
         # Group lines and redraw
         self.groupLines()
-        self.redraw()
-        
+        self.saveGrain()
+        self.redraw(grainChanged=False)
+
+    def loadGrain(self, grainId):
+        """Return a DIC grain, loading its stored annotations the first
+        time it is used.
+
+        Parameters
+        ----------
+        grainId : int
+            ID of the grain.
+
+        Returns
+        -------
+        defdap.hrdic.Grain
+
+        """
+        grain = self.currMap[grainId]
+        if self.annotations is not None and grainId not in self.loadedGrains:
+            self.annotations.load(grainId, grain)
+            self.loadedGrains.add(grainId)
+
+        return grain
+
+    def saveGrain(self):
+        """Save annotations of the current grain to the annotation file.
+
+        """
+        if self.annotations is not None:
+            self.annotations.save(self.grainID, self.currDICGrain)
+
     def groupLines(self):
         """
         Group the lines drawn in the current grain item using a mean shift algorithm,
@@ -126,7 +220,7 @@ class GrainInspector:
             self.currDICGrain.groupsList = [[0, angles[0], 0, 0, 0]]
         else:
             # Run clustering algorithm for >1 line
-            ms = MeanShift(bandwidth=10).fit(np.matrix([range(len(angles)), angles]).transpose())
+            ms = MeanShift(bandwidth=10).fit(np.array([range(len(angles)), angles]).transpose())
             
             # Add group ID for each line to the points list
             for i, label in enumerate(ms.labels_):
@@ -156,7 +250,8 @@ class GrainInspector:
 
         self.currDICGrain.pointsList = []
         self.currDICGrain.groupsList = []
-        self.redraw()
+        self.saveGrain()
+        self.redraw(grainChanged=False)
 
     def removeLine(self, event, plot):
         """  Remove single line [runs after submitting a text box].
@@ -169,71 +264,170 @@ class GrainInspector:
         """
         ## Remove single line
         del self.currDICGrain.pointsList[int(event)]
-        self.redraw()
+        self.saveGrain()
+        self.redraw(grainChanged=False)
 
-    def redraw(self):
+    def redraw(self, grainChanged=True):
         """
         Draw items which need to be redrawn often (i.e. when changing grain ID).
+        Existing artists are updated and the figure is drawn once.
+
+        Parameters
+        ----------
+        grainChanged : bool
+            If false, only update the lines and groups of the grain.
 
         """
+        with self.grainPlot.holdDraw(draw=False), \
+                self.slipPlot.holdDraw(draw=False), \
+                self.unitCellPlot.holdDraw(draw=False):
+            if grainChanged:
+                self.redrawGrain()
+            self.redrawLines()
 
-        # Plot max shear for grain
-        self.maxShearAx.clear()
-        grainPlot = self.currMap[self.grainID].plotMaxShear(
-            fig=self.plot.fig,ax=self.maxShearAx, vmax=self.vmax, plotColourBar=False, plotScaleBar=True)
+        self.plot.fig.canvas.draw_idle()
+
+    def redrawGrain(self):
+        """
+        Update the max shear map, slip traces, unit cell and grain info
+        for the current grain.
+
+        """
+        data = self.grainDrawData(self.grainID).result()
+
+        # Update max shear for grain
+        grainMapData = data['maxShear']
+        yDim, xDim = grainMapData.shape
+        img = self.grainPlot.imgLayers[0]
+        img.set_data(grainMapData)
+        img.set_extent((-0.5, xDim - 0.5, yDim - 0.5, -0.5))
+        img.set_clim(np.nanmin(grainMapData), self.vmax)
+        self.maxShearAx.set_xlim(-0.5, xDim - 0.5)
+        self.maxShearAx.set_ylim(yDim - 0.5, -0.5)
+        self.grainPlot.callingGrain = self.currDICGrain
 
         # Draw slip traces
-        self.slipTraceAx.clear()
-        self.slipTraceAx.set_aspect('equal', 'box')
-        slipPlot = GrainPlot(fig=self.plot.fig, callingGrain=self.currMap[self.grainID], ax=self.slipTraceAx)
-        traces = slipPlot.addSlipTraces(topOnly=True)
-        self.slipTraceAx.axis('off')
-        
-        # Draw slip bands
-        bands = [elem[1] for elem in self.currDICGrain.groupsList]
-        if self.currDICGrain.groupsList != None:
-            slipPlot.addSlipBands(topOnly=True, angles=list(np.deg2rad(bands)))
-        
+        for artist in self.traceArtists:
+            artist.remove()
+        self.traceArtists = self.slipPlot.addTraces(
+            data['slipTraces'], self.currEBSDMap.slipTraceColours,
+            topOnly=True, pos=(0, 0)
+        )
+
         # Draw unit cell
-        self.unitCellAx.clear()
-        self.currEBSDGrain.plotUnitCell(fig=self.plot.fig, ax=self.unitCellAx)
-        
+        if self.unitCell is None:
+            self.unitCell = self.unitCellPlot.addVerts(data['unitCell'])
+        else:
+            self.unitCell.set_verts(data['unitCell'])
+
         # Write grain info text
-        self.grainInfoAx.clear()
-        self.grainInfoAx.axis('off')
         grainInfoText = 'Grain ID: {0} / {1}\n'.format(self.grainID, len(self.currMap.grainList))
         grainInfoText += 'Min: {0:.1f} %     Mean:{1:.1f} %     Max: {2:.1f} %'.format(
-            np.min(self.currDICGrain.maxShearList)*100,
-            np.mean(self.currDICGrain.maxShearList)*100,
-            np.max(self.currDICGrain.maxShearList)*100)
-        self.plot.addText(self.grainInfoAx, 0, 1, grainInfoText,  va='top', ha='left', fontsize=10)
-        
-        # Detect lines
-        self.drawnLine = LineSlice(ax=self.maxShearAx, fig=self.plot.fig, action=self.grainPlot.addArrow)
+            *[stat * 100 for stat in data['maxShearStats']])
+        self.grainInfoText.set_text(grainInfoText)
 
+        # Prepare neighbouring grains in the background
+        for grainId in (self.grainID + 1, self.grainID - 1):
+            if 0 <= grainId < len(self.currMap):
+                self.grainDrawData(grainId)
+
+    def redrawLines(self):
+        """
+        Update the lines, groups and slip bands drawn for the current grain.
+
+        """
         # Write lines text and draw lines
+        for artist in self.lineArtists:
+            artist.remove()
+        self.lineArtists = []
         linesTxt = 'List of lines\n\nLineID  x0     y0     x1     y1     Angle  Group\n'
 
         if self.currDICGrain.pointsList != []:
             for idx, points in enumerate(self.currDICGrain.pointsList):
                 linesTxt += '{0}          {1:.1f}   {2:.1f}    {3:.1f}   {4:.1f}   {5:.1f}   {6}\n'.format(idx,
                                     points[0][0], points[0][1], points[0][2], points[0][3], points[1], points[2])
-                self.grainPlot.addArrow(startEnd=points[0], clearPrev=False, persistent=True, label=idx)
-        
-        self.lineInfoAx.clear()
-        self.lineInfoAx.axis('off')
-        self.plot.addText(self.lineInfoAx, 0, 1, linesTxt, va='top', fontsize=10)
-        
+                self.lineArtists += self.grainPlot.addArrow(startEnd=points[0], clearPrev=False,
+                                                            persistent=True, label=idx)
+        self.lineInfoText.set_text(linesTxt)
+
         # Write groups info text
         groupsTxt = 'List of groups\n\nGroupID    Angle      System      Dev     RDR\n'
         if self.currDICGrain.groupsList != []:
             for idx, group in enumerate(self.currDICGrain.groupsList):
                 groupsTxt += '{0}                {1:.1f}      {2}      {3}      {4:.2f}\n'.format(
                     idx, group[1], group[2], np.round(group[3],3), group[4])
+        self.groupsInfoText.set_text(groupsTxt)
+
+        # Draw slip bands
+        for artist in self.bandArtists:
+            artist.remove()
+        bands = [elem[1] for elem in self.currDICGrain.groupsList]
+        self.bandArtists = self.slipPlot.addSlipBands(
+            topOnly=True, angles=list(np.deg2rad(bands)), pos=(0, 0)
+        )
+
+    def grainDrawData(self, grainId):
+        """Data for drawing a grain, prepared in a background thread and
+        cached for the most recently used grains.
+
+        Parameters
+        ----------
+        grainId : int
+            ID of the grain.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Future of the dictionary returned by calcGrainDrawData.
+
+        """
+        with self.cacheLock:
+            future = self.grainDataCache.get(grainId)
+            if future is None:
+                # slip traces and the orientation they need are calculated
+                # here, not in the background thread, as an EBSD grain can
+                # be linked to several DIC grains
+                slipTraces = list(self.currMap[grainId].ebsdGrain.slipTraces)
+                future = self.prefetcher.submit(self.calcGrainDrawData,
+                                                grainId, slipTraces)
+                self.grainDataCache[grainId] = future
+            self.grainDataCache.move_to_end(grainId)
+            while len(self.grainDataCache) > self.cacheSize:
+                self.grainDataCache.popitem(last=False)
+
+        return future
 
-        self.groupsInfoAx.clear()
-        self.groupsInfoAx.axis('off')
-        self.plot.addText(self.groupsInfoAx, 0, 1, groupsTxt, va='top', fontsize=10)
+    def calcGrainDrawData(self, grainId, slipTraces):
+        """Calculate the data for drawing a grain, without any plotting
+        so it can be run in a background thread. The linked EBSD grain is
+        only read, so its orientation must already be calculated.
+
+        Parameters
+        ----------
+        grainId : int
+            ID of the grain.
+        slipTraces : list(float)
+            Slip trace angles of the linked EBSD grain.
+
+        Returns
+        -------
+        dict
+            Max shear map and its min, mean and max, slip trace angles and
+            unit cell vertices of the grain.
+
+        """
+        dicGrain = self.currMap[grainId]
+        ebsdGrain = dicGrain.ebsdGrain
+        maxShear = np.array(dicGrain.maxShearList)
+
+        return {
+            'maxShear': dicGrain.grainMapData(grainData=dicGrain.maxShearList),
+            'maxShearStats': (maxShear.min(), maxShear.mean(), maxShear.max()),
+            'slipTraces': slipTraces,
+            'unitCell': ebsdGrain.refOri.unitCellVerts(
+                ebsdGrain.crystalSym, cOverA=self.currEBSDMap.cOverA
+            ),
+        }
 
     def runRDRGroup(self, event, plot):
         """  Run RDR on a specified group, upon submitting a text box.
@@ -253,6 +447,10 @@ class GrainInspector:
         """  Run slip trace analysis on all grains which hve slip trace lines drawn.
 
         """
+        # Load any stored annotations not shown yet
+        if self.annotations is not None:
+            for grainId in self.annotations.grainIds:
+                self.loadGrain(grainId)
 
         # Print header
         print("Grain\tEul1\tEul2\tEul3\tMaxSF\tGroup\tAngle\tSystem\tDev\RDR")
@@ -269,7 +467,8 @@ class GrainInspector:
                                                     group[0], group[1], group[2], np.round(group[3],3), group[4])
                     print(text)
 
-    def calcRDR(self, grain, group, showPlot=True, length=2.5):
+    def calcRDR(self, grain, group, showPlot=True, length=2.5,
+                interpolate=False):
         """ Calculates the relative displacement ratio for a given grain and group.
 
         Parameters
@@ -282,71 +481,20 @@ class GrainInspector:
             if True, show plot window.
         length: int
             length of perpendicular lines used for RDR.
+        interpolate: bool
+            If true, sample displacements at sub-pixel positions along the
+            lines by bilinear interpolation, see :func:`calcRDR`.
 
         """
-        
-        ulist=[]; vlist=[]; allxlist = []; allylist = [];      
-
-        # Get all lines belonging to group
-        points = []
-        for point in grain.pointsList:
-            if point[2] == group:
-                points.append(point[0])
-
-        for point in points:
-            x0=point[0];  y0=point[1]; x1=point[2];   y1=point[3];
-            grad = (y1-y0)/(x1-x0)
-            invgrad = -1/grad
-            profile_length = np.sqrt((y1-y0)**2+(x1-x0)**2)
-            num = np.round(profile_length*2)
-            
-            ### Calculate positions for each point along slip trace line (x,y)
-            x, y = np.round(np.linspace(x0, x1, int(num))), np.round(np.linspace(y0, y1, int(num)))
-            df = pd.DataFrame({'x':x, 'y':y}).drop_duplicates()
-            x,y = df['x'].values.tolist(),df['y'].values.tolist()
-
-            ## Calculate deviation from (0,0) for points along line with angle perpendicular to slip line (xnew,ynew)
-            x0new = np.sqrt(length/(invgrad**2+1))*np.sign(grad)
-            y0new = -np.sqrt(length/(1/invgrad**2+1))
-            x1new = -np.sqrt(length/(invgrad**2+1))*np.sign(grad)
-            y1new = np.sqrt(length/(1/invgrad**2+1))
-            profile_length=np.sqrt((y1new-y0new)**2+(x1new-x0new)**2)
-            num = np.round(profile_length)
-            xnew, ynew = np.linspace(x0new, x1new, int(num)), np.linspace(y0new, y1new, int(num))
-            xnew, ynew = np.around(xnew).astype(int), np.around(ynew).astype(int)
-            df = pd.DataFrame({'x':xnew, 'y':ynew}).drop_duplicates()
-            xnew,ynew = df['x'].values.tolist(), df['y'].values.tolist()
-                
-            for x,y in zip(x,y):
-                xperp = []; yperp = [];
-                for xdiff, ydiff in zip(xnew, ynew):
-                    xperp.append(int(x+xdiff))
-                    yperp.append(int(y+ydiff))
-                allxlist.append(xperp)
-                allylist.append(yperp)
-
-                xmap = self.currDICGrain.extremeCoords[0] + xperp
-                ymap = self.currDICGrain.extremeCoords[1] + yperp
-                
-                ### For all points, append u and v to list
-                u = []; v = [];
-                for xmap, ymap in zip(xmap,ymap):
-                    u.append((self.currMap.crop(self.currMap.x_map))[ymap, xmap])
-                    v.append((self.currMap.crop(self.currMap.y_map))[ymap, xmap])
-
-                ### Take away mean
-                u = u-np.mean(u); v = v-np.mean(v)
+        linRegResults, ulist, vlist, allxlist, allylist = calcRDR(
+            self.currMap, grain, group, length=length,
+            interpolate=interpolate, returnSamples=True
+        )
 
-                ### Append to main lists (ulist,vlist)
-                ulist.extend(u)
-                vlist.extend(v)
-
-        ### Linear regression of ucentered against vcentered
-        linRegResults = linregress(x=vlist,y=ulist)
-        
         # Save measured RDR
         grain.groupsList[group][4] = linRegResults.slope
-        
+        if grain is self.currDICGrain:
+            self.saveGrain()
 
         if showPlot: self.plotRDR(grain, group, ulist, vlist, allxlist, allylist, linRegResults)
 
@@ -465,3 +613,499 @@ class GrainInspector:
 
         self.rdrPlot.numLineAx.set_ylim(slope-1, slope+1)
         self.rdrPlot.numLineAx.set_xlim(-0.01, 0.05)
+
+
+class AnnotationStore:
+    """Append-only file storing the slip trace lines and groups drawn in
+    grains with the grain inspector, so annotations persist between
+    sessions. Each save appends a single record holding the current
+    lines and groups of one grain, keyed by map and grain ID, and the
+    latest record for a grain takes precedence. Only the position of
+    each record is read when the file is opened and records are parsed
+    when a grain is loaded. Grain IDs change when grains are found,
+    filtered or merged again, so the size and centroid of the grain are
+    stored with each record and a record is not loaded into a grain
+    they do not match.
+
+    Parameters
+    ----------
+    fileName : str
+        Path of the annotation file, created if it does not exist.
+    mapKey : str
+        Identifier of the map the grains belong to, so one file can
+        store annotations for several maps. Cannot contain tabs or new
+        lines.
+
+    """
+    def __init__(self, fileName, mapKey):
+        mapKey = str(mapKey)
+        if '\t' in mapKey or '\n' in mapKey:
+            raise ValueError("mapKey cannot contain tabs or new lines.")
+
+        self.fileName = fileName
+        self.mapKey = mapKey
+        # file position of latest record of each (mapKey, grainId)
+        self.index = {}
+
+        if os.path.exists(fileName):
+            with open(fileName, 'rb') as f:
+                pos = f.tell()
+                for line in iter(f.readline, b''):
+                    key = line.split(b'\t', 2)
+                    # skip partial or corrupt lines
+                    if len(key) == 3 and line.endswith(b'\n'):
+                        try:
+                            self.index[key[0].decode(), int(key[1])] = pos
+                        except ValueError:
+                            pass
+                    pos = f.tell()
+
+    def __contains__(self, grainId):
+        return (self.mapKey, grainId) in self.index
+
+    @property
+    def grainIds(self):
+        """IDs of grains of the map with stored annotations.
+
+        Returns
+        -------
+        list(int)
+
+        """
+        return sorted(grainId for mapKey, grainId in self.index
+                      if mapKey == self.mapKey)
+
+    def save(self, grainId, grain):
+        """Append the current lines and groups of a grain to the file.
+
+        Parameters
+        ----------
+        grainId : int
+            ID of the grain.
+        grain : defdap.hrdic.Grain
+            Grain to save annotations of.
+
+        """
+        size, centroid = self.fingerprint(grain)
+        record = json.dumps({
+            'size': size,
+            'centroid': centroid,
+            'pointsList': _toBuiltin(grain.pointsList),
+            'groupsList': _toBuiltin(grain.groupsList),
+        })
+        line = '{}\t{}\t{}\n'.format(self.mapKey, int(grainId), record)
+
+        with open(self.fileName, 'ab+') as f:
+            # finish a partial last line left by an interrupted write so
+            # it does not merge with this record
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+            pos = f.tell()
+            f.write(line.encode())
+        self.index[self.mapKey, int(grainId)] = pos
+
+    def load(self, grainId, grain):
+        """Load the stored lines and groups of a grain into it.
+
+        Parameters
+        ----------
+        grainId : int
+            ID of the grain.
+        grain : defdap.hrdic.Grain
+            Grain to load annotations into.
+
+        Returns
+        -------
+        bool
+            True if annotations were stored for the grain and loaded.
+            Records that cannot be parsed are not loaded.
+
+        """
+        pos = self.index.get((self.mapKey, grainId))
+        if pos is None:
+            return False
+
+        with open(self.fileName, 'rb') as f:
+            f.seek(pos)
+            line = f.readline()
+        try:
+            record = json.loads(line.split(b'\t', 2)[2])
+            pointsList = [[np.array(points), angle, group]
+                          for points, angle, group in record['pointsList']]
+            groupsList = record['groupsList']
+        except (ValueError, TypeError, KeyError):
+            warnings.warn(
+                "Stored annotations of grain {} could not be read and are "
+                "not loaded.".format(grainId)
+            )
+            return False
+
+        # records written before grains were fingerprinted are loaded
+        if 'size' in record:
+            size, centroid = self.fingerprint(grain)
+            if (size != record['size'] or
+                    not np.allclose(centroid, record['centroid'], atol=0.01)):
+                warnings.warn(
+                    "Stored annotations of grain {} were made on a different "
+                    "grain and are not loaded.".format(grainId)
+                )
+                return False
+
+        grain.pointsList = pointsList
+        grain.groupsList = groupsList
+        return True
+
+    def loadAll(self, dicMap):
+        """Load stored annotations into all grains of a map. Records that
+        cannot be parsed are skipped.
+
+        Parameters
+        ----------
+        dicMap : defdap.hrdic.Map
+            DIC map the annotations were made on.
+
+        """
+        for grainId in self.grainIds:
+            self.load(grainId, dicMap[grainId])
+
+    @staticmethod
+    def fingerprint(grain):
+        """Size and centroid of a grain, used to check stored annotations
+        belong to it.
+
+        Parameters
+        ----------
+        grain : defdap.hrdic.Grain
+
+        Returns
+        -------
+        size : int
+            Number of points in the grain.
+        centroid : list(float)
+            Mean x and y coordinate of the points, rounded to 2 decimal
+            places.
+
+        """
+        coords = np.asarray(grain.coordList, dtype=float)
+        centroid = np.round(coords.mean(axis=0), 2) if len(coords) \
+            else np.zeros(2)
+
+        return len(coords), centroid.tolist()
+
+    def compact(self):
+        """Rewrite the file keeping only the latest record of each grain.
+
+        """
+        records = []
+        with open(self.fileName, 'rb') as f:
+            for key in sorted(self.index):
+                f.seek(self.index[key])
+                records.append((key, f.readline()))
+
+        tmpName = self.fileName + '.tmp'
+        self.index = {}
+        with open(tmpName, 'wb') as f:
+            for key, line in records:
+                self.index[key] = f.tell()
+                f.write(line)
+        os.replace(tmpName, self.fileName)
+
+
+def _toBuiltin(value):
+    """Convert nested lists of numpy arrays and scalars to built-in
+    types that can be written as JSON.
+
+    """
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_toBuiltin(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def rdrSamplePoints(line, length=2.5, interpolate=False):
+    """Positions to sample displacements at for calculating the relative
+    displacement ratio (RDR) of a slip trace line. Short lines
+    perpendicular to the slip trace are placed at points along it.
+
+    Parameters
+    ----------
+    line : array_like
+        Start x, start y, end x, end y of the slip trace line.
+    length : float
+        Length of perpendicular lines.
+    interpolate : bool
+        If false, positions are rounded to whole pixels and repeated
+        pixels are removed.
+
+    Returns
+    -------
+    x, y : numpy.ndarray
+        Sample positions, shape (number of points along line, number of
+        points along each perpendicular line).
+
+    """
+    x0, y0, x1, y1 = np.asarray(line, dtype=float)[:4]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        grad = (y1 - y0) / (x1 - x0)
+        invgrad = -1 / grad
+
+    # points along slip trace line
+    num = int(np.round(np.sqrt((y1 - y0)**2 + (x1 - x0)**2) * 2))
+    alongPoints = np.column_stack((np.linspace(x0, x1, num),
+                                   np.linspace(y0, y1, num)))
+
+    # offsets of points on lines perpendicular to the slip trace line
+    with np.errstate(divide='ignore'):
+        x0new = np.sqrt(length / (invgrad**2 + 1)) * np.sign(grad)
+        y0new = -np.sqrt(length / (1 / invgrad**2 + 1))
+    num = int(np.round(np.sqrt((2 * y0new)**2 + (2 * x0new)**2)))
+    perpOffsets = np.column_stack((np.linspace(x0new, -x0new, num),
+                                   np.linspace(y0new, -y0new, num)))
+
+    if not interpolate:
+        alongPoints = _uniqueRows(np.round(alongPoints))
+        perpOffsets = _uniqueRows(np.around(perpOffsets).astype(int))
+
+    x = alongPoints[:, 0, np.newaxis] + perpOffsets[np.newaxis, :, 0]
+    y = alongPoints[:, 1, np.newaxis] + perpOffsets[np.newaxis, :, 1]
+    if not interpolate:
+        x = x.astype(int)
+        y = y.astype(int)
+
+    return x, y
+
+
+def _uniqueRows(points):
+    """Remove repeated rows, keeping the first occurrence of each in
+    the original order.
+
+    """
+    _, idx = np.unique(points, axis=0, return_index=True)
+    return points[np.sort(idx)]
+
+
+def calcRDR(dicMap, grain, group, length=2.5, interpolate=False,
+            returnSamples=False, displacements=None):
+    """Calculate the relative displacement ratio (RDR) of a group of slip
+    trace lines drawn in a grain. The x and y displacements on lines
+    perpendicular to the slip traces are centred on each line and the RDR
+    is the slope of a linear regression of the centred x (u) against the
+    centred y (v) displacements.
+
+    Parameters
+    ----------
+    dicMap : defdap.hrdic.Map
+        DIC map the grain belongs to.
+    grain : defdap.hrdic.Grain
+        Grain with slip trace lines and groups.
+    group : int
+        Group ID of the lines to use.
+    length : float
+        Length of perpendicular lines.
+    interpolate : bool
+        If true, displacements are bilinearly interpolated at sub-pixel
+        positions along the lines, otherwise the nearest pixels are used.
+    returnSamples : bool
+        If true, also return the centred displacements and sample
+        positions.
+    displacements : tuple(numpy.ndarray), optional
+        Cropped x and y displacement maps, to avoid cropping again when
+        calculating for many grains.
+
+    Returns
+    -------
+    linRegResults : scipy.stats._stats_mstats_common.LinregressResult
+        Results of the linear regression, the slope is the RDR.
+    u, v : numpy.ndarray
+        Centred x and y displacements, if returnSamples is true.
+    x, y : list(numpy.ndarray)
+        Sample positions of each perpendicular line in grain
+        coordinates, if returnSamples is true.
+
+    """
+    if displacements is None:
+        displacements = (dicMap.crop(dicMap.x_map), dicMap.crop(dicMap.y_map))
+
+    lines = [point[0] for point in grain.pointsList if point[2] == group]
+    linRegResults, u, v, xSample, ySample = rdrFromLines(
+        lines, grain.extremeCoords[:2], displacements, length=length,
+        interpolate=interpolate
+    )
+
+    if returnSamples:
+        return linRegResults, u, v, xSample, ySample
+    return linRegResults
+
+
+def rdrFromLines(lines, origin, displacements, length=2.5,
+                 interpolate=False, mask=None):
+    """Calculate the relative displacement ratio (RDR) from a set of
+    slip trace lines, see :func:`calcRDR`.
+
+    Parameters
+    ----------
+    lines : list(array_like)
+        Start x, start y, end x, end y of each slip trace line, relative
+        to the origin.
+    origin : tuple(int)
+        x and y position of the origin of the lines in the map.
+    displacements : tuple(numpy.ndarray)
+        Cropped x and y displacement maps.
+    length : float
+        Length of perpendicular lines.
+    interpolate : bool
+        If true, displacements are bilinearly interpolated at sub-pixel
+        positions along the lines, otherwise the nearest pixels are used.
+    mask : numpy.ndarray, optional
+        Boolean array relative to the origin. Perpendicular lines with
+        any point outside of the mask are not used.
+
+    Returns
+    -------
+    linRegResults : scipy.stats._stats_mstats_common.LinregressResult
+        Results of the linear regression, the slope is the RDR.
+    u, v : numpy.ndarray
+        Centred x and y displacements.
+    x, y : list(numpy.ndarray)
+        Sample positions of each perpendicular line relative to the
+        origin.
+
+    """
+    uMap, vMap = displacements
+
+    xSample = []
+    ySample = []
+    for line in lines:
+        x, y = rdrSamplePoints(line, length=length, interpolate=interpolate)
+        if mask is not None:
+            xPix = np.round(x).astype(int)
+            yPix = np.round(y).astype(int)
+            keep = ((xPix >= 0) & (xPix < mask.shape[1]) &
+                    (yPix >= 0) & (yPix < mask.shape[0]))
+            keep[keep] = mask[yPix[keep], xPix[keep]]
+            keep = np.all(keep, axis=1)
+            x, y = x[keep], y[keep]
+        xSample.extend(x)
+        ySample.extend(y)
+
+    if len(xSample) == 0:
+        raise ValueError("No displacements to calculate RDR from.")
+
+    # gather displacements at all sample positions at once
+    xMap = np.concatenate(xSample) + origin[0]
+    yMap = np.concatenate(ySample) + origin[1]
+    if interpolate:
+        coords = np.vstack((yMap, xMap))
+        u = ndimage.map_coordinates(uMap, coords, order=1, mode='nearest')
+        v = ndimage.map_coordinates(vMap, coords, order=1, mode='nearest')
+    else:
+        u = uMap[yMap, xMap]
+        v = vMap[yMap, xMap]
+
+    # take away the mean of each perpendicular line
+    sampleSizes = np.array([len(x) for x in xSample])
+    perpIds = np.repeat(np.arange(len(sampleSizes)), sampleSizes)
+    u = u - (np.bincount(perpIds, weights=u) / sampleSizes)[perpIds]
+    v = v - (np.bincount(perpIds, weights=v) / sampleSizes)[perpIds]
+
+    # linear regression of centred u against centred v
+    linRegResults = linregress(x=v, y=u)
+
+    return linRegResults, u, v, xSample, ySample
+
+
+def slipBandLines(mask, angle, spacing=5):
+    """Parallel lines at a slip band angle covering a grain, used to
+    calculate the relative displacement ratio of slip bands that were
+    detected automatically rather than drawn.
+
+    Parameters
+    ----------
+    mask : numpy.ndarray
+        Boolean map of the grain.
+    angle : float
+        Slip band angle in radians, measured from vertical as for lines
+        drawn in the grain inspector.
+    spacing : float
+        Perpendicular distance between lines in pixels.
+
+    Returns
+    -------
+    list(numpy.ndarray)
+        Start x, start y, end x, end y of each line.
+
+    """
+    yDim, xDim = mask.shape
+    centre = np.array(((xDim - 1) / 2, (yDim - 1) / 2))
+    direction = np.array((np.sin(angle), np.cos(angle)))
+    normal = np.array((np.cos(angle), -np.sin(angle)))
+    halfLength = np.sqrt(xDim**2 + yDim**2) / 2
+
+    lines = []
+    for offset in np.arange(-halfLength, halfLength + spacing, spacing):
+        start = centre + offset * normal - halfLength * direction
+        end = centre + offset * normal + halfLength * direction
+        lines.append(np.concatenate((start, end)))
+
+    return lines
+
+
+@reportProgress("calculating RDRs")
+def batchCalcRDR(dicMap, length=2.5, interpolate=False, saveToGrains=True,
+                 annotations=None):
+    """Calculate the relative displacement ratio (RDR) of every group of
+    slip trace lines in every grain of a map, without any plotting.
+
+    Parameters
+    ----------
+    dicMap : defdap.hrdic.Map
+        DIC map with slip trace lines drawn in its grains.
+    length : float
+        Length of perpendicular lines.
+    interpolate : bool
+        If true, sample displacements at sub-pixel positions, see
+        :func:`calcRDR`.
+    saveToGrains : bool
+        If true, store the RDR of each group in the groups list of the
+        grain, as in the grain inspector.
+    annotations : AnnotationStore, optional
+        Stored annotations to load into the grains first. RDRs are also
+        saved back to the store if saveToGrains is true.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Table with a row per group and columns grainId, group, angle,
+        numPoints, RDR, stdErr and rSquared.
+
+    """
+    if annotations is not None:
+        annotations.loadAll(dicMap)
+
+    displacements = (dicMap.crop(dicMap.x_map), dicMap.crop(dicMap.y_map))
+
+    rows = []
+    numGrains = len(dicMap)
+    for grainId, grain in enumerate(dicMap):
+        for group in grain.groupsList:
+            linRegResults, u, _, _, _ = calcRDR(
+                dicMap, grain, group[0], length=length,
+                interpolate=interpolate, returnSamples=True,
+                displacements=displacements
+            )
+            if saveToGrains:
+                group[4] = linRegResults.slope
+            rows.append((grainId, group[0], group[1], len(u),
+                         linRegResults.slope, linRegResults.stderr,
+                         linRegResults.rvalue**2))
+        if saveToGrains and annotations is not None and grain.groupsList:
+            annotations.save(grainId, grain)
+
+        yield (grainId + 1) / numGrains
+
+    return pd.DataFrame(rows, columns=['grainId', 'group', 'angle',
+                                       'numPoints', 'RDR', 'stdErr',
+                                       'rSquared'])
@@ -14,16 +14,25 @@
 # limitations under the License.
 
 import numpy as np
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import matplotlib as mpl
 import matplotlib.pyplot as plt
+import matplotlib.image
+import matplotlib.path
+import matplotlib.patches
+import matplotlib.collections
+import matplotlib.figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.widgets import Button, TextBox
 from matplotlib_scalebar.scalebar import ScaleBar
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
-from mpl_toolkits.mplot3d import Axes3D
 
 from skimage import morphology as mph
+from scipy import ndimage
 
 from defdap import quat
+from defdap.utils import reportProgress
 # TODO: add plot parameter to add to current figure
 
 
@@ -32,8 +41,12 @@ class Plot(object):
 
     """
     def __init__(self, ax, axParams={}, fig=None, makeInteractive=False,
-                 title=None, **kwargs):
+                 title=None, headless=False, **kwargs):
         self.interactive = makeInteractive
+        self.headless = headless
+        if headless and makeInteractive:
+            raise Exception("Headless plots cannot be interactive")
+
         if makeInteractive:
             if fig is not None and ax is not None:
                 self.fig = fig
@@ -49,12 +62,31 @@ class Plot(object):
             self.fig = fig
             # TODO: flag for new figure
             if ax is None:
-                self.fig = plt.figure(**kwargs)
+                if headless:
+                    self.fig = headlessFigure(**kwargs)
+                else:
+                    self.fig = plt.figure(**kwargs)
                 self.ax = self.fig.add_subplot(111, **axParams)
             else:
                 self.ax = ax
+                if fig is None:
+                    self.fig = ax.figure
+        # figures with a plain Agg canvas cannot be displayed, only saved
+        if (type(self.fig.canvas) is FigureCanvasAgg and
+                self.fig.canvas.manager is None):
+            self.headless = True
         self.colourBar = None
 
+        # set while draws are held, see holdDraw
+        self.drawHeld = None
+
+        # state for redrawing single artists with blitting
+        self.blitArtists = []
+        self.blitBackground = None
+        self.capturingBackground = False
+        self.drawEventId = self.fig.canvas.mpl_connect('draw_event',
+                                                       self.onDraw)
+
         if title is not None:
             self.setTitle(title)
 
@@ -93,7 +125,9 @@ class Plot(object):
         if proj == '2d':
             return self.fig.add_axes(loc)
         if proj == '3d':
-            return Axes3D(self.fig, rect=loc, proj_type='ortho', azim=270, elev=90)
+            ax = self.fig.add_axes(loc, projection='3d', proj_type='ortho')
+            ax.view_init(azim=270, elev=90)
+            return ax
 
     def addButton(self, label, clickHandler, loc=(0.8, 0.0, 0.1, 0.07), **kwargs):
         """Add a button to the plot.
@@ -162,10 +196,16 @@ class Plot(object):
         kwargs :
             All other arguments passed to :func:`matplotlib.pyplot.text`.
 
+        Returns
+        -------
+        matplotlib.text.Text
+
         """
         txt = ax.text(x, y, txt, **kwargs)
         self.txtStore.append(txt)
 
+        return txt
+
     def setSize(self, size):
         """Set size of plot.
 
@@ -186,7 +226,9 @@ class Plot(object):
             Title to set.
 
         """
-        self.fig.canvas.set_window_title(txt)
+        manager = self.fig.canvas.manager
+        if manager is not None:
+            manager.set_window_title(txt)
 
     @property
     def exists(self):
@@ -206,16 +248,115 @@ class Plot(object):
         self.draw()
 
     def draw(self):
-        """Draw plot
+        """Draw plot. Headless plots are only drawn when saved.
 
         """
+        if self.headless:
+            return
+        if self.drawHeld is not None:
+            self.drawHeld = True
+            return
         self.fig.canvas.draw()
 
+    @contextmanager
+    def holdDraw(self, draw=True):
+        """Context in which draws of the plot are held, so many changes
+        can be made with a single draw.
+
+        Parameters
+        ----------
+        draw : bool
+            If true and any draw was requested, the figure is redrawn when
+            the event loop is next idle on exit.
+
+        """
+        self.drawHeld = False
+        try:
+            yield
+        finally:
+            drawRequested = self.drawHeld
+            self.drawHeld = None
+            if draw and drawRequested and not self.headless:
+                self.fig.canvas.draw_idle()
+
+    def saveFig(self, fileName, **kwargs):
+        """Save the plot to a file.
+
+        Parameters
+        ----------
+        fileName : str
+            Path of the file, the format is taken from the extension.
+        kwargs
+            All other arguments are passed to
+            :func:`matplotlib.figure.Figure.savefig`.
+
+        """
+        self.fig.savefig(fileName, **kwargs)
+
+    def release(self):
+        """Disconnect the plot from its figure, so the figure can be
+        reused by another plot.
+
+        """
+        self.fig.canvas.mpl_disconnect(self.drawEventId)
+        self.blitArtists = []
+        self.blitBackground = None
+
+    def onDraw(self, event):
+        # a full redraw invalidates the stored background
+        if not self.capturingBackground:
+            self.blitBackground = None
+
+    def blitArtist(self, artist):
+        """Redraw a single artist of an interactive plot by blitting it
+        over a stored background of the axes, rendered without any
+        artists updated this way. The background is rendered on the first
+        call after a full redraw, subsequent calls only draw the artist.
+        Non interactive plots are fully redrawn.
+
+        Parameters
+        ----------
+        artist : matplotlib.artist.Artist
+            Artist to redraw, must be in the plot axes.
+
+        """
+        canvas = self.fig.canvas
+        if not (self.interactive and getattr(canvas, 'supports_blit', False)):
+            self.draw()
+            return
+
+        if artist not in self.blitArtists:
+            self.blitArtists.append(artist)
+            self.blitBackground = None
+
+        if self.blitBackground is None:
+            visible = [a.get_visible() for a in self.blitArtists]
+            for a in self.blitArtists:
+                a.set_visible(False)
+            self.capturingBackground = True
+            try:
+                canvas.draw()
+                self.blitBackground = canvas.copy_from_bbox(self.ax.bbox)
+            finally:
+                self.capturingBackground = False
+                for a, vis in zip(self.blitArtists, visible):
+                    a.set_visible(vis)
+
+        canvas.restore_region(self.blitBackground)
+        for a in self.blitArtists:
+            if a.get_visible():
+                self.ax.draw_artist(a)
+        canvas.blit(self.ax.bbox)
+
 
 class MapPlot(Plot):
     """ Class for creating a map plot.
 
     """
+    # maps larger than this along either axis are displayed from an
+    # image pyramid by default
+    lodMinSize = 2048
+
     def __init__(self, callingMap, fig=None, ax=None, axParams={},
                  makeInteractive=False, **kwargs):
         """Initialise a map plot.
@@ -248,7 +389,8 @@ class MapPlot(Plot):
         self.ax.set_xticks([])
         self.ax.set_yticks([])
 
-    def addMap(self, mapData, vmin=None, vmax=None, cmap='viridis', **kwargs):
+    def addMap(self, mapData, vmin=None, vmax=None, cmap='viridis',
+               lod=None, decimation=None, **kwargs):
         """Add a map to a plot.
 
         Parameters
@@ -261,6 +403,13 @@ class MapPlot(Plot):
             Maximum value for the colour scale.
         cmap
             Colour map.
+        lod : bool, optional
+            If true, display the map from an image pyramid at the level
+            of detail matching the current view. Defaults to true for
+            maps larger than lodMinSize along either axis.
+        decimation : str, {'mean', 'mode', 'max'}, optional
+            Method to reduce levels of the image pyramid. Defaults to
+            mode for integer data (i.e. grain labels) and mean otherwise.
         kwargs
             Other arguments are passed to :func:`matplotlib.pyplot.imshow`.
 
@@ -269,14 +418,66 @@ class MapPlot(Plot):
         matplotlib.image.AxesImage
 
         """
-        img = self.ax.imshow(mapData, vmin=vmin, vmax=vmax,
-                             interpolation='None', cmap=cmap, **kwargs)
+        img = self.showImage(mapData, lod=lod, decimation=decimation,
+                             vmin=vmin, vmax=vmax, interpolation='None',
+                             cmap=cmap, **kwargs)
         self.draw()
 
         self.imgLayers.append(img)
 
         return img
 
+    def showImage(self, imageData, lod=None, decimation=None, **kwargs):
+        """Show an image in the plot axes, optionally from an image
+        pyramid (see :class:`defdap.plotting.PyramidImage`).
+
+        Parameters
+        ----------
+        imageData : numpy.ndarray
+            Image to show.
+        lod : bool, optional
+            If true, use an image pyramid. Defaults to true for images
+            larger than lodMinSize along either axis.
+        decimation : str, {'mean', 'mode', 'max'}, optional
+            Method to reduce levels of the image pyramid. Defaults to
+            mode for integer data and mean otherwise.
+        kwargs
+            Other arguments are passed to :func:`matplotlib.pyplot.imshow`.
+
+        Returns
+        -------
+        matplotlib.image.AxesImage
+
+        """
+        if lod is None:
+            lod = max(imageData.shape[:2]) > self.lodMinSize
+        if not lod:
+            return self.ax.imshow(imageData, **kwargs)
+
+        if decimation is None:
+            if np.issubdtype(imageData.dtype, np.integer):
+                decimation = 'mode'
+            elif imageData.dtype == bool:
+                decimation = 'max'
+            else:
+                decimation = 'mean'
+
+        vmin = kwargs.pop('vmin', None)
+        vmax = kwargs.pop('vmax', None)
+        img = PyramidImage(self.ax, ImagePyramid(imageData, decimation),
+                           **kwargs)
+        self.ax.set_aspect(mpl.rcParams['image.aspect'])
+        img.set_data(imageData)
+        if img.get_clip_path() is None:
+            img.set_clip_path(self.ax.patch)
+        if imageData.ndim == 2:
+            img.set_clim(vmin, vmax)
+            img.autoscale_None()
+        img.setFullExtent()
+        self.ax.add_image(img)
+
+        return img
+
     def addColourBar(self, label, layer=0, **kwargs):
         """Add a colour bar to plot.
 
@@ -287,11 +488,11 @@ class MapPlot(Plot):
         layer : int
             Layer ID.
         kwargs
-            Other arguments are passed to :func:`matplotlib.pyplot.colorbar`.
+            Other arguments are passed to :func:`matplotlib.figure.Figure.colorbar`.
 
         """
         img = self.imgLayers[layer]
-        self.colourBar = plt.colorbar(img, ax=self.ax, label=label, **kwargs)
+        self.colourBar = self.fig.colorbar(img, ax=self.ax, label=label, **kwargs)
 
     def addScaleBar(self, scale=None):
         """Add scale bar to plot.
@@ -306,23 +507,64 @@ class MapPlot(Plot):
             scale = self.callingMap.scale * 1e-6
         self.ax.add_artist(ScaleBar(scale))
 
-    def addGrainBoundaries(self, colour=None, dilate=False):
+    def addGrainBoundaries(self, colour=None, dilate=False, kind=None,
+                           cmap=None, vmin=None, vmax=None, **kwargs):
         """Add grain boundaries to the plot.
 
         Parameters
         ----------
-        colour : str
-            Colour of grain boundaries.
+        colour : str or numpy.ndarray
+            Colour of grain boundaries. Boundary lines can also be coloured
+            with cmap by a value for each line, i.e. boundary type, or by
+            misorientation by passing 'misOri'.
         dilate : bool
-            If true, dilate the grain boundaries
+            If true, dilate the grain boundaries. Lines are drawn twice
+            as wide.
+        kind : str, {'line', 'pixel'}, optional
+            Draw boundaries as line segments along the edges of pixels or
+            as an image of the boundary pixels. Defaults to lines if the
+            map has boundary lines.
+        cmap : str, optional
+            Colour map for boundary lines coloured by value.
+        vmin : float, optional
+            Minimum value for the colour scale of boundary lines.
+        vmax : float, optional
+            Maximum value for the colour scale of boundary lines.
+        kwargs
+            Other arguments are passed to
+            :class:`matplotlib.collections.LineCollection` for boundary
+            lines.
 
         Returns
         -------
-        matplotlib.image.AxesImage
+        matplotlib.image.AxesImage or matplotlib.collections.LineCollection
 
         """
         if colour is None:
             colour = "white"
+        if kind not in (None, 'line', 'pixel'):
+            raise ValueError("kind must be 'line' or 'pixel'")
+
+        # boundary lines are a property of DIC maps that transforms the
+        # EBSD lines, so only get them once. Fall back to the boundary
+        # image if the map has no lines unless lines were asked for
+        boundaryLines = None
+        if kind != 'pixel':
+            try:
+                boundaryLines = self.callingMap.boundaryLines
+            except Exception:
+                if kind == 'line':
+                    raise
+        if kind is None:
+            kind = 'pixel' if boundaryLines is None else 'line'
+
+        if kind == 'line':
+            if boundaryLines is None:
+                raise Exception("Map has no boundary lines.")
+            return self.addBoundaryLines(
+                boundaryLines, colour=colour, dilate=dilate,
+                cmap=cmap, vmin=vmin, vmax=vmax, **kwargs
+            )
 
         boundariesImage = -self.callingMap.boundaries
 
@@ -337,14 +579,76 @@ class MapPlot(Plot):
         boundariesCmap._init()
         boundariesCmap._lut[:, -1] = np.linspace(0, 1, boundariesCmap.N + 3)
 
-        img = self.ax.imshow(boundariesImage, cmap=boundariesCmap,
-                             interpolation='None', vmin=0, vmax=1)
+        img = self.showImage(boundariesImage, decimation='max',
+                             cmap=boundariesCmap, interpolation='None',
+                             vmin=0, vmax=1)
         self.draw()
 
         self.imgLayers.append(img)
 
         return img
 
+    def addBoundaryLines(self, lines, colour=None, dilate=False, cmap=None,
+                         vmin=None, vmax=None, **kwargs):
+        """Add boundary line segments to the plot, drawn as a single
+        collection.
+
+        Parameters
+        ----------
+        lines : list(numpy.ndarray)
+            Points (x, y) of each line in pixel coordinates.
+        colour : str or numpy.ndarray
+            Colour of the lines, a value for each line to colour with
+            cmap or 'misOri' to colour by the misorientation of the
+            boundaries of the calling map.
+        dilate : bool
+            If true, draw the lines twice as wide.
+        cmap : str, optional
+            Colour map for lines coloured by value.
+        vmin : float, optional
+            Minimum value for the colour scale.
+        vmax : float, optional
+            Maximum value for the colour scale.
+        kwargs
+            Other arguments are passed to
+            :class:`matplotlib.collections.LineCollection`.
+
+        Returns
+        -------
+        matplotlib.collections.LineCollection
+
+        """
+        plotParams = {'linewidths': 2 if dilate else 1}
+        plotParams.update(kwargs)
+
+        if isinstance(colour, str) and colour == 'misOri':
+            colour = self.callingMap.boundaryLineMisOri
+
+        if isinstance(colour, str) or np.ndim(colour) == 1 and \
+                len(colour) in (3, 4) and len(colour) != len(lines):
+            lineCollection = mpl.collections.LineCollection(
+                lines, colors=colour, **plotParams
+            )
+        else:
+            lineCollection = mpl.collections.LineCollection(
+                lines, cmap=cmap, **plotParams
+            )
+            lineCollection.set_array(np.asarray(colour))
+            lineCollection.set_clim(vmin, vmax)
+
+        # keep the current view if there are images on the plot,
+        # otherwise show the whole map
+        self.ax.add_collection(lineCollection, autolim=False)
+        if len(self.ax.images) == 0:
+            self.ax.set_xlim(-0.5, self.callingMap.xDim - 0.5)
+            self.ax.set_ylim(self.callingMap.yDim - 0.5, -0.5)
+            self.ax.set_aspect('equal')
+        self.draw()
+
+        self.imgLayers.append(lineCollection)
+
+        return lineCollection
+
     def addGrainHighlights(self, grainIds, grainColours=None, alpha=None,
                            newLayer=False):
         """Highlight grains in the plot.
@@ -352,7 +656,8 @@ class MapPlot(Plot):
         Parameters
         ----------
         grainIds : list
-            List of grain IDs to highlight.
+            List of grain IDs to highlight, for example from
+            :func:`defdap.base.Map.selectGrains`.
         grainColours :
             Colour to use for grain highlight.
         alpha : float
@@ -370,44 +675,34 @@ class MapPlot(Plot):
         if alpha is None:
             alpha = self.callingMap.highlightAlpha
 
-        xDim = self.callingMap.xDim
-        yDim = self.callingMap.yDim
-
-        outline = np.zeros((yDim, xDim), dtype=int)
-        for i, grainId in enumerate(grainIds, start=1):
-            if i > len(grainColours):
-                i = len(grainColours)
+        # Colour lookup table indexed by grain label, where 0 is
+        # transparent for the background. Grains after the last colour
+        # use the last colour.
+        grainIds = np.array(grainIds, dtype=int)
+        grainColours = mpl.colors.to_rgba_array(grainColours)
+        colourIds = np.minimum(np.arange(len(grainIds)), len(grainColours) - 1)
 
-            # outline of highlighted grain
-            grain = self.callingMap.grainList[grainId]
-            grainOutline = grain.grainOutline(bg=0, fg=i)
-            x0, y0, xmax, ymax = grain.extremeCoords
-
-            # add to highlight image
-            outline[y0:ymax + 1, x0:xmax + 1] += grainOutline
-
-        # Custom colour map where 0 is transparent white for bg and
-        # then a patch for each grain colour
-        grainColours.insert(0, 'white')
-        hightlightsCmap = mpl.colors.ListedColormap(grainColours)
-        hightlightsCmap._init()
-        alphaMap = np.full(hightlightsCmap.N + 3, alpha)
-        alphaMap[0] = 0
-        hightlightsCmap._lut[:, -1] = alphaMap
+        lut = np.zeros((len(self.callingMap) + 1, 4))
+        lut[grainIds + 1, :3] = grainColours[colourIds, :3]
+        lut[grainIds + 1, 3] = alpha
+        hightlightsCmap = mpl.colors.ListedColormap(lut)
 
         if self.highlightsLayerID is None or newLayer:
-            img = self.ax.imshow(outline, interpolation='none',
-                                 cmap=hightlightsCmap)
+            # label image is only uploaded once, then highlights are
+            # changed by updating the lookup table
+            grains = self.callingMap.grains
+            img = self.showImage(np.where(grains > 0, grains, 0),
+                                 decimation='mode', interpolation='none',
+                                 cmap=hightlightsCmap,
+                                 vmin=-0.5, vmax=len(lut) - 0.5)
             if self.highlightsLayerID is None:
                 self.highlightsLayerID = len(self.imgLayers)
             self.imgLayers.append(img)
+            self.draw()
         else:
             img = self.imgLayers[self.highlightsLayerID]
-            img.set_data(outline)
             img.set_cmap(hightlightsCmap)
-            img.autoscale()
-
-        self.draw()
+            self.blitArtist(img)
 
         return img
 
@@ -422,10 +717,10 @@ class MapPlot(Plot):
             Pass other arguments to :func:`matplotlib.pyplot.text`.
 
         """
-        for grainID, grain in enumerate(self.callingMap):
-            xCentre, yCentre = grain.centreCoords(centreType="com",
-                                                  grainCoords=False)
-
+        geometry = self.callingMap.grainGeometry
+        xCentres = np.round(geometry['xCentroid']).astype(int)
+        yCentres = np.round(geometry['yCentroid']).astype(int)
+        for grainID, (xCentre, yCentre) in enumerate(zip(xCentres, yCentres)):
             self.ax.text(xCentre, yCentre, grainID,
                          fontsize=fontsize, **kwargs)
         self.draw()
@@ -574,6 +869,197 @@ class MapPlot(Plot):
         return plot
 
 
+class ImagePyramid(object):
+    """Multi-resolution pyramid of an image. Each level halves the size
+    of the previous level and levels are only calculated when first
+    requested.
+
+    Attributes
+    ----------
+    decimation : str, {'mean', 'mode', 'max'}
+        Method to reduce each 2x2 block of a level to one pixel of the
+        next. Mode keeps values valid for label images, max keeps thin
+        features such as boundaries and mean (ignoring nan) is used for
+        continuous data.
+    levels : list(numpy.ndarray)
+        Calculated levels, level 0 is the full image.
+
+    """
+    def __init__(self, imageData, decimation='mean'):
+        if decimation not in ('mean', 'mode', 'max'):
+            raise ValueError("Unknown decimation method '{}'.".format(
+                decimation
+            ))
+        self.decimation = decimation
+        self.levels = [imageData]
+
+    @property
+    def shape(self):
+        return self.levels[0].shape
+
+    @property
+    def numLevels(self):
+        """Number of levels down to an image with a size of 1 pixel.
+
+        """
+        return int(np.ceil(np.log2(max(self.shape[:2])))) + 1
+
+    def level(self, i):
+        """Get a level of the pyramid, calculating it if required.
+
+        Parameters
+        ----------
+        i : int
+            Level, where level i is reduced by a factor 2**i.
+
+        Returns
+        -------
+        numpy.ndarray
+
+        """
+        i = min(i, self.numLevels - 1)
+        while len(self.levels) <= i:
+            self.levels.append(self.decimate(self.levels[-1]))
+
+        return self.levels[i]
+
+    def decimate(self, imageData):
+        """Reduce each 2x2 block of an image to a single pixel.
+
+        Parameters
+        ----------
+        imageData : numpy.ndarray
+            Image to reduce, with shape (y, x) or (y, x, channels).
+
+        Returns
+        -------
+        numpy.ndarray
+
+        """
+        # pad odd sizes by repeating the last row / column
+        padding = [(0, imageData.shape[0] % 2), (0, imageData.shape[1] % 2)]
+        padding += [(0, 0)] * (imageData.ndim - 2)
+        imageData = np.pad(imageData, padding, mode='edge')
+
+        # (y, x, ..., 4) array of the values in each block
+        blocks = np.stack([imageData[0::2, 0::2], imageData[0::2, 1::2],
+                           imageData[1::2, 0::2], imageData[1::2, 1::2]],
+                          axis=-1)
+
+        if self.decimation == 'max':
+            return blocks.max(axis=-1)
+
+        if self.decimation == 'mode':
+            # count of each value within its block, ties are resolved to
+            # the first value in the block
+            counts = (blocks[..., :, np.newaxis] ==
+                      blocks[..., np.newaxis, :]).sum(axis=-1)
+            modeIdx = counts.argmax(axis=-1)[..., np.newaxis]
+            return np.take_along_axis(blocks, modeIdx, axis=-1)[..., 0]
+
+        if np.issubdtype(blocks.dtype, np.floating):
+            with np.errstate(invalid='ignore'):
+                valid = ~np.isnan(blocks)
+                numValid = valid.sum(axis=-1)
+                blockSum = np.where(valid, blocks, 0).sum(axis=-1)
+                return (blockSum / numValid).astype(imageData.dtype)
+
+        # integer RGB(A) data
+        return blocks.mean(axis=-1).round().astype(imageData.dtype)
+
+
+class PyramidImage(mpl.image.AxesImage):
+    """Image that is drawn from an image pyramid, using the level
+    matching the resolution of the current view. Only the part of the
+    level within the view is drawn, so zooming in re-renders the view at
+    full resolution. Data coordinates are always those of the full
+    image.
+
+    """
+    def __init__(self, ax, pyramid, **kwargs):
+        """Initialise the image.
+
+        Parameters
+        ----------
+        ax : matplotlib.axes.Axes
+            Axes the image belongs to.
+        pyramid : defdap.plotting.ImagePyramid
+            Image pyramid to draw from.
+        kwargs
+            Other arguments are passed to :class:`matplotlib.image.AxesImage`.
+
+        """
+        super(PyramidImage, self).__init__(ax, **kwargs)
+        self.pyramid = pyramid
+        self.fullExtent = None
+        self.currentView = None
+
+    def setFullExtent(self):
+        """Set the extent of the image from the size of the full image,
+        which also sets the limits of the axes.
+
+        """
+        self.set_extent(self.get_extent())
+        self.fullExtent = self.get_extent()
+        self.currentView = None
+
+    def selectView(self):
+        """Select the pyramid level and region matching the current
+        view of the axes.
+
+        Returns
+        -------
+        tuple(int)
+            Level, first and last+1 column and row of the level in view.
+
+        """
+        yDim, xDim = self.pyramid.shape[:2]
+        xLim = np.sort(self.axes.get_xlim())
+        yLim = np.sort(self.axes.get_ylim())
+        bbox = self.axes.bbox
+
+        # number of image pixels per screen pixel
+        scale = max((xLim[1] - xLim[0]) / max(bbox.width, 1),
+                    (yLim[1] - yLim[0]) / max(bbox.height, 1))
+        level = int(np.floor(np.log2(scale))) if scale > 1 else 0
+        level = min(level, self.pyramid.numLevels - 1)
+        factor = 2**level
+
+        # region of the level in view, with a margin of one pixel
+        x0 = int(np.clip(np.floor((xLim[0] + 0.5) / factor) - 1, 0, None))
+        x1 = int(np.ceil((min(xLim[1], xDim) + 0.5) / factor) + 1)
+        y0 = int(np.clip(np.floor((yLim[0] + 0.5) / factor) - 1, 0, None))
+        y1 = int(np.ceil((min(yLim[1], yDim) + 0.5) / factor) + 1)
+
+        return level, x0, x1, y0, y1
+
+    def draw(self, renderer, *args, **kwargs):
+        if self.fullExtent is not None:
+            view = self.selectView()
+            if view != self.currentView:
+                level, x0, x1, y0, y1 = view
+                factor = 2**level
+                levelData = self.pyramid.level(level)
+                viewData = levelData[y0:y1, x0:x1]
+
+                yDim, xDim = self.pyramid.shape[:2]
+                left = x0 * factor - 0.5
+                right = min(x0 + viewData.shape[1], levelData.shape[1])
+                right = min(right * factor, xDim) - 0.5
+                top = y0 * factor - 0.5
+                bottom = min(y0 + viewData.shape[0], levelData.shape[0])
+                bottom = min(bottom * factor, yDim) - 0.5
+
+                # set data and extent without updating the axes limits
+                self.set_data(viewData)
+                self._extent = ((left, right, bottom, top)
+                                if self.origin == 'upper'
+                                else (left, right, top, bottom))
+                self.currentView = view
+
+        return super(PyramidImage, self).draw(renderer, *args, **kwargs)
+
+
 class LineSlice:
     """ Class to catch click and drag and return start and end positions.
 
@@ -662,21 +1148,26 @@ class GrainPlot(Plot):
         label
             Label to place near arrow.
 
-        """
+        Returns
+        -------
+        list(matplotlib.text.Annotation)
+            Persistent arrow and label annotations added.
 
+        """
+        artists = []
         x0 = startEnd[0]
         y0 = startEnd[1]
         x1 = startEnd[2]
         y1 = startEnd[3]
 
         if persistent:
-            self.ax.annotate(
+            artists.append(self.ax.annotate(
                 "", xy=(x0, y0), xycoords='data', xytext=(x1, y1),
                 textcoords='data', arrowprops=dict(
                     arrowstyle="<-", connectionstyle="arc3",
                     color='red', alpha=0.7, linewidth=2
                 )
-            )
+            ))
 
         if not persistent:
             if clearPrev:
@@ -695,9 +1186,12 @@ class GrainPlot(Plot):
                 )
 
         if label is not None:
-            self.ax.annotate(label, xy=(x1, y1), xycoords='data',
-                             xytext=(15, 15), textcoords='offset pixels',
-                             c='red', fontsize=12)
+            artists.append(self.ax.annotate(
+                label, xy=(x1, y1), xycoords='data', xytext=(15, 15),
+                textcoords='offset pixels', c='red', fontsize=12
+            ))
+
+        return artists
 
     def addColourBar(self, label, layer=0, **kwargs):
         """Add colour bar to grain plot.
@@ -709,11 +1203,11 @@ class GrainPlot(Plot):
         layer : int
             Layer on which to add colourbar.
         kwargs
-            Other arguments passed to :func:`matplotlib.pyplot.colorbar`.
+            Other arguments passed to :func:`matplotlib.figure.Figure.colorbar`.
 
         """
         img = self.imgLayers[layer]
-        self.colourBar = plt.colorbar(img, ax=self.ax, label=label, **kwargs)
+        self.colourBar = self.fig.colorbar(img, ax=self.ax, label=label, **kwargs)
 
     def addScaleBar(self, scale=None):
         """Add scale bar to grain plot.
@@ -745,6 +1239,10 @@ class GrainPlot(Plot):
         kwargs
             Other arguments are passed to :func:`matplotlib.pyplot.quiver`
 
+        Returns
+        -------
+        list(matplotlib.quiver.Quiver)
+
         """
         if pos is None:
             pos = self.callingGrain.centreCoords()
@@ -763,16 +1261,19 @@ class GrainPlot(Plot):
         else:
             pivot = 'middle'
 
+        quivers = []
         for i, trace in enumerate(traces.T):
             colour = colours[len(colours) - 1] if i >= len(colours) else colours[i]
-            self.ax.quiver(
+            quivers.append(self.ax.quiver(
                 pos[0], pos[1],
                 trace[0], trace[1],
                 scale=1, pivot=pivot,
                 color=colour, headwidth=1,
                 headlength=0, **kwargs
-            )
-            self.draw()
+            ))
+        self.draw()
+
+        return quivers
 
     def addSlipTraces(self, topOnly=False, colours=None, pos=None, **kwargs):
         """Add slip traces to plot, based on the calling grain's slip systems.
@@ -794,7 +1295,8 @@ class GrainPlot(Plot):
             colours = self.callingGrain.ebsdMap.slipTraceColours
         slipTraceAngles = self.callingGrain.slipTraces
 
-        self.addTraces(slipTraceAngles, colours, topOnly, pos=pos, **kwargs)
+        return self.addTraces(slipTraceAngles, colours, topOnly, pos=pos,
+                              **kwargs)
 
     def addSlipBands(self, topOnly=False, grainMapData=None, angles=None, pos=None,
                      thres=None, min_dist=None, **kwargs):
@@ -828,7 +1330,8 @@ class GrainPlot(Plot):
         else:
             slipBandAngles = angles
 
-        self.addTraces(slipBandAngles, ["black"], topOnly,  pos=pos, **kwargs)
+        return self.addTraces(slipBandAngles, ["black"], topOnly, pos=pos,
+                              **kwargs)
 
     @classmethod
     def create(
@@ -911,6 +1414,13 @@ class PolePlot(Plot):
     """
     defaultProjection = "stereographic"
 
+    # corners of the fundamental triangle for each symmetry, with hexagonal
+    # directions converted to cubic axes
+    fundTriangles = {
+        'cubic': ([0, 0, 1], [1, 0, 1], [1, 1, 1]),
+        'hexagonal': ([0, 0, 1], [1, 0, 0], [np.sqrt(3), 1, 0]),
+    }
+
     def __init__(self, plotType, crystalSym, projection=None,
                  fig=None, ax=None, axParams={}, makeInteractive=False,
                  **kwargs):
@@ -1039,7 +1549,8 @@ class PolePlot(Plot):
         xp, yp = self.projection(*point)
         self.ax.text(xp + padX, yp + padY, label, **kwargs)
 
-    def addPoints(self, alphaAng, betaAng, markerColour=None, markerSize=None, **kwargs):
+    def addPoints(self, alphaAng, betaAng, markerColour=None, markerSize=None,
+                  maxPoints=None, **kwargs):
         """Add a point to the pole plot.
 
         Parameters
@@ -1053,6 +1564,9 @@ class PolePlot(Plot):
             semicircles of different colour.
         markerSize : float
             Size of marker.
+        maxPoints : int, optional
+            Plot a random subsample of this many points if more are
+            given. Per point colours (c) and sizes (s) are subsampled too.
         kwargs
             Other arguments will be passed to :func:`matplotlib.axes.Axes.scatter`.
 
@@ -1064,6 +1578,21 @@ class PolePlot(Plot):
         """
         # project onto equatorial plane
         xp, yp = self.projection(alphaAng, betaAng)
+        xp = np.asarray(xp)
+        yp = np.asarray(yp)
+
+        if maxPoints is not None and xp.size > maxPoints:
+            numPoints = xp.size
+            subsample = np.random.default_rng().choice(
+                numPoints, size=maxPoints, replace=False
+            )
+            xp = xp.ravel()[subsample]
+            yp = yp.ravel()[subsample]
+            for key in ('c', 's'):
+                value = kwargs.get(key)
+                if value is not None and not isinstance(value, str) and \
+                        np.ndim(value) > 0 and len(value) == numPoints:
+                    kwargs[key] = np.asarray(value)[subsample]
 
         # plot poles
         # plot markers with 'half and half' colour
@@ -1100,6 +1629,149 @@ class PolePlot(Plot):
         else:
             raise Exception("specify one colour for solid markers or list two for 'half and half'")
 
+    def addDensity(self, alphaAng, betaAng, bins=200, sigma=None,
+                   normalise=True, cmap='viridis', **kwargs):
+        """Add the density of points to the pole plot, as a histogram of
+        the projected coordinates within the fundamental triangle drawn
+        as a single image. Suitable for very large numbers of points.
+
+        Parameters
+        ----------
+        alphaAng : numpy.ndarray
+            Inclination angles.
+        betaAng : numpy.ndarray
+            Azimuthal angles (around z axis from x in anticlockwise as
+            per ISO).
+        bins : int, optional
+            Number of histogram bins across the width of the triangle.
+        sigma : float, optional
+            Standard deviation in bins of a Gaussian kernel to smooth
+            the histogram with. Smoothing only uses bins inside the
+            triangle.
+        normalise : bool, optional
+            If true, density is given as multiples of the mean density
+            in the triangle, otherwise as the number of points per bin.
+        cmap : str, optional
+            Colour map.
+        kwargs
+            Other arguments are passed to :func:`matplotlib.pyplot.imshow`.
+
+        Returns
+        -------
+        matplotlib.image.AxesImage
+
+        """
+        xp, yp = self.projection(np.ravel(alphaAng), np.ravel(betaAng))
+
+        # bins are square and cover the bounding box of the triangle
+        outline = self.triangleOutline()
+        xMin, yMin = outline.min(axis=0)
+        xMax, yMax = outline.max(axis=0)
+        binSize = (xMax - xMin) / bins
+        yBins = max(int(np.ceil((yMax - yMin) / binSize)), 1)
+        yMax = yMin + yBins * binSize
+
+        density, _, _ = np.histogram2d(
+            yp, xp, bins=(yBins, bins), range=((yMin, yMax), (xMin, xMax))
+        )
+
+        # bins with centres in the triangle
+        xc = xMin + (np.arange(bins) + 0.5) * binSize
+        yc = yMin + (np.arange(yBins) + 0.5) * binSize
+        xc, yc = np.meshgrid(xc, yc)
+        inTriangle = mpl.path.Path(outline).contains_points(
+            np.column_stack((xc.ravel(), yc.ravel()))
+        ).reshape(density.shape)
+
+        if sigma is not None and sigma > 0:
+            # normalised convolution so bins outside the triangle do not
+            # dilute the density at its edges
+            with np.errstate(invalid='ignore', divide='ignore'):
+                density = (
+                    ndimage.gaussian_filter(density * inTriangle, sigma,
+                                            mode='constant') /
+                    ndimage.gaussian_filter(inTriangle.astype(float), sigma,
+                                            mode='constant')
+                )
+
+        if normalise:
+            meanDensity = density[inTriangle].mean()
+            if meanDensity > 0:
+                density = density / meanDensity
+
+        density = np.where(inTriangle, density, np.nan)
+
+        img = self.ax.imshow(density, origin='lower', cmap=cmap,
+                             extent=(xMin, xMax, yMin, yMax),
+                             interpolation='nearest', **kwargs)
+        self.imgLayers.append(img)
+
+        return img
+
+    def addColourKey(self, resolution=0.25, **kwargs):
+        """Fill the fundamental triangle with the IPF colour key, drawn
+        from the same colour table used to colour IPF maps.
+
+        Parameters
+        ----------
+        resolution : float, optional
+            Grid spacing in degrees of the colour table.
+        kwargs
+            Other arguments are passed to :func:`matplotlib.pyplot.pcolormesh`.
+
+        Returns
+        -------
+        matplotlib.collections.QuadMesh
+
+        """
+        alphas, betas, colours = quat.Quat.ipfColourTable(
+            self.crystalSym, resolution
+        )
+        alphaGrid, betaGrid = np.meshgrid(alphas, betas, indexing='ij')
+        xp, yp = self.projection(alphaGrid, betaGrid)
+
+        plotParams = {'shading': 'gouraud', 'zorder': 0}
+        plotParams.update(kwargs)
+        mesh = self.ax.pcolormesh(
+            xp, yp, np.moveaxis(colours, 0, -1), **plotParams
+        )
+
+        # table extends past the triangle for cubic symmetry
+        clipPatch = mpl.patches.Polygon(
+            self.triangleOutline(), closed=True, transform=self.ax.transData
+        )
+        mesh.set_clip_path(clipPatch)
+        self.imgLayers.append(mesh)
+
+        return mesh
+
+    def triangleOutline(self, res=100):
+        """Outline of the fundamental triangle in projected coordinates.
+
+        Parameters
+        ----------
+        res : int
+            Number of points along each edge.
+
+        Returns
+        -------
+        numpy.ndarray
+            (x, y) coordinates of the outline, shape (3 * res, 2).
+
+        """
+        if self.plotType != "IPF" or self.crystalSym not in self.fundTriangles:
+            raise NotImplementedError("Only works for cubic and hexagonal IPFs")
+
+        corners = np.array(self.fundTriangles[self.crystalSym], dtype=float)
+        outline = []
+        for i in range(3):
+            start, end = corners[i], corners[(i + 1) % 3]
+            fraction = np.linspace(0, 1, res)[:, np.newaxis]
+            points = start + fraction * (end - start)
+            outline.append(np.column_stack(self.projection(*points.T)))
+
+        return np.concatenate(outline)
+
     def addColourBar(self, label, layer=0, **kwargs):
         """Add colourbar to pole plot.
 
@@ -1110,11 +1782,11 @@ class PolePlot(Plot):
         layer : int
             Layer number to add the colour bar to.
         kwargs
-            Other argument will be passed to :func:`matplotlib.pyplot.colorbar`.
+            Other argument will be passed to :func:`matplotlib.figure.Figure.colorbar`.
 
         """
         img = self.imgLayers[layer]
-        self.colourBar = plt.colorbar(img, ax=self.ax, label=label, **kwargs)
+        self.colourBar = self.fig.colorbar(img, ax=self.ax, label=label, **kwargs)
 
     @staticmethod
     def _validateProjection(projectionIn, validateDefault=False):
@@ -1415,6 +2087,10 @@ class CrystalPlot(Plot):
         kwargs
             All other arguments are passed to :class:`matplotlib.collections.PolyCollection`.
 
+        Returns
+        -------
+        mpl_toolkits.mplot3d.art3d.Poly3DCollection
+
         """
         # Set default plot parameters then update with any input
         plotParams = {
@@ -1428,3 +2104,173 @@ class CrystalPlot(Plot):
         # Add list of planes defined by given vertices to the 3D plot
         pc = Poly3DCollection(verts, **plotParams)
         self.ax.add_collection3d(pc)
+
+        return pc
+
+
+def headlessFigure(**kwargs):
+    """Create a figure rendered by the Agg backend directly. The figure is
+    not managed by pyplot, so no window is created and it is freed as
+    soon as it is no longer referenced.
+
+    Parameters
+    ----------
+    kwargs
+        All arguments are passed to :class:`matplotlib.figure.Figure`.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+
+    """
+    fig = mpl.figure.Figure(**kwargs)
+    FigureCanvasAgg(fig)
+
+    return fig
+
+
+class PlotExporter(object):
+    """Render plots to files without a display, reusing a single headless
+    figure and axis for every plot.
+
+    A plot is described by a spec, a dict with keys:
+
+    - fileName : path of the file to save to.
+    - method : name of the plot method to call, e.g. 'plotIPFMap'.
+    - source : optional, key of the map in sources to plot from.
+    - grainId : optional, plot from this grain of the map instead.
+    - args, kwargs : optional, arguments for the plot method.
+    - saveParams : optional, arguments for
+      :func:`matplotlib.figure.Figure.savefig`.
+
+    """
+    def __init__(self, sources, figParams={}, axParams={}):
+        """
+
+        Parameters
+        ----------
+        sources : Map or dict(Map)
+            Map to plot from or dict of maps, selected by the source key
+            of each spec.
+        figParams : dict
+            Passed to :class:`matplotlib.figure.Figure`.
+        axParams : dict
+            Passed to :func:`matplotlib.figure.Figure.add_subplot`.
+
+        """
+        self.sources = sources
+        self.fig = headlessFigure(**figParams)
+        self.ax = self.fig.add_subplot(111, **axParams)
+        self.axSubplotSpec = self.ax.get_subplotspec()
+        self.axPosition = self.ax.get_position()
+
+    def resetFigure(self):
+        """Remove everything plotted, including any colour bars, and
+        return the axis to its original position.
+
+        """
+        for ax in self.fig.axes:
+            if ax is not self.ax:
+                ax.remove()
+        self.ax.clear()
+        self.ax.set_subplotspec(self.axSubplotSpec)
+        self.ax.set_position(self.axPosition)
+        self.ax.set_anchor('C')
+
+    def export(self, spec):
+        """Render a plot described by a spec and save it to a file.
+
+        Parameters
+        ----------
+        spec : dict
+            Description of the plot, see :class:`PlotExporter`.
+
+        Returns
+        -------
+        str
+            Path of the saved file.
+
+        """
+        self.resetFigure()
+
+        source = self.sources
+        if spec.get('source') is not None:
+            source = source[spec['source']]
+        if spec.get('grainId') is not None:
+            source = source[spec['grainId']]
+
+        plotMethod = getattr(source, spec['method'])
+        plot = plotMethod(*spec.get('args', ()), fig=self.fig, ax=self.ax,
+                          **spec.get('kwargs', {}))
+
+        self.fig.savefig(spec['fileName'], **spec.get('saveParams', {}))
+
+        if isinstance(plot, Plot):
+            plot.release()
+
+        return spec['fileName']
+
+
+# exporter of each worker process used by exportPlots
+_workerExporter = None
+
+
+def _initExportWorker(sources, figParams, axParams):
+    global _workerExporter
+    _workerExporter = PlotExporter(sources, figParams=figParams,
+                                   axParams=axParams)
+
+
+def _exportWorker(spec):
+    return _workerExporter.export(spec)
+
+
+@reportProgress("exporting plots")
+def exportPlots(sources, specs, numProcesses=1, figParams={}, axParams={}):
+    """Render a list of plots to files without a display. Each process
+    reuses one figure for all the plots it renders.
+
+    Parameters
+    ----------
+    sources : Map or dict(Map)
+        Map to plot from or dict of maps, see :class:`PlotExporter`.
+    specs : list(dict)
+        Descriptions of the plots, see :class:`PlotExporter`.
+    numProcesses : int, optional
+        Number of processes to render with. Sources are copied to each
+        process once, when it starts. If 1, plots are rendered in the
+        calling process.
+    figParams : dict
+        Passed to :class:`matplotlib.figure.Figure`.
+    axParams : dict
+        Passed to :func:`matplotlib.figure.Figure.add_subplot`.
+
+    Returns
+    -------
+    list(str)
+        Paths of the saved files, in the order of the specs.
+
+    """
+    specs = list(specs)
+    fileNames = [None] * len(specs)
+
+    if numProcesses == 1:
+        exporter = PlotExporter(sources, figParams=figParams,
+                                axParams=axParams)
+        for i, spec in enumerate(specs):
+            fileNames[i] = exporter.export(spec)
+            yield (i + 1) / len(specs)
+
+        return fileNames
+
+    with ProcessPoolExecutor(
+            max_workers=numProcesses, initializer=_initExportWorker,
+            initargs=(sources, figParams, axParams)
+    ) as executor:
+        futures = {executor.submit(_exportWorker, spec): i
+                   for i, spec in enumerate(specs)}
+        for numDone, future in enumerate(as_completed(futures), start=1):
+            fileNames[futures[future]] = future.result()
+            yield numDone / len(specs)
+
+    return fileNames
@@ -14,8 +14,11 @@
 # limitations under the License.
 
 import numpy as np
+import functools
+from scipy.spatial import cKDTree
 
 from defdap import plotting
+from defdap.utils import parallelMap
 
 
 class Quat(object):
@@ -24,6 +27,16 @@ class Quat(object):
     """
     __slots__ = ['quatCoef']
 
+    # number of orientations to process at once in calcFundDirs
+    defaultChunkSize = 65536
+
+    # extent of the fundamental region of the IPF for each symmetry, as
+    # maximum inclination and azimuthal angles
+    ipfSectors = {
+        'cubic': (np.arccos(1 / np.sqrt(3)), np.pi / 4),
+        'hexagonal': (np.pi / 2, np.pi / 6),
+    }
+
     def __init__(self, *args):
         """
         Construct a Quat object from 4 quat coefficients or an array of
@@ -404,7 +417,7 @@ class Quat(object):
     def plotIPF(self, direction, symGroup, projection=None,
                 plot=None, fig=None, ax=None, makeInteractive=False,
                 plotColourBar=False, clabel="",
-                markerColour=None, markerSize=40, **kwargs):
+                markerColour=None, markerSize=40, density=False, **kwargs):
         """
         Plot IPF of orientation, with relation to specified sample direction.
 
@@ -433,11 +446,16 @@ class Quat(object):
         markerSize : int
             Size of markers (only used for half and half colouring,
             otherwise us argument s).
+        density : bool
+            If true, plot the density of orientations as an image instead
+            of a marker for each orientation.
         kwargs
-            All other arguments are passed to :func:`defdap.plotting.PolePlot.addPoints`.
+            All other arguments are passed to
+            :func:`defdap.plotting.PolePlot.addPoints` or
+            :func:`defdap.plotting.PolePlot.addDensity` if density is true.
 
         """
-        plotParams = {'marker': '+'}
+        plotParams = {} if density else {'marker': '+'}
         plotParams.update(kwargs)
 
         # Works as an instance or static method on a list of Quats
@@ -453,9 +471,12 @@ class Quat(object):
                 "IPF", symGroup, projection=projection,
                 ax=ax, fig=fig, makeInteractive=makeInteractive
             )
-        plot.addPoints(alphaFund, betaFund,
-                       markerColour=markerColour, markerSize=markerSize,
-                       **plotParams)
+        if density:
+            plot.addDensity(alphaFund, betaFund, **plotParams)
+        else:
+            plot.addPoints(alphaFund, betaFund,
+                           markerColour=markerColour, markerSize=markerSize,
+                           **plotParams)
 
         if plotColourBar:
             plot.addColourBar(clabel)
@@ -493,6 +514,35 @@ class Quat(object):
         plotParams = {}
         plotParams.update(kwargs)
 
+        planes = self.unitCellVerts(symGroup, cOverA=cOverA, OI=OI)
+
+        if plot is None:
+            plot = plotting.CrystalPlot(
+                ax=ax, fig=fig, makeInteractive=makeInteractive
+            )
+        plot.addVerts(planes, **plotParams)
+
+        return plot
+
+    def unitCellVerts(self, symGroup, cOverA=None, OI=True):
+        """Vertices of the faces of a unit cell rotated by the quat, as
+        plotted by plotUnitCell.
+
+        Parameters
+        ----------
+        symGroup : str
+            Crystal type, hexagonal or cubic.
+        cOverA : float
+            C over a ratio for hexagonal.
+        OI : bool
+            True if using oxford instruments system.
+
+        Returns
+        -------
+        list(numpy.ndarray)
+            Vertices of each face, shape (number of vertices, 3).
+
+        """
         if symGroup is None:
             raise ValueError("symGroup must be specified")
 
@@ -568,13 +618,7 @@ class Quat(object):
         for face in faces:
             planes.append(pts[face, :])
 
-        if plot is None:
-            plot = plotting.CrystalPlot(
-                ax=ax, fig=fig, makeInteractive=makeInteractive
-            )
-        plot.addVerts(planes, **plotParams)
-
-        return plot
+        return planes
 
 # Static methods
 
@@ -612,6 +656,46 @@ class Quat(object):
 
         return quats
 
+    @staticmethod
+    def plotIPFColourKey(symGroup, projection=None, plot=None, fig=None,
+                         ax=None, resolution=0.25, **kwargs):
+        """
+        Plot the IPF colour key for a crystal symmetry.
+
+        Parameters
+        ----------
+        symGroup : str
+            Crystal type (cubic, hexagonal).
+        projection : str
+             Projection to use. Either string (stereographic or lambert)
+             or a function.
+        plot : defdap.plotting.PolePlot
+            Defdap plot to plot on.
+        fig : matplotlib.figure.Figure
+            Figure to plot on, if not provided the current
+            active axis is used.
+        ax : matplotlib.axes.Axes
+            Axis to plot on, if not provided the current
+            active axis is used.
+        resolution : float, optional
+            Grid spacing in degrees of the colour table.
+        kwargs
+            All other arguments are passed to
+            :func:`defdap.plotting.PolePlot.addColourKey`.
+
+        Returns
+        -------
+        defdap.plotting.PolePlot
+
+        """
+        if plot is None:
+            plot = plotting.PolePlot(
+                "IPF", symGroup, projection=projection, ax=ax, fig=fig
+            )
+        plot.addColourKey(resolution=resolution, **kwargs)
+
+        return plot
+
     @staticmethod
     def calcSymEqvs(quats, symGroup, dtype=np.float):
         """Calculate all symmetrically equivalent quaternions of given quaternions.
@@ -761,7 +845,8 @@ class Quat(object):
         return alpha, beta
 
     @staticmethod
-    def calcIPFcolours(quats, direction, symGroup, dtype=np.float32):
+    def calcIPFcolours(quats, direction, symGroup, dtype=np.float32,
+                       resolution=None, chunkSize=None, numWorkers=1):
         """
         Calculate the RGB colours, based on the location of the given quats
         on the fundamental region of the IPF for the sample direction specified.
@@ -776,24 +861,72 @@ class Quat(object):
             Crystal type (cubic, hexagonal).
         dtype: numpy.dtype
             Data type to use for calculation.
+        resolution : float, optional
+            Angular resolution in degrees of the colour table colours are
+            interpolated from, see :func:`Quat.ipfColourTable`. If None
+            (default), colours are calculated exactly for each quat.
+        chunkSize : int, optional
+            Number of quats to process at once, see :func:`Quat.calcFundDirs`.
+        numWorkers : int, optional
+            Number of threads to process chunks with.
 
         Returns
         -------
         numpy.ndarray, shape (3, numQuats)
             Array of rgb colours for each quat.
 
+        """
+        rgb = np.empty((3, len(quats)), dtype=dtype)
+
+        def calcChunk(chunk):
+            alphaFund, betaFund = Quat._calcFundDirsChunk(
+                quats[chunk], direction, symGroup, dtype
+            )
+            if resolution is None:
+                rgb[:, chunk] = Quat.calcFundIPFcolours(
+                    alphaFund, betaFund, symGroup, dtype=dtype
+                )
+            else:
+                rgb[:, chunk] = Quat.lookupIPFcolours(
+                    alphaFund, betaFund, symGroup,
+                    resolution=resolution, dtype=dtype
+                )
+
+        Quat._processChunks(calcChunk, len(quats), chunkSize, numWorkers)
+
+        return rgb
+
+    @staticmethod
+    def calcFundIPFcolours(alphaFund, betaFund, symGroup, dtype=np.float32):
+        """
+        Calculate the RGB colours of directions in the fundamental region
+        of the IPF.
+
+        Parameters
+        ----------
+        alphaFund : numpy.ndarray
+            Inclination angles of the directions.
+        betaFund : numpy.ndarray
+            Azimuthal angles of the directions.
+        symGroup : str
+            Crystal type (cubic, hexagonal).
+        dtype: numpy.dtype
+            Data type to use for calculation.
+
+        Returns
+        -------
+        numpy.ndarray, shape (3, numDirections)
+            Array of rgb colours for each direction.
+
         References
         -------
         Stephen Cluff (BYU) - IPF_rgbcalc.m subroutine in OpenXY
         https://github.com/BYU-MicrostructureOfMaterials/OpenXY/blob/master/Code/PlotIPF.m
 
         """
-
-        numQuats = len(quats)
-
-        alphaFund, betaFund = Quat.calcFundDirs(
-            quats, direction, symGroup, dtype=dtype
-        )
+        alphaFund = np.ravel(alphaFund)
+        betaFund = np.ravel(betaFund)
+        numQuats = len(alphaFund)
 
         # revert to cartesians
         dirvec = np.empty((3, numQuats), dtype=dtype)
@@ -805,10 +938,12 @@ class Quat(object):
             poleDirections = np.array([[0, 0, 1], 
                                         [1, 0, 1]/np.sqrt(2), 
                                         [1, 1, 1]/np.sqrt(3)], dtype=dtype)
-        if symGroup == 'hexagonal':
+        elif symGroup == 'hexagonal':
             poleDirections = np.array([[0, 0, 1], 
                                         [np.sqrt(3), 1, 0]/np.sqrt(4), 
                                         [1, 0, 0]], dtype=dtype)
+        else:
+            raise Exception("symGroup must be cubic or hexagonal")
 
         rvect = np.broadcast_to(poleDirections[0].reshape((-1, 1)), (3, numQuats))
         gvect = np.broadcast_to(poleDirections[1].reshape((-1, 1)), (3, numQuats))
@@ -865,7 +1000,95 @@ class Quat(object):
         return rgb
 
     @staticmethod
-    def calcFundDirs(quats, direction, symGroup, dtype=np.float):
+    def ipfColourTable(symGroup, resolution=0.25):
+        """
+        Table of IPF colours sampled on a regular grid of inclination and
+        azimuthal angles covering the fundamental region of the IPF. The
+        table is calculated once for each symmetry and resolution and
+        then reused.
+
+        Parameters
+        ----------
+        symGroup : str
+            Crystal type (cubic, hexagonal).
+        resolution : float, optional
+            Grid spacing in degrees.
+
+        Returns
+        -------
+        alphas : numpy.ndarray
+            Inclination angles of the grid.
+        betas : numpy.ndarray
+            Azimuthal angles of the grid.
+        colours : numpy.ndarray, shape (3, len(alphas), len(betas))
+            RGB colours at each grid point. The arrays are shared between
+            calls so are read only.
+
+        """
+        if symGroup not in Quat.ipfSectors:
+            raise Exception("symGroup must be cubic or hexagonal")
+
+        return _ipfColourTable(symGroup, float(resolution))
+
+    @staticmethod
+    def lookupIPFcolours(alphaFund, betaFund, symGroup, resolution=0.25,
+                         dtype=np.float32):
+        """
+        Interpolate the RGB colours of directions in the fundamental
+        region of the IPF from the colour table of the symmetry.
+
+        Parameters
+        ----------
+        alphaFund : numpy.ndarray
+            Inclination angles of the directions.
+        betaFund : numpy.ndarray
+            Azimuthal angles of the directions.
+        symGroup : str
+            Crystal type (cubic, hexagonal).
+        resolution : float, optional
+            Grid spacing in degrees of the colour table.
+        dtype: numpy.dtype
+            Data type of the returned colours.
+
+        Returns
+        -------
+        numpy.ndarray, shape (3, numDirections)
+            Array of rgb colours for each direction.
+
+        """
+        alphas, betas, colours = Quat.ipfColourTable(symGroup, resolution)
+        step = alphas[1] - alphas[0]
+
+        alphaFund = np.ravel(alphaFund)
+        betaFund = np.ravel(betaFund)
+        valid = np.isfinite(alphaFund) & np.isfinite(betaFund)
+
+        # fractional position in the table, clipped to the sector
+        alphaPos = np.clip(np.where(valid, alphaFund, 0) / step,
+                           0, len(alphas) - 1)
+        betaPos = np.clip(np.where(valid, betaFund, 0) / step,
+                          0, len(betas) - 1)
+        alphaIdx = np.minimum(alphaPos.astype(int), len(alphas) - 2)
+        betaIdx = np.minimum(betaPos.astype(int), len(betas) - 2)
+        alphaFrac = (alphaPos - alphaIdx).astype(dtype)
+        betaFrac = (betaPos - betaIdx).astype(dtype)
+
+        # bilinear interpolation between the 4 surrounding entries
+        rgb = (
+            colours[:, alphaIdx, betaIdx] * ((1 - alphaFrac) * (1 - betaFrac)) +
+            colours[:, alphaIdx + 1, betaIdx] * (alphaFrac * (1 - betaFrac)) +
+            colours[:, alphaIdx, betaIdx + 1] * ((1 - alphaFrac) * betaFrac) +
+            colours[:, alphaIdx + 1, betaIdx + 1] * (alphaFrac * betaFrac)
+        ).astype(dtype, copy=False)
+        # remove rounding error in the weights
+        np.clip(rgb, 0, 1, out=rgb)
+        rgb[:, ~valid] = np.nan
+
+        return rgb
+
+    @staticmethod
+    def calcFundDirs(quats, direction, symGroup, dtype=np.float,
+                     chunkSize=None, numWorkers=1):
         """
         Transform the sample direction to crystal coords based on the quats
         and find the ones in the fundamental sector of the IPF.
@@ -880,12 +1103,56 @@ class Quat(object):
             Crystal type (cubic, hexagonal).
         dtype: numpy.dtype
             Data type to use for calculation.
+        chunkSize : int, optional
+            Number of quats to process at once. Symmetric equivalents are
+            only calculated for one chunk at a time so memory use does not
+            depend on the number of quats. Defaults to
+            `Quat.defaultChunkSize`.
+        numWorkers : int, optional
+            Number of threads to process chunks with, see
+            :func:`defdap.utils.parallelMap`. Each thread holds one chunk
+            so memory use scales with the number of threads.
 
         Returns
         -------
         float, float
             inclination angle and azimuthal angle (around z axis from x in anticlockwise as per ISO).
 
+        """
+        alphaFund = np.empty(len(quats), dtype=dtype)
+        betaFund = np.empty(len(quats), dtype=dtype)
+
+        def calcChunk(chunk):
+            alphaFund[chunk], betaFund[chunk] = Quat._calcFundDirsChunk(
+                quats[chunk], direction, symGroup, dtype
+            )
+
+        Quat._processChunks(calcChunk, len(quats), chunkSize, numWorkers)
+
+        return alphaFund, betaFund
+
+    @staticmethod
+    def _processChunks(func, numItems, chunkSize, numWorkers):
+        """Apply a function to consecutive slices covering a number of
+        items, in parallel if more than one slice.
+
+        """
+        if chunkSize is None:
+            chunkSize = Quat.defaultChunkSize
+        chunkSize = max(int(chunkSize), 1)
+        chunks = [slice(i, i + chunkSize)
+                  for i in range(0, numItems, chunkSize)]
+        if len(chunks) == 1:
+            numWorkers = 1
+
+        for _ in parallelMap(func, chunks, numWorkers=numWorkers):
+            pass
+
+    @staticmethod
+    def _calcFundDirsChunk(quats, direction, symGroup, dtype):
+        """Find the fundamental directions of a chunk of quats, see
+        :func:`Quat.calcFundDirs`.
+
         """
         # convert direction to float array
         direction = np.array(direction, dtype=dtype)
@@ -1068,3 +1335,226 @@ class Quat(object):
             return [qsym[0], qsym[2], qsym[5], qsym[8]] + qsym[-8:32]
         else:
             return [qsym[0]]
+
+
+@functools.lru_cache(maxsize=8)
+def _ipfColourTable(symGroup, resolution):
+    """Calculate the IPF colour table for a symmetry, see
+    :func:`Quat.ipfColourTable`.
+
+    """
+    alphaMax, betaMax = Quat.ipfSectors[symGroup]
+    step = np.deg2rad(resolution)
+
+    # extend grid to the first point on or past the edge of the sector
+    alphas = np.arange(int(np.ceil(alphaMax / step - 1e-6)) + 1) * step
+    betas = np.arange(int(np.ceil(betaMax / step - 1e-6)) + 1) * step
+
+    alphaGrid, betaGrid = np.meshgrid(alphas, betas, indexing='ij')
+    colours = Quat.calcFundIPFcolours(
+        alphaGrid, betaGrid, symGroup, dtype=np.float64
+    ).reshape((3,) + alphaGrid.shape).astype(np.float32)
+
+    for array in (alphas, betas, colours):
+        array.flags.writeable = False
+
+    return alphas, betas, colours
+
+
+class OrientationIndex(object):
+    """Nearest neighbour index of orientations, for finding the stored
+    orientations within a disorientation angle of, or closest to, query
+    orientations. All symmetric equivalents of the stored orientations
+    are held in a KD-tree over quaternion components, in the positive
+    hemisphere, and both signs of each query are searched. The distance
+    between unit quaternions is a function of the angle between them, so
+    the search is exact in disorientation angle.
+
+    Attributes
+    ----------
+    symGroup : str
+        Crystal type (cubic, hexagonal).
+    numSym : int
+        Number of symmetric equivalents of each orientation.
+    symComps : numpy.ndarray
+        Components of the symmetric equivalents of each orientation,
+        shape (numOris, numSym, 4).
+    tree : scipy.spatial.cKDTree
+        Tree of the symmetric equivalents.
+
+    """
+    def __init__(self, quats, symGroup, leafSize=16):
+        """Build an index of orientations.
+
+        Parameters
+        ----------
+        quats : list(defdap.quat.Quat) or numpy.ndarray
+            Orientations, either Quat objects or quaternion components
+            with shape (numOris, 4).
+        symGroup : str
+            Crystal type (cubic, hexagonal).
+        leafSize : int
+            Leaf size of the KD-tree.
+
+        """
+        comps = self.quatComponents(quats)
+        syms = np.array([sym.quatCoef for sym in Quat.symEqv(symGroup)])
+
+        # sym * quat for all symmetries and orientations, from the matrix
+        # of left multiplication by each symmetry
+        s0, s1, s2, s3 = syms.T
+        leftMult = np.stack([
+            np.stack([s0, -s1, -s2, -s3], axis=-1),
+            np.stack([s1, s0, -s3, s2], axis=-1),
+            np.stack([s2, s3, s0, -s1], axis=-1),
+            np.stack([s3, -s2, s1, s0], axis=-1),
+        ], axis=1)
+        symComps = np.einsum("sij,nj->nsi", leftMult, comps)
+        # swap into positive hemisphere
+        symComps[symComps[..., 0] < 0] *= -1
+
+        self.symGroup = symGroup
+        self.numSym = len(syms)
+        self.symComps = symComps
+        self.tree = cKDTree(symComps.reshape((-1, 4)), leafsize=leafSize)
+
+    def __len__(self):
+        return len(self.symComps)
+
+    @staticmethod
+    def quatComponents(quats):
+        """Quaternion components of orientations.
+
+        Parameters
+        ----------
+        quats : defdap.quat.Quat or list(defdap.quat.Quat) or numpy.ndarray
+            Orientations, either Quat objects or quaternion components
+            with a last axis of length 4.
+
+        Returns
+        -------
+        numpy.ndarray
+            Quaternion components, shape (numOris, 4).
+
+        """
+        if isinstance(quats, Quat):
+            return quats.quatCoef.reshape((1, 4))
+        quats = np.asarray(quats)
+        if quats.dtype == object:
+            quats = np.array([quat.quatCoef for quat in quats.ravel()])
+        return quats.astype(float).reshape((-1, 4))
+
+    @staticmethod
+    def chordToAngle(chord):
+        """Convert distance between unit quaternions to the angle
+        between the orientations in degrees."""
+        cosHalfAngle = np.clip(1 - chord**2 / 2, -1, 1)
+        return 360 * np.arccos(cosHalfAngle) / np.pi
+
+    @staticmethod
+    def angleToChord(angle):
+        """Convert angle between orientations in degrees to the distance
+        between unit quaternions."""
+        return np.sqrt(2 - 2 * np.cos(np.deg2rad(angle) / 2))
+
+    def queryRadius(self, quats, maxAngle, returnAngles=False):
+        """Find the stored orientations within a disorientation angle of
+        each query orientation.
+
+        Parameters
+        ----------
+        quats : defdap.quat.Quat or list(defdap.quat.Quat) or numpy.ndarray
+            Query orientations.
+        maxAngle : float
+            Maximum disorientation angle in degrees.
+        returnAngles : bool
+            Also return the disorientation angles.
+
+        Returns
+        -------
+        list(numpy.ndarray)
+            Indexes of the stored orientations found for each query, in
+            order. Arrays are returned directly for a single Quat.
+        list(numpy.ndarray)
+            Disorientation angles in degrees, if returnAngles is True.
+
+        """
+        comps = self.quatComponents(quats)
+        chord = self.angleToChord(maxAngle)
+        found = [self.tree.query_ball_point(sign * comps, chord)
+                 for sign in (1, -1)]
+
+        allIds = []
+        allAngles = []
+        for i, (entriesA, entriesB) in enumerate(zip(*found)):
+            ids = np.unique(np.array(entriesA + entriesB, dtype=int)
+                            // self.numSym)
+            allIds.append(ids)
+            if returnAngles:
+                cosHalfAngle = np.max(np.abs(np.einsum(
+                    "nsj,j->ns", self.symComps[ids], comps[i]
+                )), axis=1)
+                allAngles.append(
+                    360 * np.arccos(np.minimum(cosHalfAngle, 1)) / np.pi
+                )
+
+        if isinstance(quats, Quat):
+            allIds = allIds[0]
+            allAngles = allAngles[0] if returnAngles else allAngles
+        if returnAngles:
+            return allIds, allAngles
+        return allIds
+
+    def query(self, quats, k=1):
+        """Find the k stored orientations closest in disorientation angle
+        to each query orientation.
+
+        Parameters
+        ----------
+        quats : defdap.quat.Quat or list(defdap.quat.Quat) or numpy.ndarray
+            Query orientations.
+        k : int
+            Number of orientations to find.
+
+        Returns
+        -------
+        numpy.ndarray
+            Indexes of the closest stored orientations, nearest first,
+            shape (numQueries, k). -1 if there are fewer than k stored.
+            Without the first axis for a single Quat.
+        numpy.ndarray
+            Disorientation angles in degrees, NaN if there are fewer than
+            k stored.
+
+        """
+        comps = self.quatComponents(quats)
+        numQueries = len(comps)
+
+        # the k closest orientations are in the k * numSym closest
+        # entries, as each has numSym entries
+        numEntries = min(k * self.numSym, self.tree.n)
+        chords = []
+        entries = []
+        for sign in (1, -1):
+            chord, entry = self.tree.query(sign * comps, k=numEntries)
+            chords.append(np.reshape(chord, (numQueries, -1)))
+            entries.append(np.reshape(entry, (numQueries, -1)))
+        chords = np.concatenate(chords, axis=1)
+        oriIds = np.concatenate(entries, axis=1) // self.numSym
+
+        order = np.argsort(chords, axis=1, kind='stable')
+        chords = np.take_along_axis(chords, order, axis=1)
+        oriIds = np.take_along_axis(oriIds, order, axis=1)
+
+        ids = np.full((numQueries, k), -1, dtype=int)
+        angles = np.full((numQueries, k), np.nan)
+        for i in range(numQueries):
+            # keep the closest entry of each orientation
+            _, first = np.unique(oriIds[i], return_index=True)
+            first = np.sort(first)[:k]
+            ids[i, :len(first)] = oriIds[i, first]
+            angles[i, :len(first)] = self.chordToAngle(chords[i, first])
+
+        if isinstance(quats, Quat):
+            return ids[0], angles[0]
+        return ids, angles
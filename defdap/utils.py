@@ -13,7 +13,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
 
 def reportProgress(message=""):
     """Decorator for reporting progress of given function
@@ -63,3 +67,124 @@ def reportProgress(message=""):
         return wrapper
     return decorator
 
+
+
+def parallelMap(func, items, numWorkers=None):
+    """Apply a function to each item using a pool of worker threads.
+    Results are yielded as they complete, so this can be used within a
+    function decorated with reportProgress.
+
+    Parameters
+    ----------
+    func : callable
+        Function to apply, taking a single item as argument.
+    items : iterable
+        Items to apply the function to.
+    numWorkers : int, optional
+        Number of worker threads. Defaults to the number of CPUs, set
+        to 1 to run in serial in the calling thread.
+
+    Yields
+    ------
+    int, various
+        Index of the item and the result of the function for that item.
+
+    """
+    if numWorkers == 1:
+        for i, item in enumerate(items):
+            yield i, func(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=numWorkers) as executor:
+        futures = {executor.submit(func, item): i
+                   for i, item in enumerate(items)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+class TableWriter(object):
+    """Write tables to a CSV, Parquet or HDF5 file, either in one go or
+    as a sequence of chunks with the same columns. Parquet files need
+    pyarrow and HDF5 files need PyTables. Use as a context manager so the
+    file is closed after writing.
+
+    """
+    formats = {
+        '.csv': 'csv',
+        '.parquet': 'parquet',
+        '.pq': 'parquet',
+        '.h5': 'hdf5',
+        '.hdf': 'hdf5',
+        '.hdf5': 'hdf5',
+    }
+
+    def __init__(self, fileName, fmt=None, key='data'):
+        """Initialise a table writer.
+
+        Parameters
+        ----------
+        fileName : str
+            Path of the file to write, overwritten if it exists.
+        fmt : str, {'csv', 'parquet', 'hdf5'}, optional
+            File format, found from the file extension if not given.
+        key : str
+            Name of the table in a HDF5 file.
+
+        """
+        if fmt is None:
+            extension = os.path.splitext(str(fileName))[1].lower()
+            fmt = self.formats.get(extension)
+        if fmt not in self.formats.values():
+            raise ValueError("Unknown export format, use csv, parquet or "
+                             "hdf5.")
+
+        self.fileName = str(fileName)
+        self.fmt = fmt
+        self.key = key
+        self.numRows = 0
+        self.started = False
+        self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, table):
+        """Write a table, or the next chunk of a table, to the file.
+
+        Parameters
+        ----------
+        table : pandas.DataFrame
+
+        """
+        if self.fmt == 'csv':
+            table.to_csv(self.fileName, mode='a' if self.started else 'w',
+                         header=not self.started, index=False)
+
+        elif self.fmt == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            arrowTable = pa.Table.from_pandas(table, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.fileName,
+                                               arrowTable.schema)
+            self.writer.write_table(arrowTable)
+
+        else:
+            if self.writer is None:
+                self.writer = pd.HDFStore(self.fileName, mode='w')
+            self.writer.append(self.key, table, format='table', index=False)
+
+        self.started = True
+        self.numRows += len(table)
+
+    def close(self):
+        """Close the file.
+
+        """
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
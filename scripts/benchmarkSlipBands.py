@@ -0,0 +1,48 @@
+"""Benchmark the Radon and Fourier slice methods of slip band detection
+on synthetic banded grains.
+
+Usage: python benchmarkSlipBands.py [numGrains]
+"""
+import sys
+import time
+
+import numpy as np
+
+from defdap.hrdic import detectSlipBands, bandedGrainData
+
+
+def main(numGrains=50):
+    rng = np.random.default_rng(0)
+    grains = []
+    for i in range(numGrains):
+        angles = rng.uniform(0, 180, rng.integers(1, 3))
+        shape = tuple(rng.integers(30, 150, 2))
+        grains.append((angles, bandedGrainData(angles, shape, seed=i)))
+
+    cases = [("radon", 1), ("fourier", 1), ("fourier", 0.25)]
+    results = {}
+    for method, angularRes in cases:
+        start = time.perf_counter()
+        results[method, angularRes] = [
+            detectSlipBands(grainData, method=method, angularRes=angularRes)[0]
+            for _, grainData in grains
+        ]
+        duration = time.perf_counter() - start
+        print("{:8s} {:5.2f} deg: {:8.3f} s ({:6.2f} ms/grain)".format(
+            method, angularRes, duration, 1000 * duration / numGrains
+        ))
+
+    # mean error of detected angles from the nearest true band
+    for case, detected in results.items():
+        errors = []
+        for (angles, _), found in zip(grains, detected):
+            for angle in np.rad2deg(found):
+                diff = (angles - angle + 90) % 180 - 90
+                errors.append(np.min(np.abs(diff)))
+        print("{:8s} {:5.2f} deg: mean error {:.2f} deg".format(
+            *case, np.mean(errors)
+        ))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+import defdap.ebsd
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+# EBSD maps shared by the test modules, created once for each module
+@pytest.fixture(scope="module")
+def ebsd_map():
+    return defdap.ebsd.Map(os.path.join(DATA_DIR, "testDataEBSD"), "cubic")
+
+
+@pytest.fixture(scope="module")
+def ebsd_map_grains():
+    ebsd_map = defdap.ebsd.Map(os.path.join(DATA_DIR, "testDataEBSD"), "cubic")
+    ebsd_map.buildQuatArray()
+    ebsd_map.findBoundaries(boundDef=8)
+    ebsd_map.findGrains(minGrainSize=10)
+    return ebsd_map
+
+
+@pytest.fixture
+def ebsd_map_uf():
+    ebsd_map = defdap.ebsd.Map(os.path.join(DATA_DIR, "testDataEBSD"), "cubic")
+    ebsd_map.buildQuatArray()
+    ebsd_map.findGrains(minGrainSize=10, method='unionFind', boundDef=8)
+    return ebsd_map
@@ -0,0 +1,96 @@
+import pytest
+import numpy as np
+
+from defdap.base import (boundarySegments, chainSegments, connectedComponents,
+                         labelGeometry)
+
+
+class TestBoundaryLines:
+
+    @staticmethod
+    @pytest.fixture
+    def labels():
+        # square grain in the middle of another grain, with a third grain
+        # along the bottom
+        labels = np.ones((6, 6), dtype=int)
+        labels[1:3, 1:3] = 2
+        labels[4:] = 3
+        return labels
+
+    @staticmethod
+    def edges(labels):
+        return (labels[:, 1:] != labels[:, :-1],
+                labels[1:] != labels[:-1])
+
+    def test_segments(self, labels):
+        edgesX, edgesY = self.edges(labels)
+        segments = boundarySegments(edgesX, edgesY)
+
+        # 4 sides of the square and the line along the bottom grain
+        assert segments.shape == (5, 2, 2)
+        lengths = np.abs(segments[:, 1] - segments[:, 0]).sum(axis=1)
+        assert lengths.sum() == edgesX.sum() + edgesY.sum()
+        assert [[-0.5, 3.5], [5.5, 3.5]] in segments.tolist()
+
+    def test_segment_values(self, labels):
+        edgesX, edgesY = self.edges(labels)
+        valuesX = np.where(edgesX, 10., 0)
+        valuesY = np.where(edgesY, 10., 0)
+        valuesY[3, 3:] = 30.
+        segments, values = boundarySegments(edgesX, edgesY, valuesX,
+                                            valuesY, tol=5)
+
+        # line along the bottom grain is split where the value changes
+        assert len(segments) == 6
+        assert sorted(values) == [10.] * 5 + [30.]
+
+    def test_chain(self, labels):
+        edgesX, edgesY = self.edges(labels)
+        segments, values = boundarySegments(
+            edgesX, edgesY, np.where(edgesX, 5., 0), np.where(edgesY, 5., 0)
+        )
+        polylines, lineValues = chainSegments(segments, values=values)
+
+        assert len(polylines) == 2
+        # the square is a closed loop
+        square = [line for line in polylines if len(line) == 5][0]
+        assert np.array_equal(square[0], square[-1])
+        assert np.allclose(lineValues, 5)
+
+
+def test_connected_components():
+    # chain 3-1-4 and pair 0-2, with node 5 on its own
+    labels = connectedComponents(6, np.array([3, 0, 1]),
+                                 np.array([1, 2, 4]))
+
+    assert np.array_equal(labels, [0, 1, 0, 1, 1, 2])
+
+
+def test_label_geometry():
+    from skimage.measure import regionprops
+
+    # rectangle along x, diagonal band and a single point, with points
+    # not in a grain
+    labels = np.full((20, 30), -1, dtype=int)
+    labels[2:5, 3:20] = 1
+    i = np.arange(12)
+    labels[i + 6, i + 5] = 2
+    labels[i + 7, i + 5] = 2
+    labels[18, 28] = 3
+    geometry = labelGeometry(labels, 3)
+
+    for props in regionprops(np.maximum(labels, 0)):
+        i = props.label - 1
+        assert geometry['area'][i] == props.area
+        assert np.allclose((geometry['yCentroid'][i],
+                            geometry['xCentroid'][i]), props.centroid)
+        assert (geometry['yMin'][i], geometry['xMin'][i],
+                geometry['yMax'][i] + 1, geometry['xMax'][i] + 1) == props.bbox
+        assert geometry['majorAxis'][i] == pytest.approx(
+            props.major_axis_length)
+        assert geometry['minorAxis'][i] == pytest.approx(
+            props.minor_axis_length)
+
+    assert np.array_equal(geometry['perimeter'], [40, 50, 4])
+    assert np.allclose(np.rad2deg(geometry['orientation'][:2]), [90, 45],
+                       atol=1)
@@ -0,0 +1,163 @@
+import pytest
+import numpy as np
+
+from defdap.quat import Quat
+
+
+class TestFindGrainsUnionFind:
+
+    @staticmethod
+    def test_matches_flood_fill(ebsd_map_uf, ebsd_map_grains):
+        ebsd_map = ebsd_map_uf
+
+        # no boundary points and grain interiors are the same, grains
+        # can be numbered differently as boundary points are included
+        assert len(ebsd_map) == len(ebsd_map_grains)
+        assert not np.any(ebsd_map.grains == -1)
+        interior = ebsd_map_grains.grains > 0
+        pairs = np.unique(np.stack((ebsd_map.grains[interior],
+                                    ebsd_map_grains.grains[interior])),
+                          axis=1)
+        assert pairs.shape[1] == len(ebsd_map)
+
+        grain = ebsd_map[5]
+        assert all(ebsd_map.grains[y, x] == 6 for x, y in grain.coordList)
+        assert len(grain.quatList) == len(grain)
+
+    @staticmethod
+    def test_boundaries(ebsd_map_uf, ebsd_map_grains):
+        # points are boundaries if the next point in x or y is in a
+        # different region, these are all boundaries for the same
+        # critical misorientation
+        labels = ebsd_map_uf.componentLabels
+        boundaries = ebsd_map_uf.boundaries == -1
+        notBoundary = ~boundaries[:-1, :-1]
+        assert np.all(labels[:-1, :-1][notBoundary] ==
+                      labels[:-1, 1:][notBoundary])
+        assert np.all(labels[:-1, :-1][notBoundary] ==
+                      labels[1:, :-1][notBoundary])
+        inGrain = labels > 0
+        assert np.all(ebsd_map_grains.boundaries[boundaries & inGrain] == -1)
+
+        ebsd_map_uf.buildNeighbourNetwork()
+        assert ebsd_map_uf.neighbourNetwork.number_of_nodes() > 0
+
+    @staticmethod
+    def test_bound_def_per_phase(ebsd_map_uf):
+        with pytest.raises(ValueError):
+            ebsd_map_uf.findGrains(method='unionFind', boundDef=[8, 8])
+
+
+class TestMergeGrains:
+
+    @staticmethod
+    def test_twins(ebsd_map_uf):
+        twin = Quat.fromAxisAngle(np.array([1, 1, 1]), np.pi / 3)
+        pairs = ebsd_map_uf.grainAdjacency()
+        numGrains = len(ebsd_map_uf)
+        newIds = ebsd_map_uf.mergeGrains(relation=twin, tolerance=5)
+
+        assert len(ebsd_map_uf) == newIds.max() + 1 < numGrains
+        for i, grain in enumerate(ebsd_map_uf):
+            x, y = np.array(grain.coordList).T
+            assert np.all(ebsd_map_uf.grains[y, x] == i + 1)
+        assert np.count_nonzero(ebsd_map_uf.grains > 0) == sum(
+            len(grain) for grain in ebsd_map_uf)
+
+        # some neighbouring grains are now in the same grain
+        merged = newIds[pairs[:, 0]] == newIds[pairs[:, 1]]
+        assert np.any(merged)
+
+    @staticmethod
+    def test_predicate(ebsd_map_uf):
+        ebsd_map_uf.mergeGrains(predicate=lambda grainA, grainB: True)
+
+        # all grains touch so there is one left
+        assert len(ebsd_map_uf) == 1
+        assert len(ebsd_map_uf.grainAdjacency()) == 0
+
+
+class TestFilterGrains:
+
+    @staticmethod
+    def test_matches_find_grains(ebsd_map_uf):
+        grains = ebsd_map_uf.grains.copy()
+        grainList = list(ebsd_map_uf)
+
+        ebsd_map_uf.findGrains(minGrainSize=50, method='unionFind',
+                               boundDef=8)
+        expected = ebsd_map_uf.grains.copy()
+        ebsd_map_uf.filterGrains(50)
+        assert np.array_equal(ebsd_map_uf.grains, expected)
+
+        # back to the original size, kept grains are the same objects
+        ebsd_map_uf.filterGrains(10)
+        assert np.array_equal(ebsd_map_uf.grains, grains)
+        assert all(grainA.coordList == grainB.coordList
+                   for grainA, grainB in zip(ebsd_map_uf, grainList))
+
+    @staticmethod
+    def test_absorb(ebsd_map_uf):
+        numGrains = len(ebsd_map_uf)
+        newIds = ebsd_map_uf.filterGrains(50, absorb=True)
+
+        assert len(ebsd_map_uf) == newIds.max() + 1 < numGrains
+        assert np.all(ebsd_map_uf.componentSizes[newIds < 0] < 50)
+        # only non-indexed points are not in a grain
+        notIndexed = ebsd_map_uf.phaseArray == 0
+        assert np.all((ebsd_map_uf.grains < 1) == notIndexed)
+        for i, grain in enumerate(ebsd_map_uf):
+            x, y = np.array(grain.coordList).T
+            assert np.all(ebsd_map_uf.grains[y, x] == i + 1)
+
+    @staticmethod
+    def test_absorb_nothing(ebsd_map_uf):
+        # no regions are below the minimum size so none are absorbed
+        newIds = ebsd_map_uf.filterGrains(1, absorb=True)
+
+        assert np.array_equal(newIds, np.arange(len(newIds)))
+        assert np.array_equal(ebsd_map_uf.grains,
+                              ebsd_map_uf.componentLabels)
+
+
+class TestBoundaryLines:
+
+    @staticmethod
+    def test_rebuilt_after_merge(ebsd_map_uf):
+        ebsd_map = ebsd_map_uf
+        ebsd_map.mergeGrains(predicate=lambda grainA, grainB: True)
+
+        # only the edges between the grain and points not in a grain are
+        # left, one pixel long each
+        inGrain = ebsd_map.grains > 0
+        numEdges = (np.count_nonzero(inGrain[:, :-1] != inGrain[:, 1:]) +
+                    np.count_nonzero(inGrain[:-1] != inGrain[1:]))
+        length = sum(np.linalg.norm(np.diff(line, axis=0), axis=1).sum()
+                     for line in ebsd_map.boundaryLines)
+        assert np.isclose(length, numEdges)
+
+
+class TestGrainOriIndex:
+
+    @staticmethod
+    def test_grains_near_ori(ebsd_map_grains):
+        ebsd_map_grains.calcGrainAvOris()
+        ori = ebsd_map_grains[5].refOri
+        misOris = np.array([ori.misOri(grain.refOri, "cubic")
+                            for grain in ebsd_map_grains])
+        angles = 360 * np.arccos(np.minimum(misOris, 1)) / np.pi
+
+        grainIds = ebsd_map_grains.grainsNearOri(ori, 20)
+        assert 5 in grainIds
+        assert np.array_equal(grainIds, np.flatnonzero(angles <= 20))
+
+    @staticmethod
+    def test_match_grain_oris(ebsd_map_grains):
+        # every grain matches itself
+        grainIds, angles = ebsd_map_grains.matchGrainOris(ebsd_map_grains)
+        assert np.array_equal(grainIds, np.arange(len(ebsd_map_grains)))
+        assert np.allclose(angles, 0, atol=1e-3)
+
+        grainIds, _ = ebsd_map_grains.matchGrainOris(ebsd_map_grains,
+                                                     maxAngle=-1)
+        assert np.all(grainIds == -1)
@@ -1,6 +1,14 @@
+import os
+
+import pytest
+import numpy as np
+import pandas as pd
+from skimage import transform as tf
+
+import defdap.ebsd
+import defdap.hrdic
 
 # methods to test
-# '_grad',
 # '_map',
 # 'binning',
 # 'boundaries',
@@ -73,4 +81,488 @@
 # 'y_map',
 # 'yc',
 # 'yd',
-# 'ydim'
\ No newline at end of file
+# 'ydim'
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def link_maps(dic_map, ebsd_map, **kwargs):
+    """Crop the test DIC map and link it to the test EBSD map with
+    matching homologous points. kwargs are passed to linkEbsdMap."""
+    dic_map.setCrop(xMin=5, xMax=5, yMin=5, yMax=5)
+    dic_map.homogPoints = [(20, 20), (250, 30), (40, 170), (260, 180)]
+    ebsd_map.homogPoints = [(30, 25), (320, 35), (50, 215), (335, 225)]
+    dic_map.linkEbsdMap(ebsd_map, **kwargs)
+    return dic_map
+
+
+@pytest.fixture
+def dic_map(ebsd_map):
+    return link_maps(
+        defdap.hrdic.Map(DATA_DIR + os.sep, "testDataDIC.txt"), ebsd_map
+    )
+
+
+@pytest.fixture(scope="module")
+def dic_map_grains(ebsd_map_grains):
+    dic_map = link_maps(
+        defdap.hrdic.Map(DATA_DIR + os.sep, "testDataDIC.txt"),
+        ebsd_map_grains
+    )
+    dic_map.findGrains(minGrainSize=10)
+    return dic_map
+
+
+@pytest.fixture
+def dic_map_uf(ebsd_map_uf):
+    dic_map = link_maps(
+        defdap.hrdic.Map(DATA_DIR + os.sep, "testDataDIC.txt"), ebsd_map_uf
+    )
+    dic_map.findGrains(minGrainSize=10)
+    return dic_map
+
+
+class TestLinkEbsdGrains:
+
+    @staticmethod
+    def test_relinked_after_filter_and_merge(dic_map_uf, ebsd_map_uf):
+        for relabel in (lambda: ebsd_map_uf.filterGrains(200, absorb=True),
+                        lambda: ebsd_map_uf.mergeGrains(maxMisOri=20)):
+            relabel()
+            dic_map_uf.linkEbsdGrains()
+            for grain in dic_map_uf:
+                assert grain.ebsdGrain is ebsd_map_uf[grain.ebsdGrainId]
+            assert dic_map_uf.ebsdGrainIds == [grain.ebsdGrainId
+                                               for grain in dic_map_uf]
+
+    @staticmethod
+    def test_union_find_map(dic_map_uf, ebsd_map_uf):
+        assert len(dic_map_uf) > 0
+        for grain in dic_map_uf:
+            assert grain.ebsdGrain is ebsd_map_uf[grain.ebsdGrainId]
+
+        dic_map_uf.calcProxigram()
+        proxigram = dic_map_uf.proxigramArr
+        assert proxigram.shape == (dic_map_uf.yDim, dic_map_uf.xDim)
+        assert np.all(proxigram[dic_map_uf.boundaries == -1] < 1)
+
+
+class TestBoundaryLines:
+
+    @staticmethod
+    def test_polynomial_link(dic_map_grains, ebsd_map_grains):
+        dic_map = link_maps(
+            defdap.hrdic.Map(DATA_DIR + os.sep, "testDataDIC.txt"),
+            ebsd_map_grains, transformType="polynomial", order=1
+        )
+
+        # a first order polynomial is an affine transform
+        for line, affineLine in zip(dic_map.boundaryLines,
+                                    dic_map_grains.boundaryLines):
+            assert np.allclose(line, affineLine, atol=5)
+
+        plot = dic_map.plotMaxShear(plotGBs=True)
+        assert len(plot.ax.collections) == 1
+
+
+class TestGatherToDicFrame:
+
+    @staticmethod
+    def test_matches_nearest_neighbour_warp(dic_map, ebsd_map):
+        gathered = dic_map.gatherToDicFrame(ebsd_map.phaseArray)
+        warped = dic_map.warpToDicFrame(ebsd_map.phaseArray.astype(float),
+                                        order=0, preserve_range=True)
+        assert gathered.dtype == ebsd_map.phaseArray.dtype
+        assert np.all(gathered == warped)
+
+    @staticmethod
+    def test_keeps_leading_axes(dic_map, ebsd_map):
+        gathered = dic_map.gatherToDicFrame(ebsd_map.eulerAngleArray)
+        assert gathered.shape == (3, dic_map.yDim, dic_map.xDim)
+
+    @staticmethod
+    def test_outside_ebsd_map(dic_map, ebsd_map):
+        # shift the DIC map so the left half lies outside the EBSD map
+        dic_map.ebsdTransform = tf.AffineTransform(
+            translation=(-dic_map.xDim // 2, 0)
+        )
+        dic_map.ebsdPixelIndexArr = None
+        gathered = dic_map.gatherToDicFrame(
+            ebsd_map.bandContrastArray.astype(float)
+        )
+        assert np.all(np.isnan(gathered[:, :dic_map.xDim // 2]))
+        assert not np.any(np.isnan(gathered[:, dic_map.xDim // 2:]))
+
+    @staticmethod
+    def test_cache_reset_by_crop(dic_map):
+        dic_map.calcEbsdPixelIndex()
+        dic_map.setCrop(xMin=10)
+        assert dic_map.ebsdPixelIndexArr is None
+        assert dic_map.ebsdPixelIndex.shape == (dic_map.yDim, dic_map.xDim)
+
+
+class TestDetectSlipBands:
+
+    @staticmethod
+    @pytest.mark.parametrize('angles, shape', [
+        ([30], (60, 80)),
+        ([75], (100, 50)),
+        ([10, 100], (70, 70)),
+        ([40, 120], (45, 90)),
+        ([160], (35, 60)),
+    ])
+    def test_fourier_matches_radon(angles, shape):
+        grainData = defdap.hrdic.bandedGrainData(angles, shape=shape)
+        radonAngles, _ = defdap.hrdic.detectSlipBands(grainData)
+        fourierAngles, _ = defdap.hrdic.detectSlipBands(
+            grainData, method='fourier', angularRes=0.25
+        )
+        radonAngles = np.rad2deg(np.sort(radonAngles))
+        fourierAngles = np.rad2deg(np.sort(fourierAngles))
+
+        assert len(fourierAngles) == len(radonAngles) == len(angles)
+        diff = (fourierAngles - radonAngles + 90) % 180 - 90
+        assert np.all(np.abs(diff) <= 2)
+        diff = (fourierAngles - np.sort(angles) + 90) % 180 - 90
+        assert np.all(np.abs(diff) <= 1)
+
+    @staticmethod
+    def test_unknown_method():
+        with pytest.raises(ValueError):
+            defdap.hrdic.detectSlipBands(defdap.hrdic.bandedGrainData([30]),
+                                         method='hough')
+
+    @staticmethod
+    def test_radon_support_cached():
+        grainData = defdap.hrdic.bandedGrainData([30])
+        defdap.hrdic.detectSlipBands(grainData)
+        hits = defdap.hrdic._radonSupport.cache_info().hits
+        defdap.hrdic.detectSlipBands(2 * grainData, thres=0.5)
+        assert defdap.hrdic._radonSupport.cache_info().hits == hits + 1
+
+    @staticmethod
+    def test_threaded_matches_serial(dic_map_grains):
+        grainIds = list(range(10))
+        dic_map_grains.calcSlipBands(grainIds=grainIds, numWorkers=1)
+        serial = [dic_map_grains[i].slipBandAngles for i in grainIds]
+        dic_map_grains.calcSlipBands(grainIds=grainIds, numWorkers=4)
+
+        for i, angles in zip(grainIds, serial):
+            assert np.array_equal(dic_map_grains[i].slipBandAngles, angles)
+            assert np.array_equal(dic_map_grains.slipBandAngles[i], angles)
+        assert np.array_equal(
+            dic_map_grains.numSlipBands[grainIds],
+            [len(angles) for angles in serial]
+        )
+
+    @staticmethod
+    def test_subset_keeps_results(dic_map_grains):
+        dic_map_grains.calcSlipBands(grainIds=[0, 1], numWorkers=1)
+        angles = list(dic_map_grains.slipBandAngles[:2])
+        dic_map_grains.calcSlipBands(grainIds=[2], numWorkers=1)
+
+        for i in (0, 1):
+            assert np.array_equal(dic_map_grains.slipBandAngles[i], angles[i])
+            assert dic_map_grains.numSlipBands[i] == len(angles[i])
+        assert dic_map_grains.numSlipBands[2] == \
+            len(dic_map_grains[2].slipBandAngles)
+
+
+class TestSlipTraceAnalysis:
+
+    @staticmethod
+    def test_needs_slip_systems(dic_map_uf):
+        with pytest.raises(Exception, match="Slip systems"):
+            dic_map_uf.runSlipTraceAnalysis(grainIds=[0])
+
+    @staticmethod
+    def test_matched_bands(dic_map_grains, ebsd_map_grains):
+        ebsd_map_grains.loadSlipSystems('cubic_fcc')
+        grainIds = list(range(15))
+        table = dic_map_grains.runSlipTraceAnalysis(
+            grainIds=grainIds, tolerance=5, numWorkers=2
+        )
+
+        # a row for each detected band of each grain
+        assert list(table['grainId']) == [
+            i for i in grainIds
+            for _ in dic_map_grains[i].slipBandAngles
+        ]
+        for _, row in table.iterrows():
+            ebsdGrain = dic_map_grains[row['grainId']].ebsdGrain
+            assert np.allclose(row[['eul1', 'eul2', 'eul3']].astype(float),
+                               ebsdGrain.refOri.eulerAngles() * 180 / np.pi)
+            assert np.all(np.abs(row['deviation']) <= 5)
+            assert len(row['systems']) == len(row['deviation'])
+            # RDR is only calculated for matched bands
+            if len(row['systems']) == 0:
+                assert np.isnan(row['RDR'])
+
+        matched = table['systems'].apply(len) > 0
+        assert matched.any()
+        assert np.isfinite(table['RDR'][matched]).any()
+
+
+class TestCalcStats:
+
+    @staticmethod
+    def test_matches_numpy(dic_map):
+        table = dic_map.calcStats(['Min', 5, 50, 'Mean', 99.5, 'Max', 'Std'],
+                                  ['mss', 'e11'])
+        for _, row in table.iterrows():
+            data = dic_map.crop(dic_map._statComponent(row['component']))
+            assert row['numPoints'] == data.size
+            assert row['Min'] == pytest.approx(data.min())
+            assert row['Max'] == pytest.approx(data.max())
+            assert row['Mean'] == pytest.approx(data.mean())
+            assert row['Std'] == pytest.approx(data.std())
+            for p in (5, 50, 99.5):
+                assert row['P{}'.format(p)] == \
+                    pytest.approx(np.percentile(data, p))
+
+    @staticmethod
+    def test_moments_only(dic_map):
+        table = dic_map.calcStats(['Mean', 'Std'], ['e11'])
+        data = dic_map.crop(dic_map._statComponent('e11'))
+        assert table['Mean'][0] == pytest.approx(data.mean())
+        assert table['Std'][0] == pytest.approx(data.std())
+
+        _, _, values = defdap.hrdic.groupedStats(
+            data, np.ones(data.shape, dtype=int), 1, ['Mean']
+        )
+        assert values[0][0] == pytest.approx(data.mean())
+
+    @staticmethod
+    def test_grouped_matches_numpy():
+        rng = np.random.default_rng(0)
+        data = rng.normal(size=(50, 60))
+        data[0, :10] = np.nan
+        labels = rng.integers(-2, 6, size=data.shape)
+
+        grainIds, numPoints, values = defdap.hrdic.groupedStats(
+            data, labels, 6, [10, 'Mean', 90]
+        )
+        for i in grainIds:
+            groupData = data[(labels == i + 1) & np.isfinite(data)]
+            assert numPoints[i] == groupData.size
+            if groupData.size == 0:
+                assert np.all(np.isnan([value[i] for value in values]))
+                continue
+            assert values[0][i] == pytest.approx(np.percentile(groupData, 10))
+            assert values[1][i] == pytest.approx(groupData.mean())
+            assert values[2][i] == pytest.approx(np.percentile(groupData, 90))
+
+
+class TestMapSeries:
+
+    @staticmethod
+    @pytest.fixture
+    def series(ebsd_map_grains):
+        series = defdap.hrdic.MapSeries(
+            DATA_DIR + os.sep, ["testDataDIC.txt"] * 3, cacheSize=2
+        )
+        link_maps(series.refMap, ebsd_map_grains)
+        return series
+
+    @staticmethod
+    def test_fields_match_map(series):
+        refMap = series.refMap
+        for component in defdap.hrdic.STRAIN_COMPONENTS:
+            fieldData = series.fieldData(0, component)
+            assert fieldData.shape == (refMap.yDim, refMap.xDim)
+            assert np.allclose(fieldData,
+                               refMap.crop(getattr(refMap, component)))
+
+    @staticmethod
+    def test_cache_size(series):
+        for increment in range(len(series)):
+            series.calcFields(increment)
+        assert list(series._fieldCache.keys()) == [1, 2]
+        series.calcFields(1)
+        assert list(series._fieldCache.keys()) == [2, 1]
+
+    @staticmethod
+    def test_grain_evolution(series):
+        refMap = series.refMap
+        refMap.findGrains(minGrainSize=10)
+        evolution = series.calcGrainEvolution('mss', 'Mean')
+
+        assert evolution.shape == (len(series), len(refMap))
+        assert np.allclose(evolution, evolution[-1])
+        maxShear = refMap.crop(refMap.eMaxShear)
+        for grainId in (0, len(refMap) - 1):
+            assert evolution[0, grainId] == pytest.approx(
+                maxShear[refMap.grains == grainId + 1].mean()
+            )
+
+
+class TestGrainMapDataCoarse:
+
+    @staticmethod
+    def coarsen_loop(grainMapData, kernelSize):
+        coarse = np.full_like(grainMapData, np.nan)
+        for i, j in np.ndindex(grainMapData.shape):
+            if np.isnan(grainMapData[i, j]):
+                continue
+            window = grainMapData[max(i - kernelSize, 0):i + kernelSize + 1,
+                                  max(j - kernelSize, 0):j + kernelSize + 1]
+            coarse[i, j] = np.nanmean(window)
+        return coarse
+
+    @staticmethod
+    @pytest.mark.parametrize('kernelSize', [1, 2])
+    def test_grain_matches_loop(dic_map_grains, kernelSize):
+        mapData = dic_map_grains.crop(dic_map_grains.eMaxShear).copy()
+        grain = dic_map_grains[0]
+        x0, y0, _, _ = grain.extremeCoords
+        mapData[y0 + 2, x0:x0 + 40] = np.nan
+
+        coarse = grain.grainMapDataCoarse(mapData=mapData,
+                                          kernelSize=kernelSize)
+        expected = TestGrainMapDataCoarse.coarsen_loop(
+            grain.grainMapData(mapData=mapData), kernelSize
+        )
+        assert np.array_equal(np.isnan(coarse), np.isnan(expected))
+        assert np.allclose(coarse[~np.isnan(coarse)],
+                           expected[~np.isnan(expected)])
+
+    @staticmethod
+    def test_map_matches_grains(dic_map_grains):
+        mapData = dic_map_grains.crop(dic_map_grains.eMaxShear)
+        coarse = dic_map_grains.grainMapDataCoarse(mapData, kernelSize=2)
+
+        assert np.all(np.isnan(coarse[dic_map_grains.grains <= 0]))
+        for grain in dic_map_grains[:10]:
+            grainCoarse = grain.grainMapDataCoarse(mapData=mapData,
+                                                   kernelSize=2)
+            x0, y0, xmax, ymax = grain.extremeCoords
+            inGrain = ~np.isnan(grainCoarse)
+            assert np.allclose(coarse[y0:ymax + 1, x0:xmax + 1][inGrain],
+                               grainCoarse[inGrain])
+
+
+class TestGrainDataToMapData:
+
+    @staticmethod
+    def test_matches_grain_coords(dic_map_grains):
+        grainData = np.arange(len(dic_map_grains)) + 1.
+        grainMap = dic_map_grains.grainDataToMapData(grainData, bg=-1.)
+
+        expected = np.full(dic_map_grains.grains.shape, -1.)
+        for value, grain in zip(grainData, dic_map_grains):
+            for x, y in grain.coordList:
+                expected[y, x] = value
+        assert np.array_equal(grainMap, expected)
+
+    @staticmethod
+    def test_rgb_subset(dic_map_grains):
+        grainMap = dic_map_grains.grainDataToMapData(
+            [[1., 0., 0.], [0., 1., 0.]], grainIds=[0, 3]
+        )
+        assert grainMap.shape == dic_map_grains.grains.shape + (3,)
+        assert np.all(grainMap[dic_map_grains.grains == 1] == [1, 0, 0])
+        assert np.all(grainMap[dic_map_grains.grains == 4] == [0, 1, 0])
+        assert np.all(grainMap[dic_map_grains.grains == 2] == 0)
+        assert np.all(grainMap[dic_map_grains.grains < 0] == 0)
+
+
+class TestGrainHighlights:
+
+    @staticmethod
+    def test_lookup_colours(dic_map_grains):
+        import matplotlib.pyplot as plt
+        from defdap.plotting import MapPlot
+
+        plot = MapPlot(dic_map_grains, makeInteractive=True)
+        plot.addGrainHighlights([0, 3, 5], grainColours=['red', 'blue'],
+                                alpha=0.5)
+        img = plot.addGrainHighlights([2, 4], grainColours=['red'],
+                                      alpha=0.5)
+        colours = img.to_rgba(img.get_array())
+        grains = dic_map_grains.grains
+        plt.close(plot.fig)
+
+        assert np.all(colours[grains == 3] == [1, 0, 0, 0.5])
+        assert np.all(colours[grains == 5] == [1, 0, 0, 0.5])
+        assert np.all(colours[grains == 1][:, 3] == 0)
+        assert np.all(colours[grains <= 0][:, 3] == 0)
+
+
+class TestExport:
+
+    @staticmethod
+    def test_grain_table(dic_map_grains):
+        table = dic_map_grains.grainTable()
+        assert len(table) == len(dic_map_grains)
+        assert np.array_equal(table['ebsdGrainId'],
+                              dic_map_grains.ebsdGrainIds)
+        assert np.array_equal(table['area'],
+                              [len(grain) for grain in dic_map_grains])
+        assert table['meanMaxShear'][3] == pytest.approx(
+            np.mean(dic_map_grains.crop(dic_map_grains.eMaxShear)[
+                dic_map_grains.grains == 4]))
+
+    @staticmethod
+    def test_slip_system_table(ebsd_map_grains):
+        ebsd_map_grains.loadSlipSystems('cubic_fcc')
+        grainIds = [0, 4]
+        for grainId in grainIds:
+            ebsd_map_grains[grainId].calcAverageSchmidFactors(
+                np.array([1, 0, 0]))
+        table = ebsd_map_grains.grainTable(perSlipSystem=True)
+
+        assert len(table) == 12 * len(ebsd_map_grains)
+        for grainId in grainIds:
+            rows = table[table['grainId'] == grainId]
+            assert np.allclose(rows['schmidFactor'], np.concatenate(
+                ebsd_map_grains[grainId].averageSchmidFactors))
+            assert rows['maxSF'].iloc[0] == rows['schmidFactor'].max()
+        assert np.all(np.isnan(table['schmidFactor'][table['grainId'] == 1]))
+
+    @staticmethod
+    def test_map_data_chunks(dic_map_grains, tmp_path):
+        fileName = tmp_path / "map.csv"
+        dic_map_grains.exportMapData(fileName, chunkSize=1000)
+        table = pd.read_csv(fileName)
+
+        assert len(table) == dic_map_grains.xDim * dic_map_grains.yDim
+        x, y = table['x'].values, table['y'].values
+        grains = dic_map_grains.grains[y, x]
+        assert np.array_equal(table['grainId'],
+                              np.where(grains > 0, grains - 1, -1))
+        assert np.allclose(table['eMaxShear'], dic_map_grains.crop(
+            dic_map_grains.eMaxShear)[y, x])
+
+    @staticmethod
+    def test_unknown_format(dic_map_grains, tmp_path):
+        with pytest.raises(ValueError):
+            dic_map_grains.exportGrainData(tmp_path / "grains.txt")
+
+
+class TestSelectGrains:
+
+    @staticmethod
+    def test_matches_loop(dic_map_grains):
+        dic_map_grains.calcGrainAttributes()
+        values = np.random.default_rng(0).random(len(dic_map_grains))
+        values[3] = np.nan
+        dic_map_grains.setGrainAttribute('value', values)
+
+        selected = dic_map_grains.selectGrains(
+            dic_map_grains.grainAttributes['ebsdGrainId'] % 2 == 0,
+            area=(50, None), value=(0.2, 0.7)
+        )
+        expected = [
+            i for i, grain in enumerate(dic_map_grains)
+            if dic_map_grains.ebsdGrainIds[i] % 2 == 0 and
+            len(grain) >= 50 and 0.2 <= values[i] <= 0.7
+        ]
+        assert np.array_equal(selected, expected)
+        assert len(dic_map_grains.selectGrains(value=(None, None))) == \
+            len(dic_map_grains) - 1
+
+    @staticmethod
+    def test_unknown_attribute(dic_map_grains):
+        with pytest.raises(ValueError):
+            dic_map_grains.selectGrains(notAnAttribute=(0, 1))
@@ -0,0 +1,186 @@
+import pytest
+import numpy as np
+from types import SimpleNamespace
+
+from defdap.inspector import (rdrSamplePoints, calcRDR, rdrFromLines,
+                              slipBandLines, batchCalcRDR, AnnotationStore)
+
+
+class TestCalcRDR:
+
+    @staticmethod
+    @pytest.fixture
+    def stepped_grain():
+        # displacement step across the line y = x, in the direction (1, 2)
+        yy, xx = np.mgrid[:40, :40]
+        step = (yy > xx).astype(float)
+        displacements = (0.3 * step, 0.6 * step)
+        grain = SimpleNamespace(
+            pointsList=[[np.array([8., 8., 30., 30.]), 45., 0]],
+            extremeCoords=(0, 0, 39, 39)
+        )
+        return grain, displacements
+
+    @staticmethod
+    def test_sample_points():
+        x, y = rdrSamplePoints([2., 3., 12., 3.])
+
+        # horizontal line, so vertical perpendicular lines
+        assert x.dtype.kind == 'i'
+        assert np.all(x == x[:, :1])
+        assert np.array_equal(x[:, 0], np.arange(2, 13))
+        assert len(np.unique(y[0])) == y.shape[1]
+
+    @staticmethod
+    @pytest.mark.parametrize('interpolate', [False, True])
+    def test_slope(stepped_grain, interpolate):
+        grain, displacements = stepped_grain
+        linRegResults = calcRDR(None, grain, 0, length=10,
+                                interpolate=interpolate,
+                                displacements=displacements)
+
+        assert linRegResults.slope == pytest.approx(0.5)
+
+    @staticmethod
+    def test_batch(stepped_grain):
+        grain, displacements = stepped_grain
+        grain.groupsList = [[0, 45., [], [], np.nan]]
+        otherGrain = SimpleNamespace(pointsList=[], groupsList=[],
+                                     extremeCoords=(0, 0, 39, 39))
+
+        # map of grains with the displacement maps already cropped
+        class SteppedMap(list):
+            x_map, y_map = displacements
+
+            @staticmethod
+            def crop(mapData):
+                return mapData
+
+        dicMap = SteppedMap([otherGrain, grain])
+        expected = calcRDR(dicMap, grain, 0, length=10)
+        table = batchCalcRDR(dicMap, length=10)
+
+        assert len(table) == 1
+        row = table.iloc[0]
+        assert row['grainId'] == 1 and row['group'] == 0
+        assert row['RDR'] == pytest.approx(expected.slope)
+        assert row['RDR'] == pytest.approx(0.5)
+        assert row['stdErr'] == pytest.approx(expected.stderr)
+        assert row['rSquared'] == pytest.approx(expected.rvalue**2)
+        # RDR is stored in the group, as in the grain inspector
+        assert grain.groupsList[0][4] == pytest.approx(0.5)
+
+    @staticmethod
+    def test_slip_band_lines(stepped_grain):
+        _, displacements = stepped_grain
+        mask = np.zeros((40, 40), dtype=bool)
+        mask[5:35, 5:35] = True
+
+        # band along y = x is 45 degrees from vertical
+        lines = slipBandLines(mask, np.deg2rad(45), spacing=3)
+        linRegResults, _, _, x, y = rdrFromLines(
+            lines, (0, 0), displacements, length=10, mask=mask
+        )
+
+        assert linRegResults.slope == pytest.approx(0.5)
+        x, y = np.concatenate(x), np.concatenate(y)
+        assert np.all(mask[y, x])
+
+
+class TestAnnotationStore:
+
+    COORDS = [(1, 2), (2, 2), (1, 3)]
+
+    @staticmethod
+    def make_grain(points, coordList=COORDS):
+        return SimpleNamespace(
+            pointsList=[[np.array(points), np.float64(45.), np.int64(0)]],
+            groupsList=[[0, np.float64(45.), [1], [0.5], 0.25]],
+            coordList=coordList
+        )
+
+    @staticmethod
+    def test_save_and_load(tmp_path):
+        fileName = str(tmp_path / 'annotations.txt')
+        store = AnnotationStore(fileName, 'mapA')
+        store.save(3, TestAnnotationStore.make_grain([0., 0., 5., 5.]))
+        store.save(3, TestAnnotationStore.make_grain([1., 1., 6., 6.]))
+        AnnotationStore(fileName, 'mapB').save(
+            3, TestAnnotationStore.make_grain([2., 2., 7., 7.])
+        )
+
+        # latest record of the map is loaded when reopened
+        store = AnnotationStore(fileName, 'mapA')
+        assert store.grainIds == [3]
+        grain = SimpleNamespace(pointsList=[], groupsList=[],
+                                coordList=TestAnnotationStore.COORDS)
+        assert not store.load(0, grain)
+        assert store.load(3, grain)
+        assert np.array_equal(grain.pointsList[0][0], [1., 1., 6., 6.])
+        assert grain.groupsList == [[0, 45., [1], [0.5], 0.25]]
+
+        store.compact()
+        with open(fileName) as f:
+            assert len(f.readlines()) == 2
+        assert store.load(3, grain)
+        assert np.array_equal(grain.pointsList[0][0], [1., 1., 6., 6.])
+
+    @staticmethod
+    def test_different_grain(tmp_path):
+        fileName = str(tmp_path / 'annotations.txt')
+        store = AnnotationStore(fileName, 'mapA')
+        store.save(3, TestAnnotationStore.make_grain([0., 0., 5., 5.]))
+
+        # grain 3 is a different grain after grains are found again
+        grain = SimpleNamespace(pointsList=[], groupsList=[],
+                                coordList=[(5, 5), (6, 5), (5, 6)])
+        with pytest.warns(UserWarning):
+            assert not store.load(3, grain)
+        assert grain.pointsList == []
+
+    @staticmethod
+    @pytest.mark.parametrize('mapKey', ['map\tA', 'map\nA'])
+    def test_bad_map_key(tmp_path, mapKey):
+        with pytest.raises(ValueError):
+            AnnotationStore(str(tmp_path / 'annotations.txt'), mapKey)
+
+    @staticmethod
+    def test_partial_line(tmp_path):
+        fileName = str(tmp_path / 'annotations.txt')
+        # partial record left by an interrupted write
+        with open(fileName, 'w') as f:
+            f.write('mapA\t2\t{"pointsList": [[[0.0')
+        store = AnnotationStore(fileName, 'mapA')
+        assert store.grainIds == []
+        store.save(3, TestAnnotationStore.make_grain([0., 0., 5., 5.]))
+
+        # partial record cannot be read but the new record is intact
+        store = AnnotationStore(fileName, 'mapA')
+        assert store.grainIds == [2, 3]
+        grain = SimpleNamespace(pointsList=[], groupsList=[],
+                                coordList=TestAnnotationStore.COORDS)
+        with pytest.warns(UserWarning):
+            assert not store.load(2, grain)
+        assert store.load(3, grain)
+        assert np.array_equal(grain.pointsList[0][0], [0., 0., 5., 5.])
+
+    @staticmethod
+    def test_corrupt_line(tmp_path):
+        fileName = str(tmp_path / 'annotations.txt')
+        store = AnnotationStore(fileName, 'mapA')
+        store.save(3, TestAnnotationStore.make_grain([0., 0., 5., 5.]))
+        with open(fileName, 'a') as f:
+            f.write('mapA\tx\t{}\n')
+            f.write('mapA\t4\tnot json\n')
+
+        store = AnnotationStore(fileName, 'mapA')
+        assert store.grainIds == [3, 4]
+        grains = {
+            grainId: SimpleNamespace(pointsList=[], groupsList=[],
+                                     coordList=TestAnnotationStore.COORDS)
+            for grainId in (3, 4)
+        }
+        with pytest.warns(UserWarning):
+            store.loadAll(grains)
+        assert np.array_equal(grains[3].pointsList[0][0], [0., 0., 5., 5.])
+        assert grains[4].pointsList == []
@@ -0,0 +1,145 @@
+import pytest
+import numpy as np
+import matplotlib.pyplot as plt
+
+from defdap.plotting import ImagePyramid, Plot, PolePlot, exportPlots
+from defdap.quat import Quat
+
+
+class TestHoldDraw:
+
+    @staticmethod
+    def test_single_draw():
+        plot = Plot(ax=None)
+        draws = []
+        plot.fig.canvas.draw = lambda *args, **kwargs: draws.append(1)
+
+        with plot.holdDraw():
+            for _ in range(3):
+                plot.draw()
+            assert len(draws) == 0
+        assert len(draws) == 1
+
+        # no draw if none was requested
+        with plot.holdDraw():
+            pass
+        assert len(draws) == 1
+        plot.draw()
+        assert len(draws) == 2
+        plt.close(plot.fig)
+
+
+class TestImagePyramid:
+
+    @staticmethod
+    def test_mode_keeps_labels():
+        labels = np.repeat(np.repeat(np.arange(12).reshape(3, 4), 5, 0), 7, 1)
+        pyramid = ImagePyramid(labels, decimation='mode')
+
+        assert pyramid.numLevels == 6
+        for i in range(pyramid.numLevels):
+            level = pyramid.level(i)
+            assert level.dtype == labels.dtype
+            assert set(np.unique(level)) <= set(np.unique(labels))
+        assert pyramid.level(1).shape == (8, 14)
+        assert pyramid.level(10).shape == (1, 1)
+
+    @staticmethod
+    def test_mean_ignores_nan():
+        data = np.arange(16, dtype=float).reshape(4, 4)
+        data[0, 0] = np.nan
+        level = ImagePyramid(data).level(1)
+
+        assert level[0, 0] == pytest.approx((1 + 4 + 5) / 3)
+        assert level[1, 1] == pytest.approx((10 + 11 + 14 + 15) / 4)
+
+    @staticmethod
+    def test_max_keeps_boundaries():
+        boundaries = np.zeros((9, 9), dtype=int)
+        boundaries[4, :] = 1
+        level = ImagePyramid(boundaries, decimation='max').level(1)
+
+        assert level.shape == (5, 5)
+        assert np.all(level[2] == 1)
+        assert np.all(level[[0, 1, 3, 4]] == 0)
+
+
+class TestPolePlotDensity:
+
+    @staticmethod
+    @pytest.fixture
+    def fund_points():
+        # random directions within the cubic fundamental triangle
+        rng = np.random.default_rng(0)
+        corners = np.array([[0, 0, 1], [1, 0, 1], [1, 1, 1]], dtype=float)
+        corners /= np.linalg.norm(corners, axis=1)[:, np.newaxis]
+        dirs = rng.random((20000, 3)) @ corners
+        return Quat.polarAngles(*dirs.T)
+
+    @staticmethod
+    def test_density_counts(fund_points):
+        plot = PolePlot("IPF", "cubic")
+        img = plot.addDensity(*fund_points, bins=50, normalise=False)
+        density = img.get_array().filled(np.nan)
+        plt.close(plot.fig)
+
+        assert density.shape[1] == 50
+        assert np.isnan(density).any()
+        assert 0.97 * 20000 < np.nansum(density) <= 20000
+
+    @staticmethod
+    def test_smoothed_normalised(fund_points):
+        plot = PolePlot("IPF", "cubic")
+        img = plot.addDensity(*fund_points, bins=50, sigma=2)
+        density = img.get_array().filled(np.nan)
+        plt.close(plot.fig)
+
+        assert np.nanmean(density) == pytest.approx(1)
+
+    @staticmethod
+    def test_subsample(fund_points):
+        plot = PolePlot("IPF", "cubic")
+        plot.addPoints(*fund_points, maxPoints=500,
+                       c=np.arange(20000), s=2)
+        points = plot.imgLayers[-1]
+        plt.close(plot.fig)
+
+        assert len(points.get_offsets()) == 500
+        assert len(points.get_array()) == 500
+
+
+class TestExportPlots:
+
+    @staticmethod
+    @pytest.fixture
+    def specs(tmp_path):
+        return [{
+            'fileName': str(tmp_path / 'ipf{:d}.{:}'.format(i, ext)),
+            'method': 'plotIPF',
+            'args': ([0, 0, 1], 'cubic'),
+            'kwargs': {'density': density},
+        } for i, (ext, density) in enumerate(
+            [('png', False), ('pdf', True), ('png', True)]
+        )]
+
+    @staticmethod
+    def test_serial(specs):
+        numFigs = len(plt.get_fignums())
+        fileNames = exportPlots(Quat(1., 0., 0., 0.), specs)
+
+        assert fileNames == [spec['fileName'] for spec in specs]
+        with open(fileNames[0], 'rb') as f:
+            assert f.read(4) == b'\x89PNG'
+        with open(fileNames[1], 'rb') as f:
+            assert f.read(4) == b'%PDF'
+        # no figures are created through pyplot
+        assert len(plt.get_fignums()) == numFigs
+
+    @staticmethod
+    def test_processes(specs):
+        fileNames = exportPlots(Quat(1., 0., 0., 0.), specs, numProcesses=2)
+
+        assert fileNames == [spec['fileName'] for spec in specs]
+        for fileName in fileNames:
+            with open(fileName, 'rb') as f:
+                assert len(f.read()) > 0
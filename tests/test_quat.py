@@ -1,7 +1,9 @@
 import pytest
 import numpy as np
+import matplotlib.pyplot as plt
 
 import defdap.quat
+import defdap.plotting
 
 ## Initialisation
 # Quat initialisation should raise a DimensionError if not length 1, 3, 4
@@ -102,6 +104,96 @@ def testFromAxisAngleStr2(axis, angle):
 
 
 
+## IPF colours
+# Colours interpolated from the colour table should match exact colours
+@pytest.mark.parametrize('symGroup', ['cubic', 'hexagonal'])
+def testIPFcolourTable(symGroup):
+    rng = np.random.default_rng(0)
+    coeffs = rng.normal(size=(2000, 4))
+    coeffs /= np.linalg.norm(coeffs, axis=1)[:, np.newaxis]
+    quats = [defdap.quat.Quat(coeff) for coeff in coeffs]
+
+    exact = defdap.quat.Quat.calcIPFcolours(quats, [0, 0, 1], symGroup)
+    lookup = defdap.quat.Quat.calcIPFcolours(
+        quats, [0, 0, 1], symGroup, resolution=0.25)
+
+    assert lookup.shape == (3, 2000)
+    assert np.allclose(lookup, exact, atol=0.01)
+    # table is only calculated once
+    assert defdap.quat.Quat.ipfColourTable(symGroup)[2] is \
+        defdap.quat.Quat.ipfColourTable(symGroup)[2]
+
+
+# Processing in chunks should not change the fundamental directions
+@pytest.mark.parametrize('symGroup', ['cubic', 'hexagonal'])
+def testCalcFundDirsChunked(symGroup):
+    rng = np.random.default_rng(1)
+    coeffs = rng.normal(size=(1000, 4))
+    coeffs /= np.linalg.norm(coeffs, axis=1)[:, np.newaxis]
+    quats = [defdap.quat.Quat(coeff) for coeff in coeffs]
+
+    alpha, beta = defdap.quat.Quat.calcFundDirs(quats, [1, 0, 0], symGroup)
+    alphaChunked, betaChunked = defdap.quat.Quat.calcFundDirs(
+        quats, [1, 0, 0], symGroup, chunkSize=128, numWorkers=2)
+
+    assert np.array_equal(alpha, alphaChunked)
+    assert np.array_equal(beta, betaChunked)
+
+
+## Unit cell
+# Vertices should be the rotated unit cell, as plotted by plotUnitCell
+@pytest.mark.parametrize('symGroup, cOverA', [('cubic', None),
+                                              ('hexagonal', 1.6)])
+def testUnitCellVerts(symGroup, cOverA, monkeypatch):
+    quat = defdap.quat.Quat.fromEulerAngles(0.3, 0.7, 1.1)
+    plotted = []
+    monkeypatch.setattr(defdap.plotting.CrystalPlot, 'addVerts',
+                        lambda self, verts, **kwargs: plotted.append(verts))
+    plot = quat.plotUnitCell(symGroup, cOverA=cOverA, OI=False)
+    plt.close(plot.fig)
+    verts = quat.unitCellVerts(symGroup, cOverA=cOverA, OI=False)
+
+    assert len(verts) == len(plotted[0]) == (6 if symGroup == 'cubic' else 8)
+    for face, plottedFace in zip(verts, plotted[0]):
+        assert np.array_equal(face, plottedFace)
+
+    # rotating back gives the cell in the crystal frame
+    unrotated = np.einsum('ij,kj->ki', quat.rotMatrix(),
+                          np.concatenate(verts))
+    if symGroup == 'cubic':
+        assert np.allclose(np.abs(unrotated), 0.15)
+    else:
+        assert np.allclose(np.abs(unrotated[:, 2]), 0.2 * cOverA / 2)
+
+
+## Orientation index
+# Nearest neighbours should match a brute force search of misorientations
+@pytest.mark.parametrize('symGroup', ['cubic', 'hexagonal'])
+def testOrientationIndex(symGroup):
+    rng = np.random.default_rng(0)
+    comps = rng.normal(size=(200, 4))
+    comps /= np.linalg.norm(comps, axis=1)[:, np.newaxis]
+    stored, queries = comps[:190], comps[190:]
+
+    index = defdap.quat.OrientationIndex(stored, symGroup)
+    misOris = np.array([[
+        defdap.quat.Quat(query).misOri(defdap.quat.Quat(quat), symGroup)
+        for quat in stored] for query in queries])
+    angles = 360 * np.arccos(np.minimum(misOris, 1)) / np.pi
+
+    ids, foundAngles = index.query(queries, k=3)
+    expected = np.argsort(angles, axis=1)[:, :3]
+    assert np.array_equal(ids, expected)
+    assert np.allclose(foundAngles, np.take_along_axis(angles, expected, 1))
+
+    found = index.queryRadius(queries, 20)
+    for i, ids in enumerate(found):
+        assert np.array_equal(ids, np.flatnonzero(angles[i] <= 20))
+
+    ids, foundAngles = index.query(defdap.quat.Quat(queries[0]), k=2)
+    assert np.array_equal(ids, expected[0, :2])
+
+
 ''' Functions left to test
 eulerAngles(self):
 rotMatrix(self):
@@ -136,4 +228,4 @@ plotIPFmap(quatArray, direction, symGroup, **kwargs)
 calcIPFcolours(quats, direction, symGroup)
 calcFundDirs(quats, direction, symGroup, dtype=np.float)
 symEqv(group)
-'''
\ No newline at end of file
+'''
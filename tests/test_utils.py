@@ -0,0 +1,12 @@
+import pytest
+
+from defdap.utils import parallelMap
+
+
+@pytest.mark.parametrize('numWorkers', [1, 4])
+def test_parallel_map(numWorkers):
+    items = list(range(20))
+    results = dict(parallelMap(lambda item: item**2, items,
+                               numWorkers=numWorkers))
+
+    assert results == {i: item**2 for i, item in enumerate(items)}